@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Keynote-MCP 无界面模式基准测试
+
+对比普通模式与无界面模式（KEYNOTE_MCP_HEADLESS）下单次调用的延迟。
+脚本会新建一个临时演示文稿，在其中反复添加幻灯片、添加文本并删除幻灯片，
+结束后不保存直接关闭。需要在安装了 Keynote 的 macOS 上运行。
+
+用法:
+    python examples/benchmark_headless.py --iterations 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import AppleScriptRunner
+from src.utils.document_handles import make_handle
+from src.tools.content import ADD_TEXT_ITEM
+from src.tools.slide import ADD_SLIDE, DELETE_SLIDE
+from src.tools.presentation import CREATE_PRESENTATION, CLOSE_PRESENTATION
+
+
+async def run_mode(headless: bool, doc_name: str, iterations: int) -> Dict[str, List[float]]:
+    """在指定模式下执行基准操作，返回每种操作的耗时列表（毫秒）"""
+    runner = AppleScriptRunner(headless=headless)
+    timings: Dict[str, List[float]] = {"add_slide": [], "add_text_item": [], "delete_slide": []}
+    
+    async def timed(name: str, template, *args):
+        started = time.perf_counter()
+        result = await runner.run_template_async(template, *args)
+        timings[name].append((time.perf_counter() - started) * 1000)
+        return result
+    
+    try:
+        # 预热：首次调用需要编译模板
+        slide_number = (await runner.run_template_async(ADD_SLIDE, doc_name, 0, "Blank"))["slideNumber"]
+        await runner.run_template_async(ADD_TEXT_ITEM, doc_name, slide_number, "warm-up", None, None, 18, "", None)
+        await runner.run_template_async(DELETE_SLIDE, doc_name, slide_number)
+        
+        for i in range(iterations):
+            slide_number = (await timed("add_slide", ADD_SLIDE, doc_name, 0, "Blank"))["slideNumber"]
+            await timed("add_text_item", ADD_TEXT_ITEM, doc_name, slide_number, f"Benchmark {i}", 100.0, 100.0, 18, "", None)
+            await timed("delete_slide", DELETE_SLIDE, doc_name, slide_number)
+    finally:
+        runner.close()
+    
+    return timings
+
+
+def summarize(samples: List[float]) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"mean {statistics.mean(ordered):8.1f}  median {statistics.median(ordered):8.1f}  p95 {p95:8.1f}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="对比普通模式与无界面模式的调用延迟")
+    parser.add_argument("--iterations", type=int, default=20, help="每种模式的重复次数（默认20）")
+    args = parser.parse_args()
+    
+    setup = AppleScriptRunner()
+    # 不指定标题，避免在桌面上保存文件
+    created = await setup.run_template_async(CREATE_PRESENTATION, "", "")
+    doc_name = make_handle(created["id"])
+    print(f"📝 临时演示文稿: {created['name']} ({doc_name})")
+    
+    try:
+        results = {}
+        for headless in (False, True):
+            label = "headless" if headless else "normal"
+            print(f"⏱️ 运行 {label} 模式（{args.iterations} 次）...")
+            results[label] = await run_mode(headless, doc_name, args.iterations)
+    finally:
+        await setup.run_template_async(CLOSE_PRESENTATION, doc_name, False)
+        setup.close()
+    
+    print("\n📊 单次调用延迟（毫秒）")
+    print("=" * 70)
+    for operation in results["normal"]:
+        normal = results["normal"][operation]
+        headless = results["headless"][operation]
+        speedup = statistics.median(normal) / statistics.median(headless)
+        print(f"{operation}")
+        print(f"  normal   {summarize(normal)}")
+        print(f"  headless {summarize(headless)}  (median x{speedup:.2f})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
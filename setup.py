@@ -83,7 +83,7 @@ setup(
     },
     include_package_data=True,
     package_data={
-        "": ["*.scpt", "*.applescript", "*.md", "*.txt"],
+        "": ["*.scpt", "*.js", "*.md", "*.txt"],
         "src.applescript": ["*.scpt"],
     },
     zip_safe=False,
@@ -0,0 +1,172 @@
+// osascript_worker.js
+// 常驻 osascript 工作进程：从 stdin 读取分帧的 AppleScript 源码并逐个执行
+//
+// 启动方式: osascript -l JavaScript osascript_worker.js
+//
+// 请求帧: "<KIND> <字节数>\n<负载>"，KIND 为 RUN / CALL / PING / QUIT
+//   RUN  负载为 AppleScript 源码
+//   CALL 负载为 "<已编译脚本路径>\0<参数1>\0<参数2>..."，以 argv 调用脚本的 run 处理器
+// 响应帧: "OK <字节数>\n<结果>"、"ERR <字节数>\n<错误信息>" 或 "PONG 0\n"
+
+ObjC.import('Foundation');
+
+var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+
+// AppleEvent 描述符类型（四字符码）
+var TYPE_TRUE = 0x74727565;     // 'true'
+var TYPE_FALSE = 0x66616c73;    // 'fals'
+var TYPE_BOOLEAN = 0x626f6f6c;  // 'bool'
+
+// run 处理器对应的 AppleEvent（'aevt'/'oapp'）及直接参数关键字 '----'
+var EVENT_CLASS_CORE = 0x61657674;
+var EVENT_ID_OPEN_APPLICATION = 0x6f617070;
+var KEY_DIRECT_OBJECT = 0x2d2d2d2d;
+
+// 已加载的编译脚本（路径中包含内容哈希，源码变化时路径随之变化）
+var loadedScripts = {};
+
+// 读取帧头，遇到 EOF 返回 null
+function readHeader() {
+    var chars = [];
+    while (true) {
+        var data = stdin.readDataOfLength(1);
+        if (data.length === 0) {
+            return null;
+        }
+        var ch = $.NSString.alloc.initWithDataEncoding(data, $.NSASCIIStringEncoding).js;
+        if (ch === '\n') {
+            break;
+        }
+        chars.push(ch);
+    }
+    var parts = chars.join('').split(' ');
+    return { kind: parts[0], length: parseInt(parts[1] || '0', 10) };
+}
+
+// 读取指定字节数的负载，遇到 EOF 返回 null
+function readPayload(length) {
+    var data = $.NSMutableData.data;
+    while (data.length < length) {
+        var chunk = stdin.readDataOfLength(length - data.length);
+        if (chunk.length === 0) {
+            return null;
+        }
+        data.appendData(chunk);
+    }
+    return $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+}
+
+function writeFrame(kind, text) {
+    var data = $(text).dataUsingEncoding($.NSUTF8StringEncoding);
+    var header = $(kind + ' ' + data.length + '\n').dataUsingEncoding($.NSUTF8StringEncoding);
+    stdout.writeData(header);
+    stdout.writeData(data);
+}
+
+// 将执行结果转换为与 osascript 命令行输出一致的文本
+function descriptorToText(desc) {
+    if (!desc || desc.isNil()) {
+        return '';
+    }
+    var type = desc.descriptorType;
+    if (type === TYPE_TRUE) {
+        return 'true';
+    }
+    if (type === TYPE_FALSE) {
+        return 'false';
+    }
+    if (type === TYPE_BOOLEAN) {
+        return desc.booleanValue ? 'true' : 'false';
+    }
+    var text = desc.stringValue;
+    if (text && !text.isNil()) {
+        return text.js;
+    }
+    var count = desc.numberOfItems;
+    var items = [];
+    for (var i = 1; i <= count; i++) {
+        items.push(descriptorToText(desc.descriptorAtIndex(i)));
+    }
+    return items.join(', ');
+}
+
+function formatError(info) {
+    var message = ObjC.unwrap(info.objectForKey('NSAppleScriptErrorMessage')) || 'Unknown error';
+    var number = ObjC.unwrap(info.objectForKey('NSAppleScriptErrorNumber'));
+    // -2740 ~ -2763 为编译期错误，与 osascript 保持一致标记为 syntax error
+    var prefix = (number <= -2740 && number >= -2763) ? 'syntax error: ' : 'execution error: ';
+    return prefix + message + (number === undefined ? '' : ' (' + number + ')');
+}
+
+function executeScript(source) {
+    var script = $.NSAppleScript.alloc.initWithSource($(source));
+    var error = Ref();
+    var result = script.executeAndReturnError(error);
+    if (!result || result.isNil()) {
+        writeFrame('ERR', formatError(error[0]));
+    } else {
+        writeFrame('OK', descriptorToText(result));
+    }
+}
+
+function loadCompiledScript(path) {
+    if (loadedScripts[path]) {
+        return loadedScripts[path];
+    }
+    var error = Ref();
+    var url = $.NSURL.fileURLWithPath($(path));
+    var script = $.NSAppleScript.alloc.initWithContentsOfURLError(url, error);
+    if (!script || script.isNil()) {
+        return null;
+    }
+    loadedScripts[path] = script;
+    return script;
+}
+
+function callCompiledScript(payload) {
+    var parts = payload.split('\u0000');
+    var script = loadCompiledScript(parts[0]);
+    if (script === null) {
+        writeFrame('ERR', 'execution error: File ' + parts[0] + ' not found (-43)');
+        return;
+    }
+
+    var argv = $.NSAppleEventDescriptor.listDescriptor;
+    for (var i = 1; i < parts.length; i++) {
+        argv.insertDescriptorAtIndex($.NSAppleEventDescriptor.descriptorWithString($(parts[i])), i);
+    }
+    var event = $.NSAppleEventDescriptor.appleEventWithEventClassEventIDTargetDescriptorReturnIDTransactionID(
+        EVENT_CLASS_CORE, EVENT_ID_OPEN_APPLICATION, $.NSAppleEventDescriptor.nullDescriptor, -1, 0);
+    event.setParamDescriptorForKeyword(argv, KEY_DIRECT_OBJECT);
+
+    var error = Ref();
+    var result = script.executeAppleEventError(event, error);
+    if (!result || result.isNil()) {
+        writeFrame('ERR', formatError(error[0]));
+    } else {
+        writeFrame('OK', descriptorToText(result));
+    }
+}
+
+function run() {
+    while (true) {
+        var header = readHeader();
+        if (header === null || header.kind === 'QUIT') {
+            break;
+        }
+        var payload = header.length > 0 ? readPayload(header.length) : '';
+        if (payload === null) {
+            break;
+        }
+        if (header.kind === 'PING') {
+            writeFrame('PONG', '');
+        } else if (header.kind === 'RUN') {
+            executeScript(payload);
+        } else if (header.kind === 'CALL') {
+            callCompiledScript(payload);
+        } else {
+            writeFrame('ERR', 'unknown frame kind: ' + header.kind);
+        }
+    }
+}
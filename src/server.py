@@ -5,9 +5,10 @@ Keynote-MCP Server
 """
 
 import asyncio
+import inspect
 import json
 import sys
-from typing import Any, Sequence
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
 
 from mcp.server import Server
 from mcp.types import (
@@ -20,8 +21,102 @@ from mcp.types import (
 )
 from mcp.server.stdio import stdio_server
 
-from .tools import PresentationTools, SlideTools, ContentTools, ExportTools, UnsplashTools
-from .utils import KeynoteError, AppleScriptError, FileOperationError, ParameterError
+from .tools import PresentationTools, SlideTools, ContentTools, ExportTools, UnsplashTools, BatchTools, DiagnosticsTools
+from .utils import AppleScriptRunner, KeynoteError, AppleScriptError, FileOperationError, ParameterError
+from .utils.config import env_bool
+from .utils.scheduler import DocumentScheduler, READ, WRITE
+from .utils.singleflight import SingleFlight
+from .utils.document_handles import DocumentHandles
+from .utils.deck_mirror import DeckMirror
+from .utils.ttl_cache import TTLCache
+from .utils.export_jobs import ProgressCallback
+
+
+# 工具对文档的访问类型：READ / WRITE 在对应文档的队列中调度，None 表示不针对文档、直接执行
+# 未列出的工具按写操作处理
+TOOL_ACCESS = {
+    # 演示文稿管理工具（创建和打开会改变当前文档，按写当前文档处理）
+    "create_presentation": WRITE,
+    "open_presentation": WRITE,
+    "save_presentation": WRITE,
+    "close_presentation": WRITE,
+    "list_presentations": None,
+    "set_presentation_theme": WRITE,
+    "get_presentation_info": READ,
+    "get_available_themes": None,
+    "get_presentation_resolution": READ,
+    "get_slide_size": READ,
+    
+    # 幻灯片操作工具
+    "add_slide": WRITE,
+    "delete_slide": WRITE,
+    "duplicate_slide": WRITE,
+    "move_slide": WRITE,
+    "reorder_slides": WRITE,
+    "delete_slides": WRITE,
+    "get_slide_count": READ,
+    "select_slide": WRITE,
+    "set_slide_layout": WRITE,
+    "get_slide_info": READ,
+    "get_available_layouts": READ,
+    "dump_deck_geometry": READ,
+    "extract_deck_text": READ,
+    "get_presenter_notes": READ,
+    "set_presenter_notes": WRITE,
+    
+    # 内容管理工具
+    "add_text_box": WRITE,
+    "add_title": WRITE,
+    "add_subtitle": WRITE,
+    "add_bullet_list": WRITE,
+    "add_numbered_list": WRITE,
+    "add_code_block": WRITE,
+    "add_quote": WRITE,
+    "add_image": WRITE,
+    "find_replace": WRITE,
+    
+    # 导出和截图工具（截图会临时修改幻灯片的跳过状态）
+    "screenshot_slide": WRITE,
+    "screenshot_slides": WRITE,
+    # 导出作业在作业队列中调度（图片导出以写操作执行），提交和查询本身不进入文档队列
+    "export_pdf": None,
+    "export_powerpoint": None,
+    "export_images": None,
+    "get_export_job": None,
+    "cancel_export_job": None,
+    
+    # 批量操作工具
+    "execute_batch": WRITE,
+    "build_deck_from_markdown": WRITE,
+    "reconcile_deck": WRITE,
+    
+    # Unsplash配图工具
+    "search_unsplash_images": None,
+    "add_unsplash_image_to_slide": WRITE,
+    "get_random_unsplash_image": WRITE,
+    
+    # 诊断工具
+    "get_server_stats": None,
+}
+
+
+def tool_access(name: str, arguments: Dict[str, Any]) -> Tuple[Optional[str], str]:
+    """
+    获取工具调用的调度信息
+    
+    Args:
+        name: 工具名称
+        arguments: 工具参数
+        
+    Returns:
+        (文档标识, 访问类型)；文档标识为 None 时不参与调度。
+        未指定 doc_name 的操作作用于当前文档，统一使用空字符串作为标识；
+        当前文档可能就是按句柄访问的某个文档，调度器让它与所有文档的操作互斥
+    """
+    mode = TOOL_ACCESS.get(name, WRITE)
+    if mode is None:
+        return None, READ
+    return arguments.get("doc_name", "") or "", mode
 
 
 class KeynoteMCPServer:
@@ -29,12 +124,34 @@ class KeynoteMCPServer:
     
     def __init__(self):
         self.server = Server("keynote-mcp")
-        self.presentation_tools = PresentationTools()
-        self.slide_tools = SlideTools()
-        self.content_tools = ContentTools()
-        self.export_tools = ExportTools()
+        # 所有工具共享同一个执行器（以及其中的常驻 osascript 进程池）
+        self.runner = AppleScriptRunner()
+        # 演示文稿和幻灯片的只读工具共享同一个调用合并器
+        self.singleflight = SingleFlight()
+        # 文档句柄缓存：按名称传入的已知文档统一转换为 doc:<id> 句柄
+        self.documents = DocumentHandles()
+        # 文档模型缓存：只读工具直接从内存读取，修改操作增量更新
+        self.mirror = DeckMirror(self.runner)
+        # 按当前文档执行的脚本附带当前文档的 id，窗口切换后及时更正模型别名
+        self.runner.front_document_listeners.append(self.mirror.front_document_seen)
+        # 主题、布局、幻灯片尺寸等几乎不变的数据按 TTL 缓存，启动后在后台预热
+        self.catalogs = TTLCache()
+        self.runner.front_document_listeners.append(self.catalogs.front_document_seen)
+        self.presentation_tools = PresentationTools(
+            self.runner, self.singleflight, self.documents, self.mirror, self.catalogs
+        )
+        self.slide_tools = SlideTools(self.runner, self.singleflight, self.mirror, self.catalogs)
+        self.content_tools = ContentTools(self.runner, self.mirror)
+        # 同一文档上的写操作串行执行，读操作在写操作之间并发执行
+        self.scheduler = DocumentScheduler()
+        self.export_tools = ExportTools(self.runner, self.scheduler)
+        self.batch_tools = BatchTools(self.runner, self.documents, self.mirror, self.catalogs)
+        self.diagnostics_tools = DiagnosticsTools(
+            self.runner, self.scheduler, self.singleflight, self.mirror, self.catalogs,
+            self.export_tools.render_cache
+        )
         try:
-            self.unsplash_tools = UnsplashTools()
+            self.unsplash_tools = UnsplashTools(self.runner, self.mirror)
         except ParameterError as e:
             print(f"⚠️ Unsplash工具初始化失败: {e}")
             self.unsplash_tools = None
@@ -53,13 +170,24 @@ class KeynoteMCPServer:
             tools.extend(self.slide_tools.get_tools())
             tools.extend(self.content_tools.get_tools())
             tools.extend(self.export_tools.get_tools())
+            tools.extend(self.batch_tools.get_tools())
+            tools.extend(self.diagnostics_tools.get_tools())
             if self.unsplash_tools:
                 tools.extend(self.unsplash_tools.get_tools())
             return tools
         
         @self.server.call_tool()
         async def call_tool(name: str, arguments: dict[str, Any]) -> Sequence[TextContent | ImageContent | EmbeddedResource]:
-            """调用工具"""
+            """调用工具（按文档读写类型排队执行）"""
+            if arguments.get("doc_name"):
+                # 同一文档无论按名称还是句柄访问都使用同一个调度队列
+                arguments = dict(arguments, doc_name=self.documents.resolve(arguments["doc_name"]))
+            document, mode = tool_access(name, arguments)
+            async with self.scheduler.schedule(document, mode):
+                return await dispatch_tool(name, arguments)
+        
+        async def dispatch_tool(name: str, arguments: Dict[str, Any]) -> Sequence[Union[TextContent, ImageContent, EmbeddedResource]]:
+            """分发工具调用"""
             try:
                 # 演示文稿管理工具
                 if name == "create_presentation":
@@ -127,6 +255,16 @@ class KeynoteMCPServer:
                         to_position=arguments["to_position"],
                         doc_name=arguments.get("doc_name", "")
                     )
+                elif name == "reorder_slides":
+                    return await self.slide_tools.reorder_slides(
+                        order=arguments["order"],
+                        doc_name=arguments.get("doc_name", "")
+                    )
+                elif name == "delete_slides":
+                    return await self.slide_tools.delete_slides(
+                        slide_numbers=arguments["slide_numbers"],
+                        doc_name=arguments.get("doc_name", "")
+                    )
                 elif name == "get_slide_count":
                     return await self.slide_tools.get_slide_count(
                         doc_name=arguments.get("doc_name", "")
@@ -151,6 +289,31 @@ class KeynoteMCPServer:
                     return await self.slide_tools.get_available_layouts(
                         doc_name=arguments.get("doc_name", "")
                     )
+                elif name == "dump_deck_geometry":
+                    return await self.slide_tools.dump_deck_geometry(
+                        doc_name=arguments.get("doc_name", ""),
+                        first_slide=arguments.get("first_slide", 1),
+                        last_slide=arguments.get("last_slide", 0)
+                    )
+                elif name == "extract_deck_text":
+                    return await self.slide_tools.extract_deck_text(
+                        doc_name=arguments.get("doc_name", ""),
+                        first_slide=arguments.get("first_slide", 1),
+                        last_slide=arguments.get("last_slide", 0),
+                        include_notes=arguments.get("include_notes", True),
+                        format=arguments.get("format", "text"),
+                        max_slides=arguments.get("max_slides", 0)
+                    )
+                elif name == "get_presenter_notes":
+                    return await self.slide_tools.get_presenter_notes(
+                        slide_numbers=arguments.get("slide_numbers"),
+                        doc_name=arguments.get("doc_name", "")
+                    )
+                elif name == "set_presenter_notes":
+                    return await self.slide_tools.set_presenter_notes(
+                        notes=arguments["notes"],
+                        doc_name=arguments.get("doc_name", "")
+                    )
                 
                 # 内容管理工具
                 elif name == "add_text_box":
@@ -221,24 +384,105 @@ class KeynoteMCPServer:
                         x=arguments.get("x"),
                         y=arguments.get("y")
                     )
+                elif name == "find_replace":
+                    return await self.content_tools.find_replace(
+                        find=arguments["find"],
+                        replace=arguments["replace"],
+                        regex=arguments.get("regex", False),
+                        case_sensitive=arguments.get("case_sensitive", True),
+                        include_notes=arguments.get("include_notes", False),
+                        first_slide=arguments.get("first_slide", 1),
+                        last_slide=arguments.get("last_slide", 0),
+                        dry_run=arguments.get("dry_run", False),
+                        doc_name=arguments.get("doc_name", "")
+                    )
                 
                 # 导出和截图工具
                 elif name == "screenshot_slide":
                     return await self.export_tools.screenshot_slide(
                         slide_number=arguments["slide_number"],
                         output_path=arguments["output_path"],
-                        format=arguments.get("format", "png")
+                        format=arguments.get("format", "png"),
+                        thumbnail=arguments.get("thumbnail", False),
+                        thumbnail_max_edge=arguments.get("thumbnail_max_edge", 0),
+                        thumbnail_format=arguments.get("thumbnail_format", ""),
+                        thumbnail_quality=arguments.get("thumbnail_quality", 0),
+                        use_cache=arguments.get("use_cache", False)
+                    )
+                elif name == "screenshot_slides":
+                    return await self.export_tools.screenshot_slides(
+                        output_dir=arguments["output_dir"],
+                        slide_numbers=arguments.get("slide_numbers"),
+                        first_slide=arguments.get("first_slide", 1),
+                        last_slide=arguments.get("last_slide", 0),
+                        format=arguments.get("format", "png"),
+                        doc_name=arguments.get("doc_name", ""),
+                        thumbnail=arguments.get("thumbnail", False),
+                        thumbnail_max_edge=arguments.get("thumbnail_max_edge", 0),
+                        thumbnail_format=arguments.get("thumbnail_format", ""),
+                        thumbnail_quality=arguments.get("thumbnail_quality", 0),
+                        use_cache=arguments.get("use_cache", True)
                     )
                 elif name == "export_pdf":
                     return await self.export_tools.export_pdf(
-                        output_path=arguments["output_path"]
+                        output_path=arguments["output_path"],
+                        doc_name=arguments.get("doc_name", ""),
+                        priority=arguments.get("priority", "normal"),
+                        wait=arguments.get("wait", False)
+                    )
+                elif name == "export_powerpoint":
+                    return await self.export_tools.export_powerpoint(
+                        output_path=arguments["output_path"],
+                        doc_name=arguments.get("doc_name", ""),
+                        priority=arguments.get("priority", "normal"),
+                        wait=arguments.get("wait", False)
                     )
                 elif name == "export_images":
                     return await self.export_tools.export_images(
                         output_dir=arguments["output_dir"],
-                        format=arguments.get("format", "png")
+                        format=arguments.get("format", "png"),
+                        doc_name=arguments.get("doc_name", ""),
+                        priority=arguments.get("priority", "normal"),
+                        wait=arguments.get("wait", False),
+                        progress=self.progress_reporter(),
+                        use_cache=arguments.get("use_cache", True)
+                    )
+                elif name == "get_export_job":
+                    return await self.export_tools.get_export_job(
+                        job_id=arguments.get("job_id", "")
+                    )
+                elif name == "cancel_export_job":
+                    return await self.export_tools.cancel_export_job(
+                        job_id=arguments["job_id"]
+                    )
+                
+                # 批量操作工具
+                elif name == "execute_batch":
+                    return await self.batch_tools.execute_batch(
+                        operations=arguments["operations"],
+                        doc_name=arguments.get("doc_name", ""),
+                        stop_on_error=arguments.get("stop_on_error", True)
+                    )
+                elif name == "build_deck_from_markdown":
+                    return await self.batch_tools.build_deck_from_markdown(
+                        markdown=arguments["markdown"],
+                        doc_name=arguments.get("doc_name", ""),
+                        base_dir=arguments.get("base_dir", ""),
+                        stop_on_error=arguments.get("stop_on_error", True)
+                    )
+                elif name == "reconcile_deck":
+                    return await self.batch_tools.reconcile_deck(
+                        markdown=arguments.get("markdown", ""),
+                        slides=arguments.get("slides"),
+                        doc_name=arguments.get("doc_name", ""),
+                        base_dir=arguments.get("base_dir", ""),
+                        stop_on_error=arguments.get("stop_on_error", True)
                     )
                 
+                # 诊断工具
+                elif name == "get_server_stats":
+                    return await self.diagnostics_tools.get_server_stats()
+                
                 # Unsplash配图工具
                 elif name == "search_unsplash_images":
                     if not self.unsplash_tools:
@@ -316,14 +560,72 @@ class KeynoteMCPServer:
                     text=f"❌ 未知错误: {str(e)}"
                 )]
     
+    def progress_reporter(self) -> Optional[ProgressCallback]:
+        """
+        当前请求的进度通知回调
+        
+        Returns:
+            发送 MCP 进度通知的回调；客户端没有提供 progressToken 时返回 None
+        """
+        try:
+            context = self.server.request_context
+        except LookupError:
+            return None
+        token = context.meta.progressToken if context.meta else None
+        if token is None:
+            return None
+        
+        # message 和 related_request_id 参数只有较新的 mcp 版本才支持，旧版本只发送进度数值
+        parameters = inspect.signature(context.session.send_progress_notification).parameters
+        extra: Dict[str, Any] = {}
+        if "related_request_id" in parameters:
+            extra["related_request_id"] = context.request_id
+        
+        async def report(progress: float, total: Optional[float], message: str) -> None:
+            if "message" in parameters:
+                await context.session.send_progress_notification(
+                    token, progress, total, message=message, **extra
+                )
+            else:
+                await context.session.send_progress_notification(token, progress, total, **extra)
+        
+        return report
+    
+    async def warm_caches(self):
+        """
+        后台预热目录缓存（主题列表，以及当前文档的布局列表和幻灯片尺寸）
+        
+        只在 Keynote 已运行时预热，避免启动服务器时拉起 Keynote；预热失败不影响正常调用
+        """
+        try:
+            if not await self.runner.check_keynote_running_async():
+                return
+            await self.presentation_tools.available_themes()
+            async with self.scheduler.schedule("", READ):
+                await self.slide_tools.available_layouts()
+                await self.presentation_tools.slide_dimensions()
+        except Exception:
+            # 没有打开的文档等情况，首次调用时再加载
+            pass
+    
     async def run(self):
         """启动服务器"""
-        async with stdio_server() as (read_stream, write_stream):
-            await self.server.run(
-                read_stream,
-                write_stream,
-                self.server.create_initialization_options()
-            )
+        warmup = None
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                if env_bool("KEYNOTE_MCP_CACHE_WARMUP", True):
+                    warmup = asyncio.create_task(self.warm_caches())
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    self.server.create_initialization_options()
+                )
+        finally:
+            if warmup is not None:
+                warmup.cancel()
+            self.export_tools.jobs.close()
+            self.export_tools.thumbnails.close()
+            self.runner.close()
 
 
 async def main():
@@ -7,5 +7,7 @@ from .slide import SlideTools
 from .content import ContentTools
 from .export import ExportTools
 from .unsplash import UnsplashTools
+from .batch import BatchTools
+from .diagnostics import DiagnosticsTools
 
-__all__ = ['PresentationTools', 'SlideTools', 'ContentTools', 'ExportTools', 'UnsplashTools'] 
\ No newline at end of file
+__all__ = ['PresentationTools', 'SlideTools', 'ContentTools', 'ExportTools', 'UnsplashTools', 'BatchTools', 'DiagnosticsTools'] 
\ No newline at end of file
@@ -0,0 +1,712 @@
+"""
+批量操作工具
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from mcp.types import Tool, TextContent
+from ..utils import AppleScriptRunner, validate_slide_number, ParameterError
+from ..utils.script_templates import BatchOperation, BatchResult
+from ..utils.document_handles import DocumentHandles
+from ..utils.deck_mirror import DeckMirror
+from ..utils.ttl_cache import TTLCache
+from ..utils.auto_layout import ITEM_GAP, auto_layout_enabled, estimate_text_size, place_text, safe_margin
+from ..utils import markdown_deck
+from ..utils.markdown_deck import Block, SlideSpec, parse_markdown, slides_from_spec
+from ..utils.deck_text import DUMP_SLIDE_TEXT, slide_texts_from_dump
+from ..utils.deck_reconcile import SlideFingerprint, reconcile_slides
+from .content import (
+    ADD_TEXT_ITEM, ADD_IMAGE, SET_TEXT_ITEM_TEXT, format_bullet_list, format_numbered_list, format_quote,
+    text_item_arguments, image_arguments
+)
+from .slide import (
+    ADD_SLIDE, DELETE_SLIDE, DUPLICATE_SLIDE, MOVE_SLIDE, GET_SLIDE_COUNT, SELECT_SLIDE,
+    SET_SLIDE_LAYOUT, GET_SLIDE_INFO, fallback_layout, layouts_key, load_available_layouts
+)
+from .presentation import SAVE_PRESENTATION, SET_PRESENTATION_THEME
+
+
+def _add_slide(args: Dict[str, Any]) -> BatchOperation:
+    layout = args.get("layout", "")
+    # 与 add_slide 工具一致：未指定布局时使用 Blank 布局
+    if args.get("clear_default_content", True) and layout == "":
+        layout = "Blank"
+    return BatchOperation(ADD_SLIDE, [args.get("position", 0), layout])
+
+
+def _delete_slide(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(DELETE_SLIDE, [validate_slide_number(args["slide_number"])])
+
+
+def _duplicate_slide(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(DUPLICATE_SLIDE, [validate_slide_number(args["slide_number"]), args.get("new_position", 0)])
+
+
+def _move_slide(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(MOVE_SLIDE, [
+        validate_slide_number(args["from_position"]),
+        validate_slide_number(args["to_position"])
+    ])
+
+
+def _get_slide_count(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(GET_SLIDE_COUNT)
+
+
+def _select_slide(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(SELECT_SLIDE, [validate_slide_number(args["slide_number"])])
+
+
+def _set_slide_layout(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(
+        SET_SLIDE_LAYOUT, [validate_slide_number(args["slide_number"]), args["layout"]], expect="success"
+    )
+
+
+def _get_slide_info(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(GET_SLIDE_INFO, [validate_slide_number(args["slide_number"])])
+
+
+# 文本工具使用的默认字号和字体
+TEXT_STYLES: Dict[str, Tuple[Optional[int], str]] = {
+    "add_text_box": (None, ""),
+    "add_title": (36, ""),
+    "add_subtitle": (24, ""),
+    "add_bullet_list": (18, ""),
+    "add_numbered_list": (18, ""),
+    "add_code_block": (14, "Monaco"),
+    "add_quote": (20, ""),
+}
+
+
+def _text_item(text: str, args: Dict[str, Any], font_size: Optional[int] = None, font_name: str = "") -> BatchOperation:
+    return BatchOperation(ADD_TEXT_ITEM, text_item_arguments(
+        args["slide_number"], text, args.get("x"), args.get("y"),
+        args.get("font_size") or font_size, args.get("font_name") or font_name
+    ))
+
+
+def _add_image(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(ADD_IMAGE, image_arguments(args["slide_number"], args["image_path"], args.get("x"), args.get("y")))
+
+
+def _save_presentation(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(SAVE_PRESENTATION)
+
+
+def _set_presentation_theme(args: Dict[str, Any]) -> BatchOperation:
+    return BatchOperation(SET_PRESENTATION_THEME, [args["theme_name"]], expect="success")
+
+
+# 可在批处理中使用的工具：名称和参数与对应的独立工具一致
+BATCH_OPERATIONS: Dict[str, Callable[[Dict[str, Any]], BatchOperation]] = {
+    "add_slide": _add_slide,
+    "delete_slide": _delete_slide,
+    "duplicate_slide": _duplicate_slide,
+    "move_slide": _move_slide,
+    "get_slide_count": _get_slide_count,
+    "select_slide": _select_slide,
+    "set_slide_layout": _set_slide_layout,
+    "get_slide_info": _get_slide_info,
+    "add_text_box": lambda args: _text_item(args["text"], args, *TEXT_STYLES["add_text_box"]),
+    "add_title": lambda args: _text_item(args["title"], args, *TEXT_STYLES["add_title"]),
+    "add_subtitle": lambda args: _text_item(args["subtitle"], args, *TEXT_STYLES["add_subtitle"]),
+    "add_bullet_list": lambda args: _text_item(format_bullet_list(args["items"]), args, *TEXT_STYLES["add_bullet_list"]),
+    "add_numbered_list": lambda args: _text_item(
+        format_numbered_list(args["items"]), args, *TEXT_STYLES["add_numbered_list"]
+    ),
+    "add_code_block": lambda args: _text_item(args["code"], args, *TEXT_STYLES["add_code_block"]),
+    "add_quote": lambda args: _text_item(format_quote(args["quote"]), args, *TEXT_STYLES["add_quote"]),
+    "add_image": _add_image,
+    "save_presentation": _save_presentation,
+    "set_presentation_theme": _set_presentation_theme,
+}
+
+
+def build_batch_operations(operations: List[Dict[str, Any]], doc_name: str = "",
+                           documents: Optional[DocumentHandles] = None) -> List[BatchOperation]:
+    """
+    将工具调用列表转换为批处理操作
+    
+    Args:
+        operations: [{"tool": 工具名, "arguments": {...}}, ...]
+        doc_name: 批处理的目标文档
+        documents: 文档句柄缓存，用于判断操作中的 doc_name 是否指向同一文档
+    
+    Returns:
+        批处理操作列表
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ParameterError("operations must be a non-empty list")
+    
+    batch = []
+    for index, operation in enumerate(operations, start=1):
+        if not isinstance(operation, dict):
+            raise ParameterError(f"Operation {index} must be an object")
+        
+        tool_name = operation.get("tool", "")
+        arguments = operation.get("arguments") or {}
+        builder = BATCH_OPERATIONS.get(tool_name)
+        if builder is None:
+            raise ParameterError(f"Operation {index}: tool not supported in batch: {tool_name}")
+        
+        # 整个批处理只针对一个文档
+        op_doc = arguments.get("doc_name", "")
+        if op_doc and documents is not None:
+            op_doc = documents.resolve(op_doc)
+        if op_doc and op_doc != doc_name:
+            raise ParameterError(
+                f"Operation {index}: doc_name '{op_doc}' differs from batch document '{doc_name}'"
+            )
+        
+        try:
+            batch.append(builder(arguments))
+        except KeyError as e:
+            raise ParameterError(f"Operation {index} ({tool_name}): missing argument {e}")
+        except ParameterError as e:
+            raise ParameterError(f"Operation {index} ({tool_name}): {e}")
+    
+    return batch
+
+
+# Markdown 内容块对应的文本工具
+MARKDOWN_BLOCK_TOOLS = {
+    markdown_deck.SUBTITLE: "add_subtitle",
+    markdown_deck.TEXT: "add_text_box",
+    markdown_deck.BULLETS: "add_bullet_list",
+    markdown_deck.NUMBERED: "add_numbered_list",
+    markdown_deck.CODE: "add_code_block",
+    markdown_deck.QUOTE: "add_quote",
+}
+
+
+class DeckPlan(NamedTuple):
+    """Markdown 编译结果"""
+    operations: List[BatchOperation]
+    # 与操作一一对应的 (幻灯片编号, 工具名)
+    labels: List[Tuple[int, str]]
+    # 空间不足、部分内容使用 Keynote 默认位置的幻灯片编号
+    overflow: List[int]
+
+
+def _list_text(items: Sequence[Tuple[int, str]], numbered: bool) -> str:
+    """构建列表文本，嵌套项按级别缩进；只有一级时与 add_bullet_list / add_numbered_list 一致"""
+    if all(level == 0 for level, _ in items):
+        texts = [text for _, text in items]
+        return format_numbered_list(texts) if numbered else format_bullet_list(texts)
+    
+    lines = []
+    counters: Dict[int, int] = {}
+    for level, text in items:
+        counters = {depth: count for depth, count in counters.items() if depth <= level}
+        counters[level] = counters.get(level, 0) + 1
+        marker = f"{counters[level]}." if numbered else "•"
+        lines.append(f"{'    ' * level}{marker} {text}")
+    return "\n".join(lines)
+
+
+def _block_text(block: Block) -> str:
+    if block.kind == markdown_deck.BULLETS:
+        return _list_text(block.items, numbered=False)
+    if block.kind == markdown_deck.NUMBERED:
+        return _list_text(block.items, numbered=True)
+    if block.kind == markdown_deck.QUOTE:
+        return format_quote(block.text)
+    return block.text
+
+
+def _centered_positions(texts: Sequence[Tuple[str, Optional[int]]], slide_width: float,
+                        slide_height: float) -> List[Tuple[float, float, float]]:
+    """标题页：文本整体居中，返回每个文本的 (x, y, 宽度)"""
+    max_width = slide_width - 2 * safe_margin(slide_width, slide_height)
+    sizes = []
+    for text, font_size in texts:
+        width, height = estimate_text_size(text, font_size, max_width)
+        sizes.append((min(width * 1.1, max_width), height))
+    
+    y = max(0.0, (slide_height - sum(height for _, height in sizes) - ITEM_GAP * (len(sizes) - 1)) / 2)
+    positions = []
+    for width, height in sizes:
+        positions.append((round((slide_width - width) / 2), round(y), round(width)))
+        y += height + ITEM_GAP
+    return positions
+
+
+def plan_markdown_deck(slides: Sequence[SlideSpec], first_slide: int, slide_width: float, slide_height: float,
+                       base_dir: str = "", auto_layout: bool = True) -> DeckPlan:
+    """
+    将解析后的幻灯片编译为批处理操作
+    
+    每张幻灯片以 Blank 布局添加到文档末尾，内容块映射为对应的文本工具和 add_image。
+    启用自动布局时在本地计算位置：内容从安全区域顶部开始逐块向下排列，
+    只有标题（以及一个副标题或段落）的幻灯片整体居中；图片使用 Keynote 的默认位置
+    
+    Args:
+        slides: parse_markdown 的结果
+        first_slide: 第一张新幻灯片的编号（当前幻灯片数量 + 1）
+        slide_width: 幻灯片宽度
+        slide_height: 幻灯片高度
+        base_dir: 图片相对路径的基准目录
+        auto_layout: 是否在本地计算位置
+    
+    Returns:
+        编译结果
+    
+    Raises:
+        ParameterError: 图片文件不存在
+    """
+    return _plan_slides([(spec, slide_contents(spec, base_dir)) for spec in slides], first_slide,
+                        slide_width, slide_height, auto_layout)
+
+
+def slide_contents(spec: SlideSpec, base_dir: str = "") -> List[Tuple[str, str]]:
+    """
+    幻灯片的内容，按添加顺序排列
+    
+    Returns:
+        [(文本工具名, 文本) 或 ("add_image", 图片绝对路径), ...]
+    
+    Raises:
+        ParameterError: 图片文件不存在
+    """
+    contents: List[Tuple[str, str]] = []
+    if spec.title:
+        contents.append(("add_title", spec.title))
+    for block in spec.blocks:
+        if block.kind == markdown_deck.IMAGE:
+            image_path = os.path.expanduser(block.text)
+            if base_dir and not os.path.isabs(image_path):
+                image_path = os.path.join(os.path.expanduser(base_dir), image_path)
+            image_path = os.path.abspath(image_path)
+            if not os.path.isfile(image_path):
+                raise ParameterError(f"Line {spec.line}: image not found: {block.text}")
+            contents.append(("add_image", image_path))
+        else:
+            contents.append((MARKDOWN_BLOCK_TOOLS[block.kind], _block_text(block)))
+    return contents
+
+
+def slide_fingerprint(contents: Sequence[Tuple[str, str]]) -> SlideFingerprint:
+    """由 slide_contents 的结果计算期望幻灯片的指纹（文本框正文不带字号的不限定字号）"""
+    texts = [(tool, text) for tool, text in contents if tool != "add_image"]
+    return SlideFingerprint(
+        tuple(text for _, text in texts),
+        tuple(TEXT_STYLES[tool][0] for tool, _ in texts),
+        len(contents) - len(texts)
+    )
+
+
+def _plan_slides(slides: Sequence[Tuple[SlideSpec, List[Tuple[str, str]]]], first_slide: int,
+                 slide_width: float, slide_height: float, auto_layout: bool) -> DeckPlan:
+    operations: List[BatchOperation] = []
+    labels: List[Tuple[int, str]] = []
+    overflow: List[int] = []
+    margin = safe_margin(slide_width, slide_height)
+    
+    for offset, (spec, contents) in enumerate(slides):
+        slide_number = first_slide + offset
+        operations.append(BatchOperation(ADD_SLIDE, [0, "Blank"]))
+        labels.append((slide_number, "add_slide"))
+        
+        texts = [(text, TEXT_STYLES[tool][0]) for tool, text in contents if tool != "add_image"]
+        centered = None
+        if auto_layout and spec.title and len(contents) <= 2 and len(texts) == len(contents) and (
+                len(contents) == 1 or contents[1][0] in ("add_subtitle", "add_text_box")):
+            centered = iter(_centered_positions(texts, slide_width, slide_height))
+        
+        rects: Optional[List[List[float]]] = [] if auto_layout else None
+        for tool, value in contents:
+            if tool == "add_image":
+                operations.append(BatchOperation(ADD_IMAGE, image_arguments(slide_number, value, None, None)))
+                labels.append((slide_number, tool))
+                continue
+            
+            font_size, font_name = TEXT_STYLES[tool]
+            x = y = width = None
+            if centered is not None:
+                x, y, width = next(centered)
+            elif rects is not None:
+                placement = place_text(slide_width, slide_height, rects, value, font_size)
+                if placement is None:
+                    # 剩余空间不足：本张幻灯片的后续内容都使用默认位置
+                    overflow.append(slide_number)
+                    rects = None
+                else:
+                    x, y, width, height = placement
+                    # 占满整行，后续内容排在下方
+                    rects.append([margin, y, slide_width - 2 * margin, height])
+            operations.append(BatchOperation(ADD_TEXT_ITEM, text_item_arguments(
+                slide_number, value, x, y, font_size, font_name, width
+            )))
+            labels.append((slide_number, tool))
+    
+    return DeckPlan(operations, labels, overflow)
+
+
+class BatchTools:
+    """批量操作工具类"""
+    
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, documents: Optional[DocumentHandles] = None,
+                 mirror: Optional[DeckMirror] = None, catalogs: Optional[TTLCache] = None):
+        self.runner = runner or AppleScriptRunner()
+        self.documents = documents if documents is not None else DocumentHandles()
+        self.mirror = mirror or DeckMirror(self.runner)
+        self.catalogs = catalogs or TTLCache()
+    
+    def get_tools(self) -> List[Tool]:
+        """获取所有批量操作工具"""
+        return [
+            Tool(
+                name="execute_batch",
+                description=(
+                    "在一次 AppleScript 调用中按顺序执行多个操作，文档只解析一次。"
+                    "每个操作的工具名和参数与独立工具相同，支持: " + ", ".join(BATCH_OPERATIONS)
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "operations": {
+                            "type": "array",
+                            "description": "按顺序执行的操作列表",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "tool": {
+                                        "type": "string",
+                                        "enum": list(BATCH_OPERATIONS),
+                                        "description": "工具名称"
+                                    },
+                                    "arguments": {
+                                        "type": "object",
+                                        "description": "工具参数（与独立工具相同）"
+                                    }
+                                },
+                                "required": ["tool"]
+                            }
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "stop_on_error": {
+                            "type": "boolean",
+                            "description": "遇到失败的操作时是否停止执行后续操作（可选，默认true）"
+                        }
+                    },
+                    "required": ["operations"]
+                }
+            ),
+            Tool(
+                name="build_deck_from_markdown",
+                description=(
+                    "根据 Markdown 大纲生成幻灯片并追加到文档末尾，整个文档在一次 AppleScript 调用中完成。"
+                    "一级、二级标题和 --- 开始新幻灯片；三级及以下标题作为副标题；"
+                    "支持段落、项目符号列表、编号列表（可嵌套）、代码块、引用和图片 ![](路径)"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "markdown": {
+                            "type": "string",
+                            "description": "Markdown 文本"
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "base_dir": {
+                            "type": "string",
+                            "description": "图片相对路径的基准目录（可选，默认为服务器的工作目录）"
+                        },
+                        "stop_on_error": {
+                            "type": "boolean",
+                            "description": "遇到失败的操作时是否停止执行后续操作（可选，默认true）"
+                        }
+                    },
+                    "required": ["markdown"]
+                }
+            ),
+            Tool(
+                name="reconcile_deck",
+                description=(
+                    "把文档同步为期望的幻灯片内容：一次读取所有幻灯片的文本，与期望内容比对后只执行必要的"
+                    "删除、移动、新建和修改文本操作（在一次 AppleScript 调用中完成），未变化的幻灯片保持不动。"
+                    "期望内容使用与 build_deck_from_markdown 相同的 Markdown，或 JSON 形式的幻灯片列表"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "markdown": {
+                            "type": "string",
+                            "description": "期望内容的 Markdown 文本（与 slides 二选一）"
+                        },
+                        "slides": {
+                            "type": "array",
+                            "description": (
+                                "期望内容的幻灯片列表（与 markdown 二选一），如 "
+                                "[{\"title\": \"...\", \"blocks\": [{\"type\": \"bullets\", \"items\": [\"...\"]}]}]；"
+                                "type 可为 subtitle、text、bullets、numbered、code、quote、image（使用 path）"
+                            ),
+                            "items": {"type": "object"}
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "base_dir": {
+                            "type": "string",
+                            "description": "图片相对路径的基准目录（可选，默认为服务器的工作目录）"
+                        },
+                        "stop_on_error": {
+                            "type": "boolean",
+                            "description": "遇到失败的操作时是否停止执行后续操作（可选，默认true）"
+                        }
+                    }
+                }
+            )
+        ]
+    
+    async def execute_batch(self, operations: List[Dict[str, Any]], doc_name: str = "",
+                            stop_on_error: bool = True) -> List[TextContent]:
+        """批量执行操作"""
+        try:
+            batch = await self._resolve_slide_layouts(
+                doc_name, build_batch_operations(operations, doc_name, self.documents)
+            )
+            
+            try:
+                results = await self.runner.run_batch_async(batch, doc_name, stop_on_error)
+            finally:
+                # 批处理可能包含任意修改操作，执行后丢弃文档模型
+                self.mirror.invalidate(doc_name)
+                if any(operation.get("tool") == "set_presentation_theme" for operation in operations):
+                    self.catalogs.invalidate_document(doc_name)
+            
+            return [TextContent(
+                type="text",
+                text=self._format_results(operations, results)
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 批量执行失败: {str(e)}"
+            )]
+    
+    async def build_deck_from_markdown(self, markdown: str, doc_name: str = "", base_dir: str = "",
+                                       stop_on_error: bool = True) -> List[TextContent]:
+        """根据 Markdown 大纲生成幻灯片，报告解析、规划和执行各阶段耗时"""
+        try:
+            started = time.perf_counter()
+            slides = parse_markdown(markdown)
+            if not slides:
+                raise ParameterError("Markdown contains no slides")
+            parsed = time.perf_counter()
+            
+            # 规划需要幻灯片数量和尺寸：文档模型已缓存时不访问 Keynote
+            script_calls = 1 if self.mirror.cached(doc_name) is None else 0
+            script_calls += 0 if self.catalogs.peek(layouts_key(doc_name))[0] else 1
+            deck = await self.mirror.get(doc_name)
+            layouts = await load_available_layouts(self.runner, self.catalogs, doc_name)
+            loaded = time.perf_counter()
+            first_slide = deck.slide_count + 1
+            plan = plan_markdown_deck(
+                slides, first_slide, deck.width, deck.height, base_dir, auto_layout_enabled()
+            )
+            plan = plan._replace(operations=self._with_layouts(plan.operations, layouts))
+            planned = time.perf_counter()
+            
+            with self.mirror.mutating(doc_name):
+                results = await self.runner.run_batch_async(plan.operations, doc_name, stop_on_error)
+            executed = time.perf_counter()
+            script_calls += 1
+            self._apply_deck_plan(doc_name, plan, results)
+            
+            timings = (
+                f"⏱️ 解析 {(parsed - started) * 1000:.1f} ms，"
+                f"规划 {(planned - loaded) * 1000:.1f} ms，"
+                f"执行 {(executed - planned) * 1000:.1f} ms"
+            )
+            if script_calls > 1:
+                timings += f"（另有文档模型加载 {(loaded - parsed) * 1000:.1f} ms）"
+            
+            failed = [(label, result) for label, result in zip(plan.labels, results) if not result.ok]
+            last_slide = first_slide + len(slides) - 1
+            slide_range = f"{first_slide}-{last_slide}" if last_slide > first_slide else str(first_slide)
+            header = "✅" if not failed else "⚠️"
+            lines = [
+                f"{header} 已根据 Markdown 生成 {len(slides)} 张幻灯片（第 {slide_range} 张），"
+                f"{len(plan.operations)} 个操作，{script_calls} 次脚本调用",
+                timings,
+            ]
+            if plan.overflow:
+                lines.append(
+                    "⚠️ 以下幻灯片空间不足，部分内容使用默认位置: "
+                    + ", ".join(str(number) for number in sorted(set(plan.overflow)))
+                )
+            for (slide_number, tool_name), result in failed[:10]:
+                status = result.error if result.executed else "未执行"
+                lines.append(f"  ❌ 第 {slide_number} 张 {tool_name}: {status}")
+            if len(failed) > 10:
+                lines.append(f"  … 另有 {len(failed) - 10} 个操作失败或未执行")
+            
+            return [TextContent(
+                type="text",
+                text="\n".join(lines)
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 根据 Markdown 生成幻灯片失败: {str(e)}"
+            )]
+    
+    async def reconcile_deck(self, markdown: str = "", slides: Optional[List[Dict[str, Any]]] = None,
+                             doc_name: str = "", base_dir: str = "", stop_on_error: bool = True) -> List[TextContent]:
+        """把文档同步为期望的幻灯片内容，只执行变化部分的编辑"""
+        try:
+            started = time.perf_counter()
+            if slides is not None:
+                specs = slides_from_spec(slides)
+            elif markdown:
+                specs = parse_markdown(markdown)
+            else:
+                raise ParameterError("Either markdown or slides is required")
+            contents = [slide_contents(spec, base_dir) for spec in specs]
+            desired = [slide_fingerprint(slide) for slide in contents]
+            parsed = time.perf_counter()
+            
+            # 一次调用读取所有幻灯片的文本作为指纹
+            dump = await self.runner.run_template_async(DUMP_SLIDE_TEXT, doc_name, 1, 0)
+            live_slides = slide_texts_from_dump(dump)
+            live = [
+                SlideFingerprint(tuple(slide.texts), tuple(slide.sizes), slide.image_count, slide.other_count)
+                for slide in live_slides
+            ]
+            dumped = time.perf_counter()
+            
+            steps = reconcile_slides(live, desired)
+            operations: List[BatchOperation] = []
+            overflow: List[int] = []
+            retexted_items = 0
+            for step in steps:
+                if step.action == "delete":
+                    operations.append(BatchOperation(DELETE_SLIDE, [step.slide_number]))
+                elif step.action == "move":
+                    operations.append(BatchOperation(MOVE_SLIDE, [step.slide_number, step.target]))
+                elif step.action == "insert":
+                    plan = _plan_slides(
+                        [(specs[step.desired], contents[step.desired])], step.slide_number,
+                        dump["width"], dump["height"], auto_layout_enabled()
+                    )
+                    operations.extend(plan.operations)
+                    if plan.overflow:
+                        overflow.append(step.desired + 1)
+                else:
+                    old_texts = live[step.live].texts
+                    new_texts = desired[step.desired].texts
+                    for index, (old_text, new_text) in enumerate(zip(old_texts, new_texts), start=1):
+                        if old_text != new_text:
+                            operations.append(BatchOperation(
+                                SET_TEXT_ITEM_TEXT, [step.slide_number, index, new_text], expect="success"
+                            ))
+                            retexted_items += 1
+            planned = time.perf_counter()
+            
+            results: List[BatchResult] = []
+            if operations:
+                operations = await self._resolve_slide_layouts(doc_name, operations)
+                try:
+                    results = await self.runner.run_batch_async(operations, doc_name, stop_on_error)
+                finally:
+                    self.mirror.invalidate(doc_name)
+            executed = time.perf_counter()
+            
+            counts = {action: sum(1 for step in steps if step.action == action)
+                      for action in ("delete", "move", "insert", "retext")}
+            unchanged = len(desired) - counts["insert"] - counts["retext"]
+            failed = [(operation, result) for operation, result in zip(operations, results) if not result.ok]
+            header = "✅" if not failed else "⚠️"
+            if not operations:
+                lines = [f"✅ 文档已与期望内容一致（{len(desired)} 张幻灯片），无需修改"]
+            else:
+                lines = [
+                    f"{header} 同步完成: 删除 {counts['delete']}，移动 {counts['move']}，新建 {counts['insert']}，"
+                    f"修改文本 {counts['retext']} 张（{retexted_items} 个文本框），内容未变 {unchanged} 张；"
+                    f"{len(operations)} 个操作，成功 {len(results) - len(failed)}/{len(results)}"
+                ]
+            lines.append(
+                f"⏱️ 解析 {(parsed - started) * 1000:.1f} ms，读取 {(dumped - parsed) * 1000:.1f} ms，"
+                f"比对 {(planned - dumped) * 1000:.1f} ms，执行 {(executed - planned) * 1000:.1f} ms"
+            )
+            if overflow:
+                lines.append(
+                    "⚠️ 以下幻灯片空间不足，部分内容使用默认位置: "
+                    + ", ".join(str(number) for number in sorted(set(overflow)))
+                )
+            for operation, result in failed[:10]:
+                status = result.error if result.executed else "未执行"
+                lines.append(f"  ❌ {operation.template.name} {list(operation.args)[:2]}: {status}")
+            
+            return [TextContent(
+                type="text",
+                text="\n".join(lines)
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 同步幻灯片失败: {str(e)}"
+            )]
+    
+    async def _resolve_slide_layouts(self, doc_name: str, operations: List[BatchOperation]) -> List[BatchOperation]:
+        """把 add_slide 操作的布局换成文档中存在的布局（布局列表来自目录缓存）"""
+        if not any(operation.template is ADD_SLIDE and operation.args[1] for operation in operations):
+            return operations
+        return self._with_layouts(operations, await load_available_layouts(self.runner, self.catalogs, doc_name))
+    
+    @staticmethod
+    def _with_layouts(operations: List[BatchOperation], layouts: Sequence[str]) -> List[BatchOperation]:
+        """add_slide 模板不再逐个尝试布局，不存在的布局在这里回退（见 fallback_layout）"""
+        return [
+            operation._replace(args=[operation.args[0], fallback_layout(operation.args[1], layouts)])
+            if operation.template is ADD_SLIDE else operation
+            for operation in operations
+        ]
+    
+    def _apply_deck_plan(self, doc_name: str, plan: DeckPlan, results: List[BatchResult]) -> None:
+        """用批处理结果增量更新文档模型；有操作失败时丢弃模型"""
+        if not all(result.ok for result in results):
+            self.mirror.invalidate(doc_name)
+            return
+        for (slide_number, tool_name), result in zip(plan.labels, results):
+            if tool_name == "add_slide":
+                self.mirror.slide_added(doc_name, result.value)
+            elif tool_name == "add_image":
+                self.mirror.item_added(doc_name, slide_number, text=False)
+            else:
+                self.mirror.item_added(doc_name, slide_number, rect=result.value)
+    
+    @staticmethod
+    def _format_results(operations: List[Dict[str, Any]], results: List[BatchResult]) -> str:
+        """格式化每个操作的执行结果"""
+        succeeded = sum(1 for result in results if result.ok)
+        skipped = sum(1 for result in results if not result.executed)
+        
+        header = "✅" if succeeded == len(results) else "⚠️"
+        lines = [f"{header} 批量执行完成: 成功 {succeeded}/{len(results)}"]
+        if skipped:
+            lines[0] += f"，跳过 {skipped}"
+        
+        for index, (operation, result) in enumerate(zip(operations, results), start=1):
+            tool_name = operation.get("tool", "")
+            if result.ok:
+                detail = f": {result.value}" if result.value and result.value != "success" else ""
+                lines.append(f"  {index}. ✅ {tool_name}{detail}")
+            elif result.executed:
+                lines.append(f"  {index}. ❌ {tool_name}: {result.error}")
+            else:
+                lines.append(f"  {index}. ⏭️ {tool_name}: 未执行")
+        
+        return "\n".join(lines)
\ No newline at end of file
@@ -2,16 +2,248 @@
 内容管理工具
 """
 
-from typing import Any, Dict, List, Optional
+import re
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Pattern, Tuple
 from mcp.types import Tool, TextContent
 from ..utils import AppleScriptRunner, validate_slide_number, validate_coordinates, validate_file_path, ParameterError
+from ..utils.script_templates import BatchOperation, script_template
+from ..utils.deck_mirror import DeckMirror
+from ..utils.auto_layout import auto_layout_enabled, place_text
+from ..utils.deck_text import DUMP_SLIDE_TEXT, SlideText, slide_texts_from_dump
+from ..utils.presenter_notes import SET_PRESENTER_NOTES
+
+
+# 添加文本项（文本框、标题、列表、代码块等共用）；xPos 为 missing value 时使用默认位置，
+# boxWidth 为 missing value 时使用默认宽度；返回新文本框的 [x, y, w, h]
+ADD_TEXT_ITEM = script_template(
+    "add_text_item",
+    ["docRef", "slideNumber", "textContent", "xPos", "yPos", "fontSize", "fontName", "boxWidth"],
+    '''
+    tell targetDoc
+        tell slide slideNumber
+            set newItem to make new text item with properties {object text:textContent}
+            
+            if boxWidth is not missing value then set width of newItem to boxWidth
+            
+            -- 设置位置（如果指定了x或y坐标）
+            if xPos is not missing value then
+                set position of newItem to {xPos, yPos}
+            end if
+            
+            tell newItem
+                if fontSize is not missing value then set size of object text to fontSize
+                if fontName is not "" then set font of object text to fontName
+            end tell
+            
+            set itemPosition to position of newItem
+            return {item 1 of itemPosition, item 2 of itemPosition, width of newItem, height of newItem}
+        end tell
+    end tell
+    ''',
+    activate=True
+)
+
+# 添加图片，依次尝试 image、movie 和剪贴板三种方式
+ADD_IMAGE = script_template(
+    "add_image",
+    ["docRef", "slideNumber", "imagePath", "xPos", "yPos"],
+    '''
+    tell targetDoc
+        tell slide slideNumber
+            set imageFile to POSIX file imagePath as alias
+            
+            if xPos is missing value then
+                set imageProperties to {file:imageFile}
+            else
+                set imageProperties to {file:imageFile, position:{xPos, yPos}}
+            end if
+            
+            -- 方法1: 尝试标准image对象
+            try
+                make new image with properties imageProperties
+                return "image_success"
+            on error
+                -- 方法2: 尝试movie对象（适用于某些Keynote版本）
+                try
+                    make new movie with properties imageProperties
+                    return "movie_success"
+                on error
+                    -- 方法3: 使用剪贴板方法（需要 Keynote 位于前台，无界面模式下也会激活窗口）
+                    try
+                        tell application "Keynote" to activate
+                        tell application "Finder"
+                            select imageFile
+                            copy selection
+                        end tell
+                        
+                        delay 0.5
+                        paste
+                        
+                        return "clipboard_success"
+                    on error
+                        error "所有图片添加方法都失败"
+                    end try
+                end try
+            end try
+        end tell
+    end tell
+    ''',
+    activate=True
+)
+
+# 修改文本框的文本；itemIndex 为文本框在幻灯片中的序号（与 every text item 的顺序一致）
+SET_TEXT_ITEM_TEXT = script_template(
+    "set_text_item_text",
+    ["docRef", "slideNumber", "itemIndex", "textContent"],
+    '''
+    set object text of text item itemIndex of slide slideNumber of targetDoc to textContent
+    return "success"
+    '''
+)
+
+# 修改形状（包括标题和正文占位符）的文本；itemIndex 与 every shape 的顺序一致
+SET_SHAPE_TEXT = script_template(
+    "set_shape_text",
+    ["docRef", "slideNumber", "itemIndex", "textContent"],
+    '''
+    set object text of shape itemIndex of slide slideNumber of targetDoc to textContent
+    return "success"
+    '''
+)
+
+
+def format_bullet_list(items: List[str]) -> str:
+    """构建项目符号列表文本"""
+    return "\n".join(f"• {item}" for item in items)
+
+
+def format_numbered_list(items: List[str]) -> str:
+    """构建编号列表文本"""
+    return "\n".join(f"{i + 1}. {item}" for i, item in enumerate(items))
+
+
+def format_quote(quote: str) -> str:
+    """使用单引号包围引用文本"""
+    return f"'{quote}'"
+
+
+def text_item_arguments(slide_number: int, text: str, x: Optional[float], y: Optional[float],
+                        font_size: Optional[int] = None, font_name: str = "",
+                        width: Optional[float] = None) -> List[Any]:
+    """
+    校验参数并生成 add_text_item 模板参数（不含 docRef）
+    
+    x、y 都未指定时使用 Keynote 的默认位置；width 未指定时使用默认宽度
+    """
+    validate_slide_number(slide_number)
+    x_pos, y_pos = validate_coordinates(x, y)
+    if x is None and y is None:
+        x_pos = y_pos = None
+    return [slide_number, text, x_pos, y_pos, font_size, font_name, width]
+
+
+def placement_note(rect: Optional[List[float]]) -> str:
+    """文本框位置说明"""
+    if not rect:
+        return ""
+    return f"（位置: x={round(rect[0])}, y={round(rect[1])}，尺寸: {round(rect[2])}×{round(rect[3])}）"
+
+
+def image_arguments(slide_number: int, image_path: str, x: Optional[float], y: Optional[float]) -> List[Any]:
+    """校验参数并生成 add_image 模板参数（不含 docRef）；只有同时指定 x 和 y 时才设置位置"""
+    validate_slide_number(slide_number)
+    image_path = validate_file_path(image_path)
+    x_pos, y_pos = validate_coordinates(x, y)
+    if x is None or y is None:
+        x_pos = y_pos = None
+    return [slide_number, image_path, x_pos, y_pos]
+
+
+class TextEdit(NamedTuple):
+    """查找替换中需要修改的一处文本"""
+    slide_number: int
+    # "text_item"、"shape" 或 "notes"
+    target: str
+    # 对象在幻灯片中的序号（从 1 开始），备注为 0
+    index: int
+    text: str
+    # 替换次数
+    count: int
+    
+    def operation(self) -> BatchOperation:
+        """对应的批处理操作"""
+        if self.target == "notes":
+            return BatchOperation(SET_PRESENTER_NOTES, [self.slide_number, self.text], expect="success")
+        template = SET_TEXT_ITEM_TEXT if self.target == "text_item" else SET_SHAPE_TEXT
+        return BatchOperation(template, [self.slide_number, self.index, self.text], expect="success")
+
+
+def compile_find_pattern(find: str, regex: bool = False, case_sensitive: bool = True) -> Pattern:
+    """
+    编译查找模式
+    
+    Raises:
+        ParameterError: 查找内容为空或正则表达式无效
+    """
+    if not find:
+        raise ParameterError("find must not be empty")
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        return re.compile(find if regex else re.escape(find), flags)
+    except re.error as e:
+        raise ParameterError(f"Invalid regular expression: {e}")
+
+
+def plan_text_replacements(slides: Iterable[SlideText], pattern: Pattern, replacement: str,
+                           regex: bool = False, include_notes: bool = False) -> List[TextEdit]:
+    """
+    在导出的幻灯片文本中查找并计算替换结果，只返回文本发生变化的对象
+    
+    Args:
+        slides: 幻灯片文本
+        pattern: 查找模式
+        replacement: 替换文本；regex 为 True 时支持 \\1、\\g<name> 等分组引用
+        regex: 是否为正则表达式替换
+        include_notes: 是否同时替换演讲者备注
+    
+    Returns:
+        需要修改的文本列表
+    """
+    # 字面替换时替换文本中的反斜杠不做转义处理
+    repl = replacement if regex else (lambda match: replacement)
+    
+    def replace(text: str) -> Tuple[str, int]:
+        try:
+            return pattern.subn(repl, text)
+        except (re.error, IndexError) as e:
+            raise ParameterError(f"Invalid replacement: {e}")
+    
+    edits = []
+    for slide in slides:
+        targets = [("text_item", index, text) for index, text in enumerate(slide.texts, start=1)]
+        targets += [("shape", index, text) for index, text in enumerate(slide.shape_texts, start=1)]
+        if include_notes:
+            targets.append(("notes", 0, slide.notes))
+        for target, index, text in targets:
+            if not text:
+                continue
+            new_text, count = replace(text)
+            if count and new_text != text:
+                edits.append(TextEdit(slide.slide_number, target, index, new_text, count))
+    return edits
 
 
 class ContentTools:
     """内容管理工具类"""
     
-    def __init__(self):
-        self.runner = AppleScriptRunner()
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, mirror: Optional[DeckMirror] = None,
+                 auto_layout: Optional[bool] = None):
+        self.runner = runner or AppleScriptRunner()
+        # 文档模型缓存：添加内容后更新幻灯片的对象数量和矩形，自动布局从中读取已有对象
+        self.mirror = mirror or DeckMirror(self.runner)
+        # 未指定坐标时是否自动计算不重叠的位置
+        self.auto_layout = auto_layout_enabled() if auto_layout is None else auto_layout
     
     def get_tools(self) -> List[Tool]:
         """获取所有内容管理工具"""
@@ -32,11 +264,11 @@ class ContentTools:
                         },
                         "x": {
                             "type": "number",
-                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议范围：50-950像素，避免重叠请使用不同坐标"
+                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议范围：50-950像素；与 y 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "y": {
                             "type": "number",
-                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议范围：50-650像素，避免重叠请使用不同坐标"
+                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议范围：50-650像素；与 x 都省略时自动放置在不与已有内容重叠的位置"
                         }
                     },
                     "required": ["slide_number", "text"]
@@ -58,11 +290,11 @@ class ContentTools:
                         },
                         "x": {
                             "type": "number",
-                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议标题位置：x=100-200，避免重叠请使用不同坐标"
+                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议标题位置：x=100-200；与 y 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "y": {
                             "type": "number",
-                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议标题位置：y=50-100，避免重叠请使用不同坐标"
+                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议标题位置：y=50-100；与 x 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "font_size": {
                             "type": "number",
@@ -92,11 +324,11 @@ class ContentTools:
                         },
                         "x": {
                             "type": "number",
-                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议副标题位置：x=100-200，避免重叠请使用不同坐标"
+                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议副标题位置：x=100-200；与 y 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "y": {
                             "type": "number",
-                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议副标题位置：y=120-180，避免重叠请使用不同坐标"
+                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议副标题位置：y=120-180；与 x 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "font_size": {
                             "type": "number",
@@ -127,11 +359,11 @@ class ContentTools:
                         },
                         "x": {
                             "type": "number",
-                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议列表位置：x=100-150，避免重叠请使用不同坐标"
+                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议列表位置：x=100-150；与 y 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "y": {
                             "type": "number",
-                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议列表位置：y=200-300，避免重叠请使用不同坐标"
+                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议列表位置：y=200-300；与 x 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "font_size": {
                             "type": "number",
@@ -162,11 +394,11 @@ class ContentTools:
                         },
                         "x": {
                             "type": "number",
-                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议列表位置：x=100-150，避免重叠请使用不同坐标"
+                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议列表位置：x=100-150；与 y 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "y": {
                             "type": "number",
-                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议列表位置：y=200-300，避免重叠请使用不同坐标"
+                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议列表位置：y=200-300；与 x 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "font_size": {
                             "type": "number",
@@ -196,11 +428,11 @@ class ContentTools:
                         },
                         "x": {
                             "type": "number",
-                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议代码块位置：x=100-200，避免重叠请使用不同坐标"
+                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议代码块位置：x=100-200；与 y 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "y": {
                             "type": "number",
-                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议代码块位置：y=250-350，避免重叠请使用不同坐标"
+                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议代码块位置：y=250-350；与 x 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "font_size": {
                             "type": "number",
@@ -230,11 +462,11 @@ class ContentTools:
                         },
                         "x": {
                             "type": "number",
-                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议引用位置：x=150-250，避免重叠请使用不同坐标"
+                            "description": "X坐标（像素，可选）- 左上角为原点(0,0)，向右为正。建议引用位置：x=150-250；与 y 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "y": {
                             "type": "number",
-                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议引用位置：y=300-400，避免重叠请使用不同坐标"
+                            "description": "Y坐标（像素，可选）- 左上角为原点(0,0)，向下为正。建议引用位置：y=300-400；与 x 都省略时自动放置在不与已有内容重叠的位置"
                         },
                         "font_size": {
                             "type": "number",
@@ -273,6 +505,57 @@ class ContentTools:
                     },
                     "required": ["slide_number", "image_path"]
                 }
+            ),
+            Tool(
+                name="find_replace",
+                description=(
+                    "在整个文档或指定幻灯片范围内查找并替换文本（文本框、形状和占位符，可选演讲者备注）。"
+                    "一次读取所有文本并在本地匹配，只把需要修改的对象在一次批处理中写回。"
+                    "被修改对象的整段文本被重写（SET_TEXT_ITEM_TEXT / SET_SHAPE_TEXT），"
+                    "统一沿用原文本开头的格式，混合格式（部分加粗、变色等）会丢失"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "find": {
+                            "type": "string",
+                            "description": "要查找的文本或正则表达式"
+                        },
+                        "replace": {
+                            "type": "string",
+                            "description": "替换文本；正则模式下支持 \\1、\\g<name> 分组引用"
+                        },
+                        "regex": {
+                            "type": "boolean",
+                            "description": "是否使用正则表达式（Python 语法，可选，默认false）"
+                        },
+                        "case_sensitive": {
+                            "type": "boolean",
+                            "description": "是否区分大小写（可选，默认true）"
+                        },
+                        "include_notes": {
+                            "type": "boolean",
+                            "description": "是否同时替换演讲者备注（可选，默认false）"
+                        },
+                        "first_slide": {
+                            "type": "integer",
+                            "description": "起始幻灯片编号（可选，默认为1）"
+                        },
+                        "last_slide": {
+                            "type": "integer",
+                            "description": "结束幻灯片编号（可选，包含该页，0表示到最后一张）"
+                        },
+                        "dry_run": {
+                            "type": "boolean",
+                            "description": "只统计匹配结果，不修改文档（可选，默认false）"
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        }
+                    },
+                    "required": ["find", "replace"]
+                }
             )
         ]
     
@@ -280,38 +563,12 @@ class ContentTools:
         """添加文本框"""
         try:
             validate_slide_number(slide_number)
-            x_pos, y_pos = validate_coordinates(x, y)
-            
-            # 处理文本中的引号
-            escaped_text = text.replace('"', '\\"')
-            
-            # 使用内联脚本，语法正确
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is not "" then
-                        set targetDoc to document "{doc_name}"
-                    else
-                        set targetDoc to front document
-                    end if
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            -- 创建文本框
-                            set newTextBox to make new text item with properties {{object text:"{escaped_text}"}}
-                            
-                            -- 设置位置（如果指定了x或y坐标）
-                            {"" if x is None and y is None else f"set position of newTextBox to {{{x_pos}, {y_pos}}}"}
-                        end tell
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
+            
+            rect = await self._add_text_item(doc_name, slide_number, text, x, y)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功在幻灯片 {slide_number} 添加文本框"
+                text=f"✅ 成功在幻灯片 {slide_number} 添加文本框{placement_note(rect)}"
             )]
             
         except Exception as e:
@@ -325,44 +582,12 @@ class ContentTools:
         """添加标题"""
         try:
             validate_slide_number(slide_number)
-            x_pos, y_pos = validate_coordinates(x, y)
-            
-            # 处理文本中的引号
-            escaped_title = title.replace('"', '\\"')
-            
-            # 构建字体设置命令
-            font_command = f'set font of object text to "{font_name}"' if font_name else ""
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is not "" then
-                        set targetDoc to document "{doc_name}"
-                    else
-                        set targetDoc to front document
-                    end if
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            set newTitle to make new text item with properties {{object text:"{escaped_title}"}}
-                            
-                            -- 设置位置（如果指定了x或y坐标）
-                            {"" if x is None and y is None else f"set position of newTitle to {{{x_pos}, {y_pos}}}"}
-                            
-                            tell newTitle
-                                set size of object text to {font_size if font_size else 36}
-                                {font_command if font_command else "-- no font specified"}
-                            end tell
-                        end tell
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
+            
+            rect = await self._add_text_item(doc_name, slide_number, title, x, y, font_size or 36, font_name)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功在幻灯片 {slide_number} 添加标题"
+                text=f"✅ 成功在幻灯片 {slide_number} 添加标题{placement_note(rect)}"
             )]
             
         except Exception as e:
@@ -376,44 +601,12 @@ class ContentTools:
         """添加副标题"""
         try:
             validate_slide_number(slide_number)
-            x_pos, y_pos = validate_coordinates(x, y)
-            
-            # 处理文本中的引号
-            escaped_subtitle = subtitle.replace('"', '\\"')
-            
-            # 构建字体设置命令
-            font_command = f'set font of object text to "{font_name}"' if font_name else ""
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is not "" then
-                        set targetDoc to document "{doc_name}"
-                    else
-                        set targetDoc to front document
-                    end if
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            set newSubtitle to make new text item with properties {{object text:"{escaped_subtitle}"}}
-                            
-                            -- 设置位置（如果指定了x或y坐标）
-                            {"" if x is None and y is None else f"set position of newSubtitle to {{{x_pos}, {y_pos}}}"}
-                            
-                            tell newSubtitle
-                                set size of object text to {font_size if font_size else 24}
-                                {font_command if font_command else "-- no font specified"}
-                            end tell
-                        end tell
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
+            
+            rect = await self._add_text_item(doc_name, slide_number, subtitle, x, y, font_size or 24, font_name)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功在幻灯片 {slide_number} 添加副标题"
+                text=f"✅ 成功在幻灯片 {slide_number} 添加副标题{placement_note(rect)}"
             )]
             
         except Exception as e:
@@ -427,49 +620,15 @@ class ContentTools:
         """添加项目符号列表"""
         try:
             validate_slide_number(slide_number)
-            x_pos, y_pos = validate_coordinates(x, y)
             
             # 构建列表文本
-            list_text = ""
-            for i, item in enumerate(items):
-                escaped_item = item.replace('"', '\\"')
-                list_text += f"• {escaped_item}"
-                if i < len(items) - 1:
-                    list_text += "\\n"
-            
-            # 构建字体设置命令
-            font_command = f'set font of object text to "{font_name}"' if font_name else ""
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is not "" then
-                        set targetDoc to document "{doc_name}"
-                    else
-                        set targetDoc to front document
-                    end if
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            set newList to make new text item with properties {{object text:"{list_text}"}}
-                            
-                            -- 设置位置（如果指定了x或y坐标）
-                            {"" if x is None and y is None else f"set position of newList to {{{x_pos}, {y_pos}}}"}
-                            
-                            tell newList
-                                set size of object text to {font_size if font_size else 18}
-                                {font_command if font_command else "-- no font specified"}
-                            end tell
-                        end tell
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
+            list_text = format_bullet_list(items)
+            
+            rect = await self._add_text_item(doc_name, slide_number, list_text, x, y, font_size or 18, font_name)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功在幻灯片 {slide_number} 添加项目符号列表（{len(items)} 项）"
+                text=f"✅ 成功在幻灯片 {slide_number} 添加项目符号列表（{len(items)} 项）{placement_note(rect)}"
             )]
             
         except Exception as e:
@@ -483,49 +642,15 @@ class ContentTools:
         """添加编号列表"""
         try:
             validate_slide_number(slide_number)
-            x_pos, y_pos = validate_coordinates(x, y)
             
             # 构建编号列表文本
-            list_text = ""
-            for i, item in enumerate(items):
-                escaped_item = item.replace('"', '\\"')
-                list_text += f"{i+1}. {escaped_item}"
-                if i < len(items) - 1:
-                    list_text += "\\n"
-            
-            # 构建字体设置命令
-            font_command = f'set font of object text to "{font_name}"' if font_name else ""
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is not "" then
-                        set targetDoc to document "{doc_name}"
-                    else
-                        set targetDoc to front document
-                    end if
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            set newList to make new text item with properties {{object text:"{list_text}"}}
-                            
-                            -- 设置位置（如果指定了x或y坐标）
-                            {"" if x is None and y is None else f"set position of newList to {{{x_pos}, {y_pos}}}"}
-                            
-                            tell newList
-                                set size of object text to {font_size if font_size else 18}
-                                {font_command if font_command else "-- no font specified"}
-                            end tell
-                        end tell
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
+            list_text = format_numbered_list(items)
+            
+            rect = await self._add_text_item(doc_name, slide_number, list_text, x, y, font_size or 18, font_name)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功在幻灯片 {slide_number} 添加编号列表（{len(items)} 项）"
+                text=f"✅ 成功在幻灯片 {slide_number} 添加编号列表（{len(items)} 项）{placement_note(rect)}"
             )]
             
         except Exception as e:
@@ -539,41 +664,12 @@ class ContentTools:
         """添加代码块"""
         try:
             validate_slide_number(slide_number)
-            x_pos, y_pos = validate_coordinates(x, y)
-            
-            # 处理代码中的引号和换行
-            escaped_code = code.replace('"', '\\"').replace('\n', '\\n')
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is not "" then
-                        set targetDoc to document "{doc_name}"
-                    else
-                        set targetDoc to front document
-                    end if
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            set newCodeBlock to make new text item with properties {{object text:"{escaped_code}"}}
-                            
-                            -- 设置位置（如果指定了x或y坐标）
-                            {"" if x is None and y is None else f"set position of newCodeBlock to {{{x_pos}, {y_pos}}}"}
-                            
-                            tell newCodeBlock
-                                set size of object text to {font_size if font_size else 14}
-                                set font of object text to "{font_name if font_name else 'Monaco'}"
-                            end tell
-                        end tell
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
+            
+            rect = await self._add_text_item(doc_name, slide_number, code, x, y, font_size or 14, font_name or "Monaco")
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功在幻灯片 {slide_number} 添加代码块"
+                text=f"✅ 成功在幻灯片 {slide_number} 添加代码块{placement_note(rect)}"
             )]
             
         except Exception as e:
@@ -587,46 +683,15 @@ class ContentTools:
         """添加引用文本"""
         try:
             validate_slide_number(slide_number)
-            x_pos, y_pos = validate_coordinates(x, y)
-            
-            # 处理引用文本中的引号
-            escaped_quote = quote.replace('"', '\\"')
-            # 使用单引号包围，避免嵌套引号问题
-            formatted_quote = f"'{escaped_quote}'"
-            
-            # 构建字体设置命令
-            font_command = f'set font of object text to "{font_name}"' if font_name else ""
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is not "" then
-                        set targetDoc to document "{doc_name}"
-                    else
-                        set targetDoc to front document
-                    end if
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            set newQuote to make new text item with properties {{object text:"{formatted_quote}"}}
-                            
-                            -- 设置位置（如果指定了x或y坐标）
-                            {"" if x is None and y is None else f"set position of newQuote to {{{x_pos}, {y_pos}}}"}
-                            
-                            tell newQuote
-                                set size of object text to {font_size if font_size else 20}
-                                {font_command if font_command else "-- no font specified"}
-                            end tell
-                        end tell
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
+            
+            # 使用单引号包围引用文本
+            formatted_quote = format_quote(quote)
+            
+            rect = await self._add_text_item(doc_name, slide_number, formatted_quote, x, y, font_size or 20, font_name)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功在幻灯片 {slide_number} 添加引用文本"
+                text=f"✅ 成功在幻灯片 {slide_number} 添加引用文本{placement_note(rect)}"
             )]
             
         except Exception as e:
@@ -635,58 +700,118 @@ class ContentTools:
                 text=f"❌ 添加引用文本失败: {str(e)}"
             )]
     
+    async def _add_text_item(self, doc_name: str, slide_number: int, text: str, x: Optional[float], y: Optional[float],
+                             font_size: Optional[int] = None, font_name: str = "") -> List[float]:
+        """运行 add_text_item 模板，返回新文本框的 [x, y, w, h]"""
+        validate_slide_number(slide_number)
+        self.mirror.check_slide(doc_name, slide_number)
+        
+        width = None
+        if x is None and y is None and self.auto_layout:
+            placement = await self._auto_place(doc_name, slide_number, text, font_size)
+            if placement is not None:
+                x, y, width, _ = placement
+        arguments = text_item_arguments(slide_number, text, x, y, font_size, font_name, width)
+        
+        with self.mirror.mutating(doc_name):
+            rect = await self.runner.run_template_async(ADD_TEXT_ITEM, doc_name, *arguments)
+        self.mirror.item_added(doc_name, slide_number, rect=rect)
+        return rect
+    
+    async def _auto_place(self, doc_name: str, slide_number: int, text: str,
+                          font_size: Optional[int]) -> Optional[Tuple[float, float, float, float]]:
+        """
+        根据文档模型中的幻灯片尺寸和已有对象计算放置位置
+        
+        文档模型已缓存时不需要任何 Keynote 调用；幻灯片的对象矩形未知时只读取这一张幻灯片
+        
+        Returns:
+            (x, y, 文本框宽度, 估算高度)；没有足够空间时返回 None，使用 Keynote 的默认位置
+        """
+        deck = await self.mirror.get(doc_name)
+        slide = deck.slide(slide_number)
+        rects = slide.rects
+        if rects is None:
+            geometry = await self.runner.dump_deck_geometry_async(doc_name, slide_number, slide_number)
+            self.mirror.slide_geometry_loaded(doc_name, slide_number, geometry)
+            rects = [list(rect) for rect in zip(geometry["x"], geometry["y"], geometry["w"], geometry["h"])]
+        return place_text(deck.width, deck.height, rects, text, font_size)
+    
+    async def find_replace(self, find: str, replace: str, regex: bool = False, case_sensitive: bool = True,
+                           include_notes: bool = False, first_slide: int = 1, last_slide: int = 0,
+                           dry_run: bool = False, doc_name: str = "") -> List[TextContent]:
+        """在文档中查找并替换文本，报告数量和各阶段耗时"""
+        try:
+            validate_slide_number(first_slide)
+            if last_slide:
+                validate_slide_number(last_slide)
+                if last_slide < first_slide:
+                    raise ParameterError(f"last_slide {last_slide} is before first_slide {first_slide}")
+            pattern = compile_find_pattern(find, regex, case_sensitive)
+            self.mirror.check_slide(doc_name, first_slide)
+            
+            started = time.perf_counter()
+            dump = await self.runner.run_template_async(DUMP_SLIDE_TEXT, doc_name, first_slide, last_slide)
+            slides = slide_texts_from_dump(dump)
+            if not slides and first_slide > 1:
+                raise ParameterError(
+                    f"Slide number {first_slide} out of range: document has {dump['slideCount']} slides"
+                )
+            dumped = time.perf_counter()
+            
+            edits = plan_text_replacements(slides, pattern, replace, regex, include_notes)
+            matched = time.perf_counter()
+            
+            failed = 0
+            if edits and not dry_run:
+                with self.mirror.mutating(doc_name):
+                    results = await self.runner.run_batch_async([edit.operation() for edit in edits], doc_name, False)
+                failed = sum(1 for result in results if not result.ok)
+                if failed:
+                    self.mirror.invalidate(doc_name)
+                else:
+                    # 文本长度变化可能改变文本框尺寸
+                    for slide_number in {edit.slide_number for edit in edits}:
+                        self.mirror.slide_content_changed(doc_name, slide_number)
+            executed = time.perf_counter()
+            
+            replacements = sum(edit.count for edit in edits)
+            slide_count = len({edit.slide_number for edit in edits})
+            scope = f"第 {slides[0].slide_number}-{slides[-1].slide_number} 张" if slides else "无幻灯片"
+            if dry_run:
+                header = f"🔍 找到 {replacements} 处匹配，涉及 {slide_count} 张幻灯片的 {len(edits)} 个对象（{scope}，未修改）"
+            elif failed:
+                header = (
+                    f"⚠️ 替换 {replacements} 处，{len(edits)} 个对象中 {failed} 个修改失败，"
+                    f"涉及 {slide_count} 张幻灯片（{scope}）"
+                )
+            else:
+                header = f"✅ 替换 {replacements} 处，修改 {len(edits)} 个对象，涉及 {slide_count} 张幻灯片（{scope}）"
+            timings = (
+                f"⏱️ 读取 {(dumped - started) * 1000:.1f} ms，匹配 {(matched - dumped) * 1000:.1f} ms，"
+                f"写回 {(executed - matched) * 1000:.1f} ms（{1 + (1 if edits and not dry_run else 0)} 次脚本调用）"
+            )
+            
+            return [TextContent(
+                type="text",
+                text=f"{header}\n{timings}"
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 查找替换失败: {str(e)}"
+            )]
+    
     async def add_image(self, slide_number: int, image_path: str, x: Optional[float] = None, y: Optional[float] = None) -> List[TextContent]:
         """添加图片"""
         try:
-            validate_slide_number(slide_number)
-            validate_file_path(image_path)
-            x_pos, y_pos = validate_coordinates(x, y)
-            
-            # 构建位置参数
-            position_params = ""
-            if x is not None and y is not None:
-                position_params = f", position:{{{x_pos}, {y_pos}}}"
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    set targetDoc to front document
-                    
-                    tell targetDoc
-                        tell slide {slide_number}
-                            -- 使用正确的alias语法
-                            set imageFile to POSIX file "{image_path}" as alias
-                            
-                            -- 方法1: 尝试标准image对象
-                            try
-                                set newImage to make new image with properties {{file:imageFile{position_params}}}
-                                return "image_success"
-                            on error
-                                -- 方法2: 尝试movie对象（适用于某些Keynote版本）
-                                try
-                                    set newMovie to make new movie with properties {{file:imageFile{position_params}}}
-                                    return "movie_success"
-                                on error
-                                    -- 方法3: 使用剪贴板方法
-                                    try
-                                        tell application "Finder"
-                                            select imageFile
-                                            copy selection
-                                        end tell
-                                        
-                                        delay 0.5
-                                        paste
-                                        
-                                        return "clipboard_success"
-                                    on error
-                                        error "所有图片添加方法都失败"
-                                    end try
-                                end try
-                            end try
-                        end tell
-                    end tell
-                end tell
-            ''')
+            arguments = image_arguments(slide_number, image_path, x, y)
+            self.mirror.check_slide("", slide_number)
+            
+            with self.mirror.mutating(""):
+                result = await self.runner.run_template_async(ADD_IMAGE, "", *arguments)
+            self.mirror.item_added("", slide_number, text=False)
             
             return [TextContent(
                 type="text",
@@ -0,0 +1,68 @@
+"""
+服务器诊断工具
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+from mcp.types import Tool, TextContent
+from ..utils import AppleScriptRunner
+from ..utils.scheduler import DocumentScheduler
+from ..utils.singleflight import SingleFlight
+from ..utils.deck_mirror import DeckMirror
+from ..utils.ttl_cache import TTLCache
+from ..utils.render_cache import RenderCache
+
+
+class DiagnosticsTools:
+    """服务器诊断工具类"""
+    
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, scheduler: Optional[DocumentScheduler] = None,
+                 singleflight: Optional[SingleFlight] = None, mirror: Optional[DeckMirror] = None,
+                 catalogs: Optional[TTLCache] = None, render_cache: Optional[RenderCache] = None):
+        self.runner = runner or AppleScriptRunner()
+        self.scheduler = scheduler or DocumentScheduler()
+        self.singleflight = singleflight or SingleFlight()
+        self.mirror = mirror or DeckMirror(self.runner)
+        self.catalogs = catalogs or TTLCache()
+        self.render_cache = render_cache or RenderCache()
+    
+    def get_tools(self) -> List[Tool]:
+        """获取所有诊断工具"""
+        return [
+            Tool(
+                name="get_server_stats",
+                description="获取服务器运行统计：各文档的操作队列深度、读写等待时间、只读调用合并命中率、文档模型和目录缓存和渲染缓存的命中情况（节省的 AppleScript 调用次数）以及 osascript 进程池状态",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            )
+        ]
+    
+    def collect_stats(self) -> Dict[str, Any]:
+        """收集统计数据"""
+        return {
+            "scheduler": self.scheduler.stats(),
+            "read_coalescing": self.singleflight.stats(),
+            "deck_mirror": self.mirror.stats(),
+            "catalog_cache": self.catalogs.stats(),
+            "render_cache": self.render_cache.stats(),
+            "osascript_pool": self.runner.pool.stats() if self.runner.pool is not None else None,
+            "max_concurrency": self.runner.max_concurrency,
+        }
+    
+    async def get_server_stats(self) -> List[TextContent]:
+        """获取服务器运行统计"""
+        try:
+            stats = self.collect_stats()
+            
+            return [TextContent(
+                type="text",
+                text="📊 服务器统计:\n" + json.dumps(stats, ensure_ascii=False, indent=2)
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 获取服务器统计失败: {str(e)}"
+            )]
\ No newline at end of file
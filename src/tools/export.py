@@ -2,23 +2,129 @@
 导出和截图工具
 """
 
-from typing import Any, Dict, List, Optional
-from mcp.types import Tool, TextContent
-from ..utils import AppleScriptRunner, validate_slide_number, validate_file_path, ParameterError
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from mcp.types import Tool, TextContent, ImageContent
+from ..utils import AppleScriptRunner, validate_slide_number, validate_file_path, ParameterError, AppleScriptError
+from ..utils.script_templates import ScriptTemplate, script_template
+from ..utils.scheduler import READ, WRITE, DocumentScheduler
+from ..utils.render_cache import DUMP_RENDER_STATE, RenderCache, slide_fingerprints
+from ..utils.thumbnails import ThumbnailOptions, ThumbnailPool, pillow_available
+from ..utils.export_jobs import (
+    CANCELLED, DONE, FAILED, PRIORITIES, QUEUED, RUNNING, ExportJob, ExportJobManager, JobRunner, ProgressCallback,
+    export_timeout, exported_image_files, watch_export
+)
+from .slide import GET_SLIDE_COUNT
+
+
+# 读取每张幻灯片的跳过状态（导出前由 Python 保存，导出结束后无论成功、超时还是取消都据此恢复）
+GET_SKIPPED_SLIDES = script_template(
+    "get_skipped_slides",
+    ["docRef"],
+    '''
+    return my jsonObject({"slideCount", count of slides of targetDoc, "skipped", skipped of every slide of targetDoc})
+    '''
+)
+    
+# 修改部分幻灯片的跳过状态；导出前隐藏非目标幻灯片、恢复时把同样的编号改回原状态
+SET_SLIDES_SKIPPED = script_template(
+    "set_slides_skipped",
+    ["docRef", "skipNumbers", "unskipNumbers"],
+    '''
+    tell targetDoc
+        repeat with slideNumber in skipNumbers
+            set skipped of slide (contents of slideNumber) to true
+        end repeat
+        repeat with slideNumber in unskipNumbers
+            set skipped of slide (contents of slideNumber) to false
+        end repeat
+    end tell
+    return "success"
+    '''
+)
+    
+# 导出所有未跳过的幻灯片（跳过状态由调用方事先设置）
+EXPORT_SLIDE_IMAGES = script_template(
+    "export_slide_images",
+    ["docRef", "tempFolder", "formatName"],
+    '''
+    if formatName is "JPEG" then
+        set exportFormat to JPEG
+    else
+        set exportFormat to PNG
+    end if
+    
+    export targetDoc as slide images to (POSIX file tempFolder) with properties {image format:exportFormat, skipped slides:false}
+    return "success"
+    ''',
+    activate=True
+)
+
+EXPORT_PDF = script_template(
+    "export_pdf",
+    ["docRef", "outputPath"],
+    '''
+    set outputFile to POSIX file outputPath
+    
+    -- 导出为PDF
+    export targetDoc to outputFile as PDF
+    
+    return "success"
+    '''
+)
+
+EXPORT_POWERPOINT = script_template(
+    "export_powerpoint",
+    ["docRef", "outputPath"],
+    '''
+    set outputFile to POSIX file outputPath
+    
+    -- 导出为PowerPoint
+    export targetDoc to outputFile as Microsoft PowerPoint
+    
+    return "success"
+    '''
+)
+
+# 导出源文档的文件路径、是否有未保存的修改（用于判断能否复用已完成的导出）
+EXPORT_SOURCE = script_template(
+    "export_source",
+    ["docRef"],
+    '''
+    try
+        set sourcePath to POSIX path of (file of targetDoc as alias)
+    on error
+        set sourcePath to ""
+    end try
+    
+    return my jsonObject({"file", sourcePath, "modified", modified of targetDoc})
+    '''
+)
 
 
 class ExportTools:
     """导出和截图工具类"""
     
-    def __init__(self):
-        self.runner = AppleScriptRunner()
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, scheduler: Optional[DocumentScheduler] = None,
+                 render_cache: Optional[RenderCache] = None):
+        self.runner = runner or AppleScriptRunner()
+        # 渲染缓存：按幻灯片内容指纹复用截图和图片导出的结果
+        self.render_cache = render_cache or RenderCache()
+        # 缩略图在进程池中缩放和编码，不占用事件循环
+        self.thumbnails = ThumbnailPool()
+        # 导出作业队列：PDF、PowerPoint 和图片序列导出提交后立即返回作业编号
+        self.jobs = ExportJobManager(scheduler)
     
     def get_tools(self) -> List[Tool]:
         """获取所有导出和截图工具"""
         return [
             Tool(
                 name="screenshot_slide",
-                description="截图单个幻灯片",
+                description="截图单个幻灯片；thumbnail 为 true 时同时以图片内容返回缩略图",
                 inputSchema={
                     "type": "object",
                     "properties": {
@@ -33,127 +139,688 @@ class ExportTools:
                         "format": {
                             "type": "string",
                             "description": "图片格式（png/jpg，默认png）"
+                        },
+                        "use_cache": {
+                            "type": "boolean",
+                            "description": "是否使用渲染缓存中未变化幻灯片的图片（可选，默认false）；缓存按内容指纹判断，只修改字体、颜色等样式或表格、图表内容时需设为false"
+                        },
+                        "thumbnail": {
+                            "type": "boolean",
+                            "description": "同时返回缩小后的图片内容（可选，默认false）"
+                        },
+                        "thumbnail_max_edge": {
+                            "type": "integer",
+                            "description": "缩略图最长边像素（可选，默认512）"
+                        },
+                        "thumbnail_format": {
+                            "type": "string",
+                            "description": "缩略图格式（webp/jpeg/png，默认webp）"
+                        },
+                        "thumbnail_quality": {
+                            "type": "integer",
+                            "description": "缩略图质量（1-100，默认80）"
                         }
                     },
                     "required": ["slide_number", "output_path"]
                 }
             ),
+            Tool(
+                name="screenshot_slides",
+                description=(
+                    "一次导出截图多张幻灯片（编号列表或范围），文件命名为 slide_<编号>.<扩展名>；"
+                    "导出后恢复幻灯片原有的跳过状态；thumbnail 为 true 时同时以图片内容返回各幻灯片的缩略图"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "output_dir": {
+                            "type": "string",
+                            "description": "输出目录"
+                        },
+                        "slide_numbers": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "幻灯片编号列表（可选，指定后忽略 first_slide 和 last_slide）"
+                        },
+                        "first_slide": {
+                            "type": "integer",
+                            "description": "起始幻灯片编号（可选，默认为1）"
+                        },
+                        "last_slide": {
+                            "type": "integer",
+                            "description": "结束幻灯片编号（可选，包含该页，0表示到最后一张）"
+                        },
+                        "format": {
+                            "type": "string",
+                            "description": "图片格式（png/jpg，默认png）"
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "use_cache": {
+                            "type": "boolean",
+                            "description": "是否使用渲染缓存中未变化幻灯片的图片（可选，默认true）；缓存按内容指纹判断，只修改字体、颜色等样式或表格、图表内容时需设为false"
+                        },
+                        "thumbnail": {
+                            "type": "boolean",
+                            "description": "同时返回缩小后的图片内容（可选，默认false）"
+                        },
+                        "thumbnail_max_edge": {
+                            "type": "integer",
+                            "description": "缩略图最长边像素（可选，默认512）"
+                        },
+                        "thumbnail_format": {
+                            "type": "string",
+                            "description": "缩略图格式（webp/jpeg/png，默认webp）"
+                        },
+                        "thumbnail_quality": {
+                            "type": "integer",
+                            "description": "缩略图质量（1-100，默认80）"
+                        }
+                    },
+                    "required": ["output_dir"]
+                }
+            ),
             Tool(
                 name="export_pdf",
-                description="导出演示文稿为PDF",
+                description="导出演示文稿为PDF（后台作业，立即返回作业编号）",
                 inputSchema={
                     "type": "object",
                     "properties": {
                         "output_path": {
                             "type": "string",
                             "description": "输出文件路径"
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "priority": {
+                            "type": "string",
+                            "enum": ["high", "normal", "low"],
+                            "description": "作业优先级（可选，默认normal）"
+                        },
+                        "wait": {
+                            "type": "boolean",
+                            "description": "是否等待导出完成后再返回（可选，默认false，立即返回作业编号）"
+                        }
+                    },
+                    "required": ["output_path"]
+                }
+            ),
+            Tool(
+                name="export_powerpoint",
+                description="导出演示文稿为PowerPoint（后台作业，立即返回作业编号）",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "output_path": {
+                            "type": "string",
+                            "description": "输出文件路径（.pptx）"
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "priority": {
+                            "type": "string",
+                            "enum": ["high", "normal", "low"],
+                            "description": "作业优先级（可选，默认normal）"
+                        },
+                        "wait": {
+                            "type": "boolean",
+                            "description": "是否等待导出完成后再返回（可选，默认false，立即返回作业编号）"
                         }
                     },
                     "required": ["output_path"]
                 }
+            ),
+            Tool(
+                name="export_images",
+                description=(
+                    "导出全部幻灯片为图片序列（slide_<编号>.<扩展名>）；后台作业，立即返回作业编号，"
+                    "wait 为 true 时等待完成并每导出一张幻灯片发送一次进度通知"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "output_dir": {
+                            "type": "string",
+                            "description": "输出目录"
+                        },
+                        "format": {
+                            "type": "string",
+                            "description": "图片格式（png/jpg，默认png）"
+                        },
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "priority": {
+                            "type": "string",
+                            "enum": ["high", "normal", "low"],
+                            "description": "作业优先级（可选，默认normal）"
+                        },
+                        "wait": {
+                            "type": "boolean",
+                            "description": "是否等待导出完成后再返回（可选，默认false，立即返回作业编号）"
+                        },
+                        "use_cache": {
+                            "type": "boolean",
+                            "description": "是否使用渲染缓存中未变化幻灯片的图片（可选，默认true）；缓存按内容指纹判断，只修改字体、颜色等样式或表格、图表内容时需设为false"
+                        }
+                    },
+                    "required": ["output_dir"]
+                }
+            ),
+            Tool(
+                name="get_export_job",
+                description="查询导出作业的状态、进度、运行时间和输出文件；不指定作业编号时列出最近的作业",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "作业编号（可选）"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="cancel_export_job",
+                description="取消排队中或正在运行的导出作业",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "job_id": {
+                            "type": "string",
+                            "description": "作业编号"
+                        }
+                    },
+                    "required": ["job_id"]
+                }
             )
         ]
     
-    async def screenshot_slide(self, slide_number: int, output_path: str, format: str = "png") -> List[TextContent]:
-        """截图单个幻灯片"""
+    async def screenshot_slide(self, slide_number: int, output_path: str, format: str = "png",
+                               thumbnail: bool = False, thumbnail_max_edge: int = 0, thumbnail_format: str = "",
+                               thumbnail_quality: int = 0,
+                               use_cache: bool = False) -> List[Union[TextContent, ImageContent]]:
+        """截图单个幻灯片，可同时返回缩略图；默认不使用渲染缓存（仍会用新的截图更新缓存）"""
         try:
             validate_slide_number(slide_number)
             validate_file_path(output_path)
+            options = ThumbnailOptions.resolve(
+                thumbnail_max_edge, thumbnail_format, thumbnail_quality
+            ) if thumbnail else None
             
-            # 设置导出格式
-            export_format = "JPEG" if format.lower() in ["jpg", "jpeg"] else "PNG"
-            
-            # 从输出路径获取目录和文件名
-            import os
-            output_dir = os.path.dirname(output_path)
-            output_filename = os.path.basename(output_path)
-            
-            # 创建临时导出文件夹
-            temp_folder = os.path.join(output_dir, "temp_keynote_export")
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    set targetDoc to front document
-                    set docName to name of targetDoc
-                    
-                    -- 将所有幻灯片设为跳过，除了目标幻灯片
-                    tell targetDoc
-                        set skipped of every slide to true
-                        set skipped of slide {slide_number} to false
-                    end tell
-                    
-                    -- 创建临时导出文件夹
-                    tell application "Finder"
-                        if not (exists folder "{temp_folder}") then
-                            make new folder at (POSIX file "{output_dir}") with properties {{name:"temp_keynote_export"}}
-                        end if
-                    end tell
-                    
-                    -- 导出幻灯片为图片到临时文件夹
-                    set outputFolder to POSIX file "{temp_folder}"
-                    export targetDoc as slide images to outputFolder with properties {{image format:{export_format}, skipped slides:false}}
-                    
-                    -- 恢复所有幻灯片
-                    tell targetDoc
-                        set skipped of every slide to false
-                    end tell
-                    
-                    return "success"
-                end tell
-            ''')
-            
-            # 查找生成的文件并重命名为目标文件名
-            import glob
-            generated_files = glob.glob(os.path.join(temp_folder, f"*.{format.lower()}"))
-            if generated_files:
-                # 移动第一个文件到目标位置
-                import shutil
-                shutil.move(generated_files[0], output_path)
-                
-                # 清理临时文件夹
-                shutil.rmtree(temp_folder, ignore_errors=True)
-                
+            output_dir = os.path.dirname(output_path) or "."
+            exported, cached = await self.export_slide_images(
+                output_dir, lambda number, extension: output_path, [slide_number], format=format,
+                use_cache=use_cache
+            )
+            if not exported:
                 return [TextContent(
                     type="text",
-                    text=f"✅ 成功截图幻灯片 {slide_number} 到: {output_path}"
+                    text=f"❌ 截图文件未生成"
                 )]
-            else:
+            
+            source = "（幻灯片未变化，使用缓存）" if cached else ""
+            images, note = await self._thumbnails(exported, options)
+            return [TextContent(
+                type="text",
+                text=f"✅ 成功截图幻灯片 {slide_number} 到: {output_path}{source}{note}"
+            )] + images
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 截图幻灯片失败: {str(e)}"
+            )]
+    
+    async def screenshot_slides(self, output_dir: str, slide_numbers: Optional[List[int]] = None,
+                                first_slide: int = 1, last_slide: int = 0, format: str = "png",
+                                doc_name: str = "", thumbnail: bool = False, thumbnail_max_edge: int = 0,
+                                thumbnail_format: str = "",
+                                thumbnail_quality: int = 0,
+                                use_cache: bool = True) -> List[Union[TextContent, ImageContent]]:
+        """一次导出截图多张幻灯片，可同时返回缩略图"""
+        try:
+            validate_file_path(output_dir)
+            if slide_numbers is not None and not isinstance(slide_numbers, list):
+                raise ParameterError("slide_numbers must be a list")
+            for slide_number in slide_numbers or []:
+                validate_slide_number(slide_number)
+            validate_slide_number(first_slide)
+            if last_slide:
+                validate_slide_number(last_slide)
+                if last_slide < first_slide:
+                    raise ParameterError(f"last_slide {last_slide} is before first_slide {first_slide}")
+            options = ThumbnailOptions.resolve(
+                thumbnail_max_edge, thumbnail_format, thumbnail_quality
+            ) if thumbnail else None
+            
+            exported, cached = await self.export_slide_images(
+                output_dir, lambda number, extension: os.path.join(output_dir, f"slide_{number}{extension}"),
+                slide_numbers, first_slide, last_slide, format, doc_name, use_cache=use_cache
+            )
+            if not exported:
                 return [TextContent(
                     type="text",
-                    text=f"❌ 截图文件未生成"
+                    text="📸 没有需要截图的幻灯片"
                 )]
             
+            rendered = len(exported) - cached
+            passes = f"导出 {rendered} 张（1 次导出）" if rendered else "无需导出"
+            file_list = "\n".join(f"• {number}: {path}" for number, path in exported.items())
+            images, note = await self._thumbnails(exported, options)
+            return [TextContent(
+                type="text",
+                text=f"✅ 成功截图 {len(exported)} 张幻灯片到: {output_dir}（{cached} 张使用缓存，{passes}）{note}\n{file_list}"
+            )] + images
+        
         except Exception as e:
             return [TextContent(
                 type="text",
                 text=f"❌ 截图幻灯片失败: {str(e)}"
             )]
     
-    async def export_pdf(self, output_path: str) -> List[TextContent]:
-        """导出演示文稿为PDF"""
+    async def _thumbnails(self, exported: Dict[int, str],
+                          options: Optional[ThumbnailOptions]) -> Tuple[List[ImageContent], str]:
+        """
+        为截图生成缩略图（在进程池中并行缩放）
+        
+        缩略图失败不影响已经完成的截图，只在消息中说明
+        
+        Returns:
+            (按幻灯片顺序的图片内容, 附加到消息中的说明)
+        """
+        if options is None:
+            return [], ""
+        if not pillow_available():
+            return [], "\n⚠️ 未安装 Pillow，无法生成缩略图"
+        try:
+            thumbnails = await asyncio.gather(*(
+                self.thumbnails.thumbnail(path, options) for path in exported.values()
+            ))
+        except Exception as e:
+            return [], f"\n⚠️ 生成缩略图失败: {str(e)}"
+        
+        images = [
+            ImageContent(type="image", data=thumbnail.data, mimeType=thumbnail.mime_type)
+            for thumbnail in thumbnails
+        ]
+        width, height = thumbnails[0].width, thumbnails[0].height
+        return images, f"\n🖼️ 返回 {len(images)} 张缩略图（{width}x{height}，{options.format}）"
+    
+    async def export_slide_images(self, output_dir: str, target_path: Callable[[int, str], str],
+                                  slide_numbers: Optional[List[int]] = None, first_slide: int = 1,
+                                  last_slide: int = 0, format: str = "png", doc_name: str = "",
+                                  progress: Optional[ProgressCallback] = None,
+                                  use_cache: bool = True) -> Tuple[Dict[int, str], int]:
+        """
+        导出多张幻灯片的图片并放到目标路径
+        
+        启用渲染缓存时先读取幻灯片指纹，指纹未变化的幻灯片直接复制缓存的图片，其余幻灯片一次导出；
+        导出前记录幻灯片原有的跳过状态，导出后恢复，不影响用户设置的跳过幻灯片
+        
+        Args:
+            output_dir: 输出目录（临时导出目录创建在其中，保证移动文件不跨文件系统）
+            target_path: (幻灯片编号, 扩展名) -> 目标文件路径
+            slide_numbers: 幻灯片编号列表；为空时导出 first_slide..last_slide
+            first_slide: 起始幻灯片编号
+            last_slide: 结束幻灯片编号（包含），0 表示到最后一张
+            format: 图片格式（png/jpg）
+            doc_name: 文档名称或句柄，空字符串表示当前文档
+            progress: 进度回调，每完成一张幻灯片报告一次
+            use_cache: 是否复用缓存的图片；为 False 时全部重新导出，导出结果仍写入缓存（替换可能过期的图片）
+        
+        Returns:
+            (幻灯片编号 -> 文件路径（按幻灯片顺序）, 使用缓存的幻灯片数量)
+        
+        Raises:
+            ParameterError: 幻灯片编号超出范围
+            AppleScriptError: 导出失败或导出的文件数量与幻灯片数量不一致
+        """
+        numbers = sorted(set(slide_numbers or []))
+        export_format = "JPEG" if format.lower() in ["jpg", "jpeg"] else "PNG"
+        
+        fingerprints: Dict[int, str] = {}
+        if self.render_cache.enabled:
+            first, last = (numbers[0], numbers[-1]) if numbers else (first_slide, last_slide)
+            dump = await self.runner.run_template_async(DUMP_RENDER_STATE, doc_name, first, last)
+            slide_count = dump["slideCount"]
+            fingerprints = slide_fingerprints(dump, export_format)
+        else:
+            slide_count = await self.runner.run_template_async(GET_SLIDE_COUNT, doc_name)
+        if numbers and numbers[-1] > slide_count:
+            raise ParameterError(f"Slide number {numbers[-1]} out of range: document has {slide_count} slides")
+        if not numbers:
+            numbers = list(range(first_slide, min(last_slide or slide_count, slide_count) + 1))
+            
+        os.makedirs(output_dir, exist_ok=True)
+        exported: Dict[int, str] = {}
+        for slide_number in numbers:
+            cached = self.render_cache.get(fingerprints[slide_number]) if fingerprints and use_cache else None
+            if cached is not None:
+                path = target_path(slide_number, os.path.splitext(cached)[1])
+                shutil.copyfile(cached, path)
+                exported[slide_number] = path
+        cached_count = len(exported)
+        if progress is not None and cached_count:
+            await progress(cached_count, len(numbers), f"{cached_count} 张幻灯片未变化，使用缓存")
+    
+        missing = [slide_number for slide_number in numbers if slide_number not in exported]
+        if missing:
+            temp_folder = tempfile.mkdtemp(prefix="temp_keynote_export_", dir=output_dir)
+            try:
+                await self._export_unskipped(doc_name, missing, temp_folder, export_format, len(numbers),
+                                             progress, cached_count)
+                exported.update(self._move_exported(temp_folder, missing, target_path, fingerprints))
+            finally:
+                shutil.rmtree(temp_folder, ignore_errors=True)
+        
+        return dict(sorted(exported.items())), cached_count
+    
+    async def _export_unskipped(self, doc_name: str, slide_numbers: List[int], temp_folder: str,
+                                export_format: str, total: int, progress: Optional[ProgressCallback],
+                                completed: int) -> None:
+        """
+        只保留目标幻灯片后导出一次，再恢复原有的跳过状态
+        
+        原有的跳过状态在导出前读取并保存在 Python 中，恢复在 finally 中执行：
+        导出脚本超时被终止、作业或请求被取消时也会恢复，不会丢失用户设置的跳过幻灯片。
+        Keynote 无法中途停止导出，取消时不终止导出脚本，而是等它结束、恢复跳过状态后再抛出 CancelledError
+        
+        Raises:
+            ParameterError: 幻灯片编号超出范围（读取指纹之后文档被删减了幻灯片）
+            AppleScriptError: 导出或恢复跳过状态失败
+        """
+        state = await self.runner.run_template_async(GET_SKIPPED_SLIDES, doc_name)
+        if slide_numbers[-1] > state["slideCount"]:
+            raise ParameterError(
+                f"Slide number {slide_numbers[-1]} out of range: document has {state['slideCount']} slides"
+            )
+        targets = set(slide_numbers)
+        skipped = state["skipped"]
+        # 导出时需要隐藏的幻灯片和需要显示的幻灯片；恢复时把这两组改回原状态
+        hide = [number for number in range(1, state["slideCount"] + 1)
+                if number not in targets and not skipped[number - 1]]
+        show = [number for number in slide_numbers if skipped[number - 1]]
+        timeout = export_timeout(self.runner.timeout, len(slide_numbers))
+        
+        try:
+            if hide or show:
+                await self.runner.run_template_async(SET_SLIDES_SKIPPED, doc_name, hide, show)
+            task = asyncio.ensure_future(self.runner.run_template_async(
+                EXPORT_SLIDE_IMAGES, doc_name, temp_folder, export_format, timeout=timeout
+            ))
+            try:
+                await watch_export(task, temp_folder, total, progress, completed)
+            except asyncio.CancelledError:
+                await self._wait_uncancelled(task)
+                raise
+        finally:
+            if hide or show:
+                await self._restore_skipped(doc_name, show, hide, skipped, timeout)
+    
+    async def _restore_skipped(self, doc_name: str, skip: List[int], unskip: List[int],
+                               original: List[bool], timeout: float) -> None:
+        """
+        恢复幻灯片的跳过状态；恢复期间再次被取消时仍等待恢复完成，之后再抛出 CancelledError
+        
+        Raises:
+            AppleScriptError: 恢复失败（错误信息中包含原有的跳过状态）
+        """
+        restore = asyncio.ensure_future(self.runner.run_template_async(
+            SET_SLIDES_SKIPPED, doc_name, skip, unskip, timeout=timeout
+        ))
+        cancelled = await self._wait_uncancelled(restore)
+        if not restore.cancelled() and restore.exception() is not None:
+            originally_skipped = [number for number, flag in enumerate(original, 1) if flag]
+            raise AppleScriptError(
+                f"Failed to restore skipped slides (originally skipped: {originally_skipped}): "
+                f"{restore.exception()}"
+            )
+        if cancelled:
+            raise asyncio.CancelledError()
+    
+    @staticmethod
+    async def _wait_uncancelled(future: "asyncio.Future") -> bool:
+        """
+        等待 future 结束（不获取结果），期间收到的取消请求不会传递给 future
+        
+        Returns:
+            等待期间是否收到过取消请求
+        """
+        cancelled = False
+        while not future.done():
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError:
+                cancelled = True
+            except Exception:
+                break
+        if not future.cancelled():
+            # 标记异常已被读取，结果由调用方处理
+            future.exception()
+        return cancelled
+    
+    def _move_exported(self, temp_folder: str, slide_numbers: List[int], target_path: Callable[[int, str], str],
+                       fingerprints: Optional[Dict[int, str]] = None) -> Dict[int, str]:
+        """
+        把临时目录中导出的图片移动到目标路径，有指纹时同时放入渲染缓存
+        
+        Keynote 按幻灯片顺序为导出的图片编号（如 Deck.001.png），按序号与幻灯片一一对应
+        
+        Raises:
+            AppleScriptError: 导出的文件数量与幻灯片数量不一致
+        """
+        generated_files = exported_image_files(temp_folder)
+        if len(generated_files) != len(slide_numbers):
+            raise AppleScriptError(
+                f"Expected {len(slide_numbers)} exported images, found {len(generated_files)}"
+            )
+        
+        exported = {}
+        for slide_number, generated in zip(slide_numbers, generated_files):
+            if fingerprints:
+                self.render_cache.put(fingerprints[slide_number], generated)
+            path = target_path(slide_number, os.path.splitext(generated)[1])
+            shutil.move(generated, path)
+            exported[slide_number] = path
+        return exported
+    
+    async def export_pdf(self, output_path: str, doc_name: str = "", priority: str = "normal",
+                         wait: bool = False) -> List[TextContent]:
+        """提交 PDF 导出作业"""
         try:
             validate_file_path(output_path)
             
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    set targetDoc to front document
-                    set outputFile to POSIX file "{output_path}"
-                    
-                    -- 导出为PDF
-                    export targetDoc to outputFile as PDF
-                    
-                    return "success"
-                end tell
-            ''')
+            async def run(job: ExportJob) -> List[str]:
+                await self._export_document(job, EXPORT_PDF, output_path, "PDF")
+                return [output_path]
+            
+            return await self._submit_export("pdf", doc_name, output_path, {}, run, priority, wait)
             
+        except Exception as e:
             return [TextContent(
                 type="text",
-                text=f"✅ 成功导出PDF到: {output_path}"
+                text=f"❌ 导出PDF失败: {str(e)}"
             )]
+    
+    async def export_powerpoint(self, output_path: str, doc_name: str = "", priority: str = "normal",
+                                wait: bool = False) -> List[TextContent]:
+        """提交 PowerPoint 导出作业"""
+        try:
+            validate_file_path(output_path)
+            
+            async def run(job: ExportJob) -> List[str]:
+                await self._export_document(job, EXPORT_POWERPOINT, output_path, "PowerPoint")
+                return [output_path]
             
+            return await self._submit_export("powerpoint", doc_name, output_path, {}, run, priority, wait)
+        
         except Exception as e:
             return [TextContent(
                 type="text",
-                text=f"❌ 导出PDF失败: {str(e)}"
-            )] 
\ No newline at end of file
+                text=f"❌ 导出PowerPoint失败: {str(e)}"
+            )]
+    
+    async def export_images(self, output_dir: str, format: str = "png", doc_name: str = "",
+                            priority: str = "normal", wait: bool = False,
+                            progress: Optional[ProgressCallback] = None,
+                            use_cache: bool = True) -> List[TextContent]:
+        """提交图片序列导出作业（每张幻灯片报告一次进度）"""
+        try:
+            validate_file_path(output_dir)
+            
+            async def run(job: ExportJob) -> List[str]:
+                exported = await self._run_image_export(output_dir, format, doc_name, job.report, use_cache)
+                return list(exported.values())
+            
+            # 导出期间临时修改幻灯片的跳过状态，作业独占文档
+            return await self._submit_export(
+                "images", doc_name, output_dir, {"format": format.lower(), "use_cache": use_cache}, run,
+                priority, wait, progress, WRITE
+            )
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 导出图片失败: {str(e)}"
+            )]
+    
+    async def get_export_job(self, job_id: str = "") -> List[TextContent]:
+        """查询导出作业；不指定作业编号时列出最近的作业"""
+        try:
+            if job_id:
+                return [TextContent(
+                    type="text",
+                    text=self._format_job(self.jobs.get(job_id))
+                )]
+            
+            jobs = self.jobs.jobs()[:20]
+            if not jobs:
+                return [TextContent(
+                    type="text",
+                    text="📦 没有导出作业"
+                )]
+            job_list = "\n".join(
+                f"• {job.job_id}: {job.kind} {job.status}（{job.output}）" for job in jobs
+            )
+            return [TextContent(
+                type="text",
+                text=f"📦 最近的导出作业:\n{job_list}"
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 查询导出作业失败: {str(e)}"
+            )]
+    
+    async def cancel_export_job(self, job_id: str) -> List[TextContent]:
+        """取消导出作业"""
+        try:
+            job = await self.jobs.cancel(job_id)
+            
+            return [TextContent(
+                type="text",
+                text=self._format_job(job)
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 取消导出作业失败: {str(e)}"
+            )]
+    
+    async def _submit_export(self, kind: str, doc_name: str, output: str, options: Dict[str, Any],
+                             run: JobRunner, priority: str, wait: bool,
+                             progress: Optional[ProgressCallback] = None, mode: str = READ) -> List[TextContent]:
+        """提交导出作业；文档自上次相同的导出后未修改时直接返回已有的结果"""
+        if priority not in PRIORITIES:
+            raise ParameterError(f"Invalid priority: {priority}. Must be one of: {', '.join(PRIORITIES)}")
+        key = await self._reuse_key(kind, doc_name, output, options)
+        reused = self.jobs.find_reusable(key)
+        if reused is not None:
+            return [TextContent(
+                type="text",
+                text=f"♻️ 文档自上次导出后未修改，复用已完成的导出作业\n{self._format_job(reused)}"
+            )]
+        
+        job = self.jobs.submit(kind, doc_name, output, run, priority, key, mode)
+        if wait:
+            job = await self.jobs.wait(job.job_id, progress)
+            return [TextContent(
+                type="text",
+                text=self._format_job(job)
+            )]
+        
+        position = self.jobs.queue_position(job.job_id)
+        return [TextContent(
+            type="text",
+            text=(
+                f"🕒 已提交导出作业 {job.job_id}（{kind}，优先级 {job.priority}，前面有 {position} 个排队作业）\n"
+                f"使用 get_export_job 查询进度，cancel_export_job 取消"
+            )
+        )]
+    
+    async def _reuse_key(self, kind: str, doc_name: str, output: str, options: Dict[str, Any]) -> Optional[str]:
+        """
+        导出结果的复用键：导出类型和参数、输出路径、源文件路径及其修改时间和大小
+        
+        文档没有保存过或有未保存的修改时返回 None，不复用
+        """
+        source = await self.runner.run_template_async(EXPORT_SOURCE, doc_name)
+        if not source["file"] or source["modified"]:
+            return None
+        try:
+            stat = os.stat(source["file"])
+        except OSError:
+            return None
+        return json.dumps(
+            [kind, options, os.path.abspath(output), source["file"], stat.st_mtime_ns, stat.st_size],
+            sort_keys=True
+        )
+    
+    async def _export_document(self, job: ExportJob, template: ScriptTemplate, output_path: str, label: str) -> None:
+        """导出整个文档为单个文件（PDF、PowerPoint），超时按幻灯片数量计算"""
+        slide_count = await self.runner.run_template_async(GET_SLIDE_COUNT, job.doc_name)
+        await job.report(0, 1, f"正在导出 {label}（{slide_count} 张幻灯片）")
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        await self.runner.run_template_async(
+            template, job.doc_name, output_path, timeout=export_timeout(self.runner.timeout, slide_count)
+        )
+        await job.report(1, 1, f"已导出 {label}")
+    
+    @staticmethod
+    def _format_job(job: ExportJob) -> str:
+        """导出作业的状态描述"""
+        icon = {QUEUED: "🕒", RUNNING: "⏳", DONE: "✅", FAILED: "❌", CANCELLED: "🚫"}.get(job.status, "📦")
+        lines = [f"{icon} 导出作业 {job.job_id}（{job.kind}，优先级 {job.priority}）: {job.status}"]
+        if job.total:
+            message = f"（{job.message}）" if job.message and not job.finished else ""
+            lines.append(f"• 进度: {job.progress:g}/{job.total:g}{message}")
+        lines.append(f"• 排队 {job.waited:.1f} 秒，运行 {job.elapsed:.1f} 秒")
+        lines.append(f"• 输出: {job.output}")
+        if job.outputs:
+            shown = "\n".join(f"  - {path}" for path in job.outputs[:20])
+            more = f"\n  ...（共 {len(job.outputs)} 个文件）" if len(job.outputs) > 20 else ""
+            lines.append(f"• 输出文件:\n{shown}{more}")
+        if job.error:
+            lines.append(f"• 错误: {job.error}")
+        return "\n".join(lines)
+    
+    async def _run_image_export(self, output_dir: str, format: str, doc_name: str,
+                                progress: Optional[ProgressCallback], use_cache: bool = True) -> Dict[int, str]:
+        """导出全部幻灯片为 slide_<编号>.<扩展名>，只重新导出指纹发生变化的幻灯片"""
+        exported, _ = await self.export_slide_images(
+            output_dir, lambda number, extension: os.path.join(output_dir, f"slide_{number}{extension}"),
+            format=format, doc_name=doc_name, progress=progress, use_cache=use_cache
+        )
+        return exported
\ No newline at end of file
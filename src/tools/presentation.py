@@ -2,16 +2,163 @@
 演示文稿管理工具
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from mcp.types import Tool, TextContent
 from ..utils import AppleScriptRunner, validate_file_path, KeynoteError
+from ..utils.script_templates import script_template
+from ..utils.singleflight import SingleFlight, coalesced
+from ..utils.document_handles import DocumentHandles, make_handle
+from ..utils.deck_mirror import DeckMirror
+from ..utils.ttl_cache import TTLCache
+
+
+# 创建演示文稿；指定标题时保存到桌面
+CREATE_PRESENTATION = script_template(
+    "create_presentation",
+    ["titleText", "themeName"],
+    '''
+    set newDoc to make new document
+    
+    if themeName is not "" then
+        try
+            set theme of newDoc to theme themeName
+        end try
+    end if
+    
+    -- 如果指定了标题，保存到桌面
+    if titleText is not "" then
+        set desktopPath to (path to desktop as string) & titleText & ".key"
+        save newDoc in file desktopPath
+    end if
+    
+    return my jsonObject({"id", id of newDoc, "name", name of newDoc})
+    ''',
+    document=False,
+    activate=True
+)
+
+OPEN_PRESENTATION = script_template(
+    "open_presentation",
+    ["filePath"],
+    '''
+    set targetFile to POSIX file filePath
+    set openedDoc to open targetFile
+    if openedDoc is missing value then set openedDoc to front document
+    
+    return my jsonObject({"id", id of openedDoc, "name", name of openedDoc})
+    ''',
+    document=False
+)
+
+SAVE_PRESENTATION = script_template(
+    "save_presentation",
+    ["docRef"],
+    '''
+    save targetDoc
+    return name of targetDoc
+    '''
+)
+
+CLOSE_PRESENTATION = script_template(
+    "close_presentation",
+    ["docRef", "shouldSave"],
+    '''
+    set docName to name of targetDoc
+    
+    if shouldSave then
+        save targetDoc
+    end if
+    
+    close targetDoc
+    return docName
+    '''
+)
+
+LIST_PRESENTATIONS = script_template(
+    "list_presentations",
+    [],
+    '''
+    set docList to {}
+    repeat with doc in documents
+        set end of docList to my jsonObject({"id", id of doc, "name", name of doc})
+    end repeat
+    return docList
+    ''',
+    document=False
+)
+
+# 使用 Keynote 14 兼容的主题设置方法
+SET_PRESENTATION_THEME = script_template(
+    "set_presentation_theme",
+    ["docRef", "themeName"],
+    '''
+    -- 首先检查主题是否存在
+    set themeExists to false
+    repeat with t in themes
+        if name of t is themeName then
+            set themeExists to true
+            exit repeat
+        end if
+    end repeat
+    
+    if not themeExists then
+        return "theme_not_found"
+    end if
+    
+    -- 使用 document theme 属性设置主题
+    try
+        set document theme of targetDoc to theme themeName
+        return "success"
+    on error errMsg
+        return "error: " & errMsg
+    end try
+    '''
+)
+
+# 只读取幻灯片宽高，文档模型未缓存时使用（不为两个属性导出整个文档）
+GET_SLIDE_DIMENSIONS = script_template(
+    "get_slide_dimensions",
+    ["docRef"],
+    '''
+    try
+        return my jsonObject({"width", width of targetDoc, "height", height of targetDoc})
+    on error
+        -- 返回标准16:9分辨率
+        return my jsonObject({"width", 1920, "height", 1080})
+    end try
+    '''
+)
+
+GET_AVAILABLE_THEMES = script_template(
+    "get_available_themes",
+    [],
+    '''
+    set themeList to {}
+    repeat with t in themes
+        set end of themeList to name of t
+    end repeat
+    
+    return themeList
+    ''',
+    document=False
+)
 
 
 class PresentationTools:
     """演示文稿管理工具类"""
     
-    def __init__(self):
-        self.runner = AppleScriptRunner()
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, singleflight: Optional[SingleFlight] = None,
+                 documents: Optional[DocumentHandles] = None, mirror: Optional[DeckMirror] = None,
+                 catalogs: Optional[TTLCache] = None):
+        self.runner = runner or AppleScriptRunner()
+        # 合并相同的并发只读调用
+        self.singleflight = singleflight or SingleFlight()
+        # 文档句柄缓存
+        self.documents = documents if documents is not None else DocumentHandles()
+        # 文档模型缓存：演示文稿信息和幻灯片尺寸直接从中读取
+        self.mirror = mirror or DeckMirror(self.runner)
+        # 主题列表、幻灯片尺寸等几乎不变的数据的缓存
+        self.catalogs = catalogs or TTLCache()
     
     def get_tools(self) -> List[Tool]:
         """获取所有演示文稿管理工具"""
@@ -60,7 +207,7 @@ class PresentationTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         }
                     }
                 }
@@ -73,7 +220,7 @@ class PresentationTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "should_save": {
                             "type": "boolean",
@@ -98,7 +245,7 @@ class PresentationTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "theme_name": {
                             "type": "string",
@@ -116,7 +263,7 @@ class PresentationTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         }
                     }
                 }
@@ -137,7 +284,7 @@ class PresentationTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         }
                     }
                 }
@@ -150,7 +297,7 @@ class PresentationTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         }
                     }
                 }
@@ -161,38 +308,18 @@ class PresentationTools:
         """创建新演示文稿"""
         try:
             # 确保 Keynote 运行
-            if not self.runner.check_keynote_running():
-                self.runner.launch_keynote()
+            if not await self.runner.check_keynote_running_async():
+                await self.runner.launch_keynote_async()
             
             # 创建演示文稿
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    set newDoc to make new document
-                    
-                    if "{theme}" is not "" then
-                        try
-                            set theme of newDoc to theme "{theme}"
-                        on error
-                            log "Theme {theme} not found, using default theme"
-                        end try
-                    end if
-
-                    set layout to "Blank"
-                    
-                    -- 如果指定了标题，保存到桌面
-                    if "{title}" is not "" then
-                        set desktopPath to (path to desktop as string) & "{title}.key"
-                        save newDoc in file desktopPath
-                    end if
-                    
-                    return name of newDoc
-                end tell
-            ''')
+            result = await self.runner.run_template_async(CREATE_PRESENTATION, title, theme)
+            self.mirror.front_document_changed()
+            self.catalogs.invalidate_document("")
+            name, handle = self._register_document(result)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功创建演示文稿: {result}"
+                text=f"✅ 成功创建演示文稿: {name}\n🔑 文档句柄: {handle}（后续调用可作为 doc_name 传入）"
             )]
             
         except Exception as e:
@@ -207,20 +334,17 @@ class PresentationTools:
             validate_file_path(file_path)
             
             # 确保 Keynote 运行
-            if not self.runner.check_keynote_running():
-                self.runner.launch_keynote()
+            if not await self.runner.check_keynote_running_async():
+                await self.runner.launch_keynote_async()
             
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    set targetFile to POSIX file "{file_path}"
-                    open targetFile
-                    return name of front document
-                end tell
-            ''')
+            result = await self.runner.run_template_async(OPEN_PRESENTATION, file_path)
+            self.mirror.front_document_changed()
+            self.catalogs.invalidate_document("")
+            name, handle = self._register_document(result)
             
             return [TextContent(
                 type="text",
-                text=f"✅ 成功打开演示文稿: {result}"
+                text=f"✅ 成功打开演示文稿: {name}\n🔑 文档句柄: {handle}（后续调用可作为 doc_name 传入）"
             )]
             
         except Exception as e:
@@ -232,17 +356,7 @@ class PresentationTools:
     async def save_presentation(self, doc_name: str = "") -> List[TextContent]:
         """保存演示文稿"""
         try:
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        save front document
-                        return name of front document
-                    else
-                        save document "{doc_name}"
-                        return "{doc_name}"
-                    end if
-                end tell
-            ''')
+            result = await self.runner.run_template_async(SAVE_PRESENTATION, doc_name)
             
             return [TextContent(
                 type="text",
@@ -258,26 +372,11 @@ class PresentationTools:
     async def close_presentation(self, doc_name: str = "", should_save: bool = True) -> List[TextContent]:
         """关闭演示文稿"""
         try:
-            save_flag = "true" if should_save else "false"
-            
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    set docName to name of targetDoc
-                    
-                    if {save_flag} then
-                        save targetDoc
-                    end if
-                    
-                    close targetDoc
-                    return docName
-                end tell
-            ''')
+            result = await self.runner.run_template_async(CLOSE_PRESENTATION, doc_name, should_save)
+            self.mirror.invalidate(doc_name)
+            self.mirror.front_document_changed()
+            self.catalogs.invalidate_document(doc_name)
+            self.documents.forget(doc_name or result)
             
             return [TextContent(
                 type="text",
@@ -290,22 +389,20 @@ class PresentationTools:
                 text=f"❌ 关闭演示文稿失败: {str(e)}"
             )]
     
+    @coalesced
     async def list_presentations(self) -> List[TextContent]:
         """列出所有打开的演示文稿"""
         try:
-            result = self.runner.run_inline_script('''
-                tell application "Keynote"
-                    set docList to {}
-                    repeat with doc in documents
-                        set end of docList to name of doc
-                    end repeat
-                    return docList as string
-                end tell
-            ''')
+            result = await self.runner.run_template_async(LIST_PRESENTATIONS)
             
-            if result:
-                presentations = result.replace("{", "").replace("}", "").split(", ")
-                presentation_list = "\n".join([f"• {name}" for name in presentations])
+            # 刷新句柄缓存
+            open_documents = {doc["id"]: doc["name"] for doc in result}
+            self.documents.replace_all(open_documents)
+            
+            if open_documents:
+                presentation_list = "\n".join(
+                    f"• {name} ({make_handle(doc_id)})" for doc_id, name in open_documents.items()
+                )
                 return [TextContent(
                     type="text",
                     text=f"📋 打开的演示文稿:\n{presentation_list}"
@@ -326,38 +423,12 @@ class PresentationTools:
         """设置演示文稿主题"""
         try:
             # 使用 Keynote 14 兼容的主题设置方法
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    -- 首先检查主题是否存在
-                    set themeExists to false
-                    repeat with t in themes
-                        if name of t is "{theme_name}" then
-                            set themeExists to true
-                            exit repeat
-                        end if
-                    end repeat
-                    
-                    if not themeExists then
-                        return "theme_not_found"
-                    end if
-                    
-                    -- 使用 document theme 属性设置主题
-                    try
-                        set document theme of targetDoc to theme "{theme_name}"
-                        return "success"
-                    on error errMsg
-                        return "error: " & errMsg
-                    end try
-                end tell
-            ''')
+            result = await self.runner.run_template_async(SET_PRESENTATION_THEME, doc_name, theme_name)
             
             if result == "success":
+                # 更换主题会替换母版幻灯片，幻灯片的布局和占位对象都可能变化
+                self.mirror.invalidate(doc_name)
+                self.catalogs.invalidate_document(doc_name)
                 return [TextContent(
                     type="text",
                     text=f"✅ 成功设置主题: {theme_name}"
@@ -379,43 +450,16 @@ class PresentationTools:
                 text=f"❌ 设置主题失败: {str(e)}"
             )]
     
+    @coalesced
     async def get_presentation_info(self, doc_name: str = "") -> List[TextContent]:
         """获取演示文稿信息"""
         try:
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    set docInfo to {{}}
-                    set end of docInfo to name of targetDoc
-                    set end of docInfo to count of slides of targetDoc
-                    
-                    try
-                        set end of docInfo to name of theme of targetDoc
-                    on error
-                        set end of docInfo to "Unknown Theme"
-                    end try
-                    
-                    return docInfo as string
-                end tell
-            ''')
+            deck = await self.mirror.get(doc_name)
             
-            info_parts = result.replace("{", "").replace("}", "").split(", ")
-            if len(info_parts) >= 3:
-                name, slide_count, theme = info_parts[0], info_parts[1], info_parts[2]
-                return [TextContent(
-                    type="text",
-                    text=f"📊 演示文稿信息:\n• 名称: {name}\n• 幻灯片数量: {slide_count}\n• 主题: {theme}"
-                )]
-            else:
-                return [TextContent(
-                    type="text",
-                    text=f"📊 演示文稿信息: {result}"
-                )]
+            return [TextContent(
+                type="text",
+                text=f"📊 演示文稿信息:\n• 名称: {deck.name}\n• 幻灯片数量: {deck.slide_count}\n• 主题: {deck.theme}"
+            )]
                 
         except Exception as e:
             return [TextContent(
@@ -423,28 +467,15 @@ class PresentationTools:
                 text=f"❌ 获取演示文稿信息失败: {str(e)}"
             )]
     
+    @coalesced
     async def get_available_themes(self) -> List[TextContent]:
         """获取可用主题列表"""
         try:
-            # 使用更好的分隔符来获取主题列表
-            result = self.runner.run_inline_script('''
-                tell application "Keynote"
-                    set themeList to {}
-                    repeat with t in themes
-                        set end of themeList to name of t
-                    end repeat
-                    
-                    set AppleScript's text item delimiters to "|||"
-                    set themeString to themeList as string
-                    set AppleScript's text item delimiters to ""
-                    
-                    return themeString
-                end tell
-            ''')
+            result = await self.available_themes()
             
             if result:
-                themes = result.split("|||")
-                theme_list = "\n".join([f"• {theme}" for theme in themes if theme.strip()])
+                themes = [theme for theme in result if theme.strip()]
+                theme_list = "\n".join([f"• {theme}" for theme in themes])
                 return [TextContent(
                     type="text",
                     text=f"🎨 可用主题 ({len(themes)} 个):\n{theme_list}"
@@ -461,56 +492,25 @@ class PresentationTools:
                 text=f"❌ 获取主题列表失败: {str(e)}"
             )]
     
+    @coalesced
     async def get_presentation_resolution(self, doc_name: str = "") -> List[TextContent]:
         """获取演示文稿分辨率"""
         try:
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    try
-                        set docWidth to width of targetDoc
-                        set docHeight to height of targetDoc
-                        
-                        set AppleScript's text item delimiters to ","
-                        set resolution to {{docWidth, docHeight}} as string
-                        set AppleScript's text item delimiters to ""
-                        
-                        return resolution
-                    on error
-                        -- 返回标准16:9分辨率
-                        return "1920,1080"
-                    end try
-                end tell
-            ''')
+            width, height = await self.slide_dimensions(doc_name)
+            aspect_ratio = round(width / height, 3)
             
-            # 解析结果
-            resolution_parts = result.split(",")
-            if len(resolution_parts) >= 2:
-                width, height = resolution_parts[0], resolution_parts[1]
-                aspect_ratio = round(float(width) / float(height), 3)
-                
-                # 判断比例类型
-                if 1.7 < aspect_ratio < 1.8:
-                    ratio_type = "16:9"
-                elif 1.3 < aspect_ratio < 1.4:
-                    ratio_type = "4:3"
-                else:
-                    ratio_type = "自定义"
-                
-                return [TextContent(
-                    type="text",
-                    text=f"📐 演示文稿分辨率:\n• 宽度: {width} 像素\n• 高度: {height} 像素\n• 比例: {aspect_ratio} ({ratio_type})"
-                )]
+            # 判断比例类型
+            if 1.7 < aspect_ratio < 1.8:
+                ratio_type = "16:9"
+            elif 1.3 < aspect_ratio < 1.4:
+                ratio_type = "4:3"
             else:
-                return [TextContent(
-                    type="text",
-                    text=f"📐 分辨率信息: {result}"
-                )]
+                ratio_type = "自定义"
+            
+            return [TextContent(
+                type="text",
+                text=f"📐 演示文稿分辨率:\n• 宽度: {width} 像素\n• 高度: {height} 像素\n• 比例: {aspect_ratio} ({ratio_type})"
+            )]
                 
         except Exception as e:
             return [TextContent(
@@ -518,64 +518,32 @@ class PresentationTools:
                 text=f"❌ 获取分辨率失败: {str(e)}"
             )]
     
+    @coalesced
     async def get_slide_size(self, doc_name: str = "") -> List[TextContent]:
         """获取幻灯片尺寸和比例信息"""
         try:
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    try
-                        set slideWidth to width of targetDoc
-                        set slideHeight to height of targetDoc
-                        set aspectRatio to slideWidth / slideHeight
-                        
-                        -- 判断比例类型
-                        set ratioType to ""
-                        if aspectRatio > 1.7 and aspectRatio < 1.8 then
-                            set ratioType to "16:9"
-                        else if aspectRatio > 1.3 and aspectRatio < 1.4 then
-                            set ratioType to "4:3"
-                        else
-                            set ratioType to "Custom"
-                        end if
-                        
-                        set AppleScript's text item delimiters to ","
-                        set sizeInfo to {{slideWidth, slideHeight, aspectRatio, ratioType}} as string
-                        set AppleScript's text item delimiters to ""
-                        
-                        return sizeInfo
-                    on error
-                        -- 返回默认值
-                        return "1920,1080,1.777,16:9"
-                    end try
-                end tell
-            ''')
+            width, height = await self.slide_dimensions(doc_name)
+            ratio = width / height
             
-            # 解析结果
-            size_parts = result.split(",")
-            if len(size_parts) >= 4:
-                width, height, ratio, ratio_type = size_parts[0], size_parts[1], size_parts[2], size_parts[3]
-                
-                # 计算一些有用的布局信息
-                width_num = float(width)
-                height_num = float(height)
-                
-                # 计算安全区域（留出边距）
-                safe_width = int(width_num * 0.9)
-                safe_height = int(height_num * 0.9)
-                margin_x = int((width_num - safe_width) / 2)
-                margin_y = int((height_num - safe_height) / 2)
-                
-                # 计算常用位置
-                center_x = int(width_num / 2)
-                center_y = int(height_num / 2)
-                
-                layout_info = f"""📏 幻灯片尺寸信息:
+            # 判断比例类型
+            if 1.7 < ratio < 1.8:
+                ratio_type = "16:9"
+            elif 1.3 < ratio < 1.4:
+                ratio_type = "4:3"
+            else:
+                ratio_type = "Custom"
+            
+            # 计算安全区域（留出边距）
+            safe_width = int(width * 0.9)
+            safe_height = int(height * 0.9)
+            margin_x = int((width - safe_width) / 2)
+            margin_y = int((height - safe_height) / 2)
+            
+            # 计算常用位置
+            center_x = int(width / 2)
+            center_y = int(height / 2)
+            
+            layout_info = f"""📏 幻灯片尺寸信息:
 • 尺寸: {width} × {height} 像素
 • 比例: {float(ratio):.3f} ({ratio_type})
 • 中心点: ({center_x}, {center_y})
@@ -585,19 +553,33 @@ class PresentationTools:
 • 边距: {margin_x} × {margin_y} 像素
 • 标题区域建议: y = {margin_y} - {margin_y + 100}
 • 内容区域建议: y = {margin_y + 120} - {safe_height + margin_y}"""
-                
-                return [TextContent(
-                    type="text",
-                    text=layout_info
-                )]
-            else:
-                return [TextContent(
-                    type="text",
-                    text=f"📏 尺寸信息: {result}"
-                )]
-                
+            
+            return [TextContent(
+                type="text",
+                text=layout_info
+            )]
+            
         except Exception as e:
             return [TextContent(
                 type="text",
                 text=f"❌ 获取幻灯片尺寸失败: {str(e)}"
-            )] 
\ No newline at end of file
+            )] 
+    
+    async def available_themes(self) -> List[str]:
+        """获取可用主题名称列表（带缓存）"""
+        return await self.catalogs.get(("themes",), lambda: self.runner.run_template_async(GET_AVAILABLE_THEMES))
+    
+    async def slide_dimensions(self, doc_name: str = "") -> Tuple[int, int]:
+        """获取幻灯片宽高（带缓存）；文档模型已缓存时直接使用其中的尺寸，否则只读取宽高两个属性"""
+        async def load() -> Tuple[int, int]:
+            deck = self.mirror.cached(doc_name)
+            if deck is not None:
+                return deck.width, deck.height
+            size = await self.runner.run_template_async(GET_SLIDE_DIMENSIONS, doc_name)
+            return size["width"], size["height"]
+        
+        return await self.catalogs.get(("slide_size", doc_name), load)
+    
+    def _register_document(self, result: Dict[str, Any]) -> Tuple[str, str]:
+        """记录 {"id", "name"} 形式的文档结果，返回 (名称, 句柄)"""
+        return result["name"], self.documents.register(result["id"], result["name"])
\ No newline at end of file
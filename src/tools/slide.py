@@ -2,16 +2,209 @@
 幻灯片操作工具
 """
 
-from typing import Any, Dict, List, Optional
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from mcp.types import Tool, TextContent
 from ..utils import AppleScriptRunner, validate_slide_number, ParameterError
+from ..utils.script_templates import BatchOperation, script_template
+from ..utils.singleflight import SingleFlight, coalesced
+from ..utils.deck_mirror import DeckMirror
+from ..utils.ttl_cache import TTLCache
+from ..utils.config import env_int
+from ..utils.geometry import KIND_NAMES
+from ..utils.deck_text import SlideText, iter_slide_text
+from ..utils.deck_reconcile import plan_moves
+from ..utils.presenter_notes import DUMP_PRESENTER_NOTES, missing_slides, notes_from_dump, plan_notes_batches
+
+
+# 添加幻灯片；position 为 0 时添加到末尾，布局不存在时回退到 Blank
+ADD_SLIDE = script_template(
+    "add_slide",
+    ["docRef", "slidePosition", "layoutName"],
+    '''
+    if slidePosition is 0 then
+        set newSlide to make new slide at end of slides of targetDoc
+    else
+        set newSlide to make new slide at slide slidePosition of targetDoc
+    end if
+    
+    -- layoutName 已在 Python 中按缓存的布局列表确认存在（见 fallback_layout），空字符串表示默认布局
+    if layoutName is not "" then
+        set base slide of newSlide to master slide layoutName of targetDoc
+    end if
+    
+    -- 返回新幻灯片的实际布局和占位对象，用于更新文档模型
+    try
+        set appliedLayout to name of base slide of newSlide
+    on error
+        set appliedLayout to "Unknown Layout"
+    end try
+    
+    tell newSlide
+        set itemPositions to position of every iWork item
+        set itemWidths to width of every iWork item
+        set itemHeights to height of every iWork item
+    end tell
+    set itemRects to {}
+    repeat with itemIndex from 1 to count of itemPositions
+        set itemPosition to item itemIndex of itemPositions
+        set end of itemRects to {item 1 of itemPosition, item 2 of itemPosition, item itemIndex of itemWidths, item itemIndex of itemHeights}
+    end repeat
+    
+    return my jsonObject({"slideNumber", slide number of newSlide, "layout", appliedLayout, "textItemCount", count of text items of newSlide, "itemCount", count of itemRects, "rects", itemRects})
+    ''',
+    activate=True
+)
+
+DELETE_SLIDE = script_template(
+    "delete_slide",
+    ["docRef", "slideNumber"],
+    '''
+    delete slide slideNumber of targetDoc
+    return "success"
+    '''
+)
+
+DUPLICATE_SLIDE = script_template(
+    "duplicate_slide",
+    ["docRef", "slideNumber", "newPosition"],
+    '''
+    set sourceSlide to slide slideNumber of targetDoc
+    set newSlide to duplicate sourceSlide
+    
+    if newPosition is not 0 then
+        move newSlide to slide newPosition of targetDoc
+    end if
+    
+    return slide number of newSlide
+    '''
+)
+
+MOVE_SLIDE = script_template(
+    "move_slide",
+    ["docRef", "fromPosition", "toPosition"],
+    '''
+    set sourceSlide to slide fromPosition of targetDoc
+    move sourceSlide to slide toPosition of targetDoc
+    return "success"
+    '''
+)
+
+GET_SLIDE_COUNT = script_template(
+    "get_slide_count",
+    ["docRef"],
+    '''
+    return count of slides of targetDoc
+    '''
+)
+
+SELECT_SLIDE = script_template(
+    "select_slide",
+    ["docRef", "slideNumber"],
+    '''
+    set current slide of targetDoc to slide slideNumber of targetDoc
+    return "success"
+    '''
+)
+
+SET_SLIDE_LAYOUT = script_template(
+    "set_slide_layout",
+    ["docRef", "slideNumber", "layoutName"],
+    '''
+    try
+        -- 找到目标布局
+        set targetLayout to missing value
+        repeat with masterSlide in master slides of targetDoc
+            if name of masterSlide is layoutName then
+                set targetLayout to masterSlide
+                exit repeat
+            end if
+        end repeat
+        
+        if targetLayout is missing value then
+            return "layout_not_found"
+        end if
+        
+        -- 设置幻灯片布局（使用正确的语法：base slide）
+        set base slide of slide slideNumber of targetDoc to targetLayout
+        return "success"
+    on error errMsg
+        return "error: " & errMsg
+    end try
+    '''
+)
+
+GET_SLIDE_INFO = script_template(
+    "get_slide_info",
+    ["docRef", "slideNumber"],
+    '''
+    set targetSlide to slide slideNumber of targetDoc
+    
+    try
+        set layoutName to name of master slide of targetSlide
+    on error
+        set layoutName to "Unknown Layout"
+    end try
+    
+    try
+        set textItemCount to count of text items of targetSlide
+    on error
+        set textItemCount to 0
+    end try
+    
+    return my jsonObject({"slideNumber", slide number of targetSlide, "layout", layoutName, "textItemCount", textItemCount})
+    '''
+)
+
+GET_AVAILABLE_LAYOUTS = script_template(
+    "get_available_layouts",
+    ["docRef"],
+    '''
+    set layoutList to {}
+    repeat with masterSlide in master slides of targetDoc
+        set end of layoutList to name of masterSlide
+    end repeat
+    
+    return layoutList
+    '''
+)
+
+
+def layouts_key(doc_name: str) -> Tuple[str, str]:
+    """布局列表在目录缓存中的键"""
+    return ("layouts", doc_name)
+
+
+async def load_available_layouts(runner: AppleScriptRunner, catalogs: TTLCache, doc_name: str = "") -> List[str]:
+    """获取文档可用布局名称列表（带缓存）"""
+    return await catalogs.get(
+        layouts_key(doc_name), lambda: runner.run_template_async(GET_AVAILABLE_LAYOUTS, doc_name)
+    )
+
+
+def fallback_layout(layout: str, layouts: Sequence[str]) -> str:
+    """
+    添加幻灯片时实际使用的布局
+    
+    布局不存在时回退到 Blank；Blank 也不存在时返回空字符串，使用 Keynote 的默认布局
+    """
+    if not layout or layout in layouts:
+        return layout
+    return "Blank" if "Blank" in layouts else ""
 
 
 class SlideTools:
     """幻灯片操作工具类"""
     
-    def __init__(self):
-        self.runner = AppleScriptRunner()
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, singleflight: Optional[SingleFlight] = None,
+                 mirror: Optional[DeckMirror] = None, catalogs: Optional[TTLCache] = None):
+        self.runner = runner or AppleScriptRunner()
+        # 合并相同的并发只读调用
+        self.singleflight = singleflight or SingleFlight()
+        # 文档模型缓存：只读查询直接读取，修改操作成功后增量更新
+        self.mirror = mirror or DeckMirror(self.runner)
+        # 布局列表等几乎不变的数据的缓存
+        self.catalogs = catalogs or TTLCache()
     
     def get_tools(self) -> List[Tool]:
         """获取所有幻灯片操作工具"""
@@ -24,7 +217,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "position": {
                             "type": "integer",
@@ -45,7 +238,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "slide_number": {
                             "type": "integer",
@@ -63,7 +256,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "slide_number": {
                             "type": "integer",
@@ -85,7 +278,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "from_position": {
                             "type": "integer",
@@ -99,6 +292,47 @@ class SlideTools:
                     "required": ["from_position", "to_position"]
                 }
             ),
+            Tool(
+                name="reorder_slides",
+                description=(
+                    "按新顺序重排所有幻灯片。在本地计算最少的移动步骤（最长递增子序列保持不动），"
+                    "在一次 AppleScript 调用中执行"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "order": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "新顺序：按新位置依次列出当前的幻灯片编号，必须包含每张幻灯片恰好一次，如 [3, 1, 2]"
+                        }
+                    },
+                    "required": ["order"]
+                }
+            ),
+            Tool(
+                name="delete_slides",
+                description="在一次 AppleScript 调用中删除多张幻灯片（从后往前删除，编号不会错位）",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "slide_numbers": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "要删除的幻灯片编号（当前编号）"
+                        }
+                    },
+                    "required": ["slide_numbers"]
+                }
+            ),
             Tool(
                 name="get_slide_count",
                 description="获取幻灯片数量",
@@ -107,7 +341,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         }
                     }
                 }
@@ -120,7 +354,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "slide_number": {
                             "type": "integer",
@@ -138,7 +372,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "slide_number": {
                             "type": "integer",
@@ -160,7 +394,7 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         },
                         "slide_number": {
                             "type": "integer",
@@ -178,10 +412,113 @@ class SlideTools:
                     "properties": {
                         "doc_name": {
                             "type": "string",
-                            "description": "文档名称（可选，默认为当前文档）"
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
                         }
                     }
                 }
+            ),
+            Tool(
+                name="dump_deck_geometry",
+                description=(
+                    "一次调用获取多张幻灯片上所有对象的位置、尺寸、类型和文本长度。"
+                    "结果为列式 JSON：slide、kind、x、y、w、h、text_length 为等长数组，"
+                    f"kind 为类型编码，对应 kinds 中的名称（{', '.join(KIND_NAMES)}）"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "first_slide": {
+                            "type": "integer",
+                            "description": "起始幻灯片编号（可选，默认为1）"
+                        },
+                        "last_slide": {
+                            "type": "integer",
+                            "description": "结束幻灯片编号（可选，包含该页，0表示到最后一张）"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="extract_deck_text",
+                description=(
+                    "批量读取幻灯片上的标题、所有文本框和形状中的文本以及演讲者备注，"
+                    "每次脚本调用读取一段幻灯片，结果按幻灯片逐条返回；"
+                    "一次最多返回 max_slides 张，还有剩余时在结果末尾给出继续读取的 first_slide"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "first_slide": {
+                            "type": "integer",
+                            "description": "起始幻灯片编号（可选，默认为1）"
+                        },
+                        "last_slide": {
+                            "type": "integer",
+                            "description": "结束幻灯片编号（可选，包含该页，0表示到最后一张）"
+                        },
+                        "max_slides": {
+                            "type": "integer",
+                            "description": "本次最多返回的幻灯片数量（可选，默认读取环境变量 KEYNOTE_MCP_TEXT_MAX_SLIDES，默认200）"
+                        },
+                        "include_notes": {
+                            "type": "boolean",
+                            "description": "是否包含演讲者备注（可选，默认true）"
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["text", "json"],
+                            "description": "每张幻灯片的输出格式：text 为可读文本，json 为 JSON 对象（可选，默认text）"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="get_presenter_notes",
+                description="在一次 AppleScript 调用中读取多张幻灯片的演讲者备注，返回幻灯片编号到备注的 JSON 对象",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "slide_numbers": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": "要读取的幻灯片编号（可选，默认为全部幻灯片）"
+                        }
+                    }
+                }
+            ),
+            Tool(
+                name="set_presenter_notes",
+                description=(
+                    "批量设置演讲者备注：所有幻灯片的备注在一次 AppleScript 调用中写入，"
+                    "参数过大时自动拆分为多次调用；格式与 get_presenter_notes 的返回结果相同"
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "doc_name": {
+                            "type": "string",
+                            "description": "文档名称或文档句柄 doc:<id>（可选，默认为当前文档）"
+                        },
+                        "notes": {
+                            "type": "object",
+                            "additionalProperties": {"type": "string"},
+                            "description": "幻灯片编号到备注文本的映射，如 {\"1\": \"开场\", \"3\": \"演示\"}（空字符串清除备注）"
+                        }
+                    },
+                    "required": ["notes"]
+                }
             )
         ]
     
@@ -191,44 +528,26 @@ class SlideTools:
             # 如果启用清除默认内容且没有指定布局，使用 Blank 布局
             if clear_default_content and layout == "":
                 layout = "Blank"
+            requested = layout
+            if layout:
+                # 按缓存的布局列表确认布局存在，模板中不再逐个尝试
+                layout = fallback_layout(layout, await self.available_layouts(doc_name))
+            
+            try:
+                with self.mirror.mutating(doc_name):
+                    result = await self.runner.run_template_async(ADD_SLIDE, doc_name, position, layout)
+            except Exception:
+                if layout:
+                    # 缓存的布局列表可能已过时
+                    self.catalogs.invalidate_document(doc_name)
+                raise
+            self.mirror.slide_added(doc_name, result)
             
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    activate
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    if {position} is 0 then
-                        set newSlide to make new slide at end of slides of targetDoc
-                    else
-                        set newSlide to make new slide at slide {position} of targetDoc
-                    end if
-                    
-                    if "{layout}" is not "" then
-                        try
-                            set base slide of newSlide to master slide "{layout}" of targetDoc
-                        on error
-                            -- 如果布局不存在，尝试使用 Blank 布局
-                            try
-                                set base slide of newSlide to master slide "Blank" of targetDoc
-                                log "Layout {layout} not found, using Blank layout"
-                            on error
-                                log "Neither {layout} nor Blank layout found, using default layout"
-                            end try
-                        end try
-                    end if
-                    
-                    return slide number of newSlide
-                end tell
-            ''')
-            
-            layout_info = f" (布局: {layout})" if layout else " (默认布局)"
+            # 布局不存在时已回退到 Blank，这里显示实际使用的布局
+            layout_info = f" (布局: {result['layout']})" if requested else " (默认布局)"
             return [TextContent(
                 type="text",
-                text=f"✅ 成功添加幻灯片，编号: {result}{layout_info}"
+                text=f"✅ 成功添加幻灯片，编号: {result['slideNumber']}{layout_info}"
             )]
             
         except Exception as e:
@@ -241,18 +560,11 @@ class SlideTools:
         """删除幻灯片"""
         try:
             validate_slide_number(slide_number)
+            self.mirror.check_slide(doc_name, slide_number)
             
-            self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    delete slide {slide_number} of targetDoc
-                end tell
-            ''')
+            with self.mirror.mutating(doc_name):
+                await self.runner.run_template_async(DELETE_SLIDE, doc_name, slide_number)
+            self.mirror.slide_deleted(doc_name, slide_number)
             
             return [TextContent(
                 type="text",
@@ -265,29 +577,91 @@ class SlideTools:
                 text=f"❌ 删除幻灯片失败: {str(e)}"
             )]
     
+    async def delete_slides(self, slide_numbers: List[int], doc_name: str = "") -> List[TextContent]:
+        """批量删除幻灯片"""
+        try:
+            if not isinstance(slide_numbers, list) or not slide_numbers:
+                raise ParameterError("slide_numbers must be a non-empty list")
+            for slide_number in slide_numbers:
+                validate_slide_number(slide_number)
+                self.mirror.check_slide(doc_name, slide_number)
+            
+            # 从后往前删除，前面的幻灯片编号不受影响
+            numbers = sorted(set(slide_numbers), reverse=True)
+            operations = [BatchOperation(DELETE_SLIDE, [slide_number]) for slide_number in numbers]
+            with self.mirror.mutating(doc_name):
+                results = await self.runner.run_batch_async(operations, doc_name, True)
+            
+            failed = next((result for result in results if not result.ok), None)
+            if failed is not None:
+                self.mirror.invalidate(doc_name)
+                deleted = sum(1 for result in results if result.ok)
+                raise ParameterError(f"deleted {deleted}/{len(numbers)} slides before an error: {failed.error}")
+            for slide_number in numbers:
+                self.mirror.slide_deleted(doc_name, slide_number)
+            
+            return [TextContent(
+                type="text",
+                text=f"✅ 成功删除 {len(numbers)} 张幻灯片: {', '.join(str(number) for number in sorted(numbers))}"
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 批量删除幻灯片失败: {str(e)}"
+            )]
+    
+    async def reorder_slides(self, order: List[int], doc_name: str = "") -> List[TextContent]:
+        """按新顺序重排幻灯片，只执行最少的移动"""
+        try:
+            deck = await self.mirror.get(doc_name)
+            if not isinstance(order, list) or sorted(order) != list(range(1, deck.slide_count + 1)):
+                raise ParameterError(
+                    f"order must list every slide number from 1 to {deck.slide_count} exactly once"
+                )
+            
+            # 当前每张幻灯片的目标下标
+            target_of = {slide_number: index for index, slide_number in enumerate(order)}
+            moves = plan_moves([target_of[slide_number] for slide_number in range(1, deck.slide_count + 1)])
+            if not moves:
+                return [TextContent(
+                    type="text",
+                    text=f"✅ 幻灯片已是目标顺序，无需移动（{deck.slide_count} 张）"
+                )]
+            
+            operations = [BatchOperation(MOVE_SLIDE, list(move)) for move in moves]
+            with self.mirror.mutating(doc_name):
+                results = await self.runner.run_batch_async(operations, doc_name, True)
+            failed = next((result for result in results if not result.ok), None)
+            if failed is not None:
+                self.mirror.invalidate(doc_name)
+                raise ParameterError(f"move failed, deck order is partially applied: {failed.error}")
+            for from_position, to_position in moves:
+                self.mirror.slide_moved(doc_name, from_position, to_position)
+            
+            return [TextContent(
+                type="text",
+                text=(
+                    f"✅ 成功重排 {deck.slide_count} 张幻灯片：移动 {len(moves)} 次，"
+                    f"{deck.slide_count - len(moves)} 张保持不动（1 次脚本调用）"
+                )
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 重排幻灯片失败: {str(e)}"
+            )]
+    
     async def duplicate_slide(self, slide_number: int, doc_name: str = "", new_position: int = 0) -> List[TextContent]:
         """复制幻灯片"""
         try:
             validate_slide_number(slide_number)
+            self.mirror.check_slide(doc_name, slide_number)
             
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    set sourceSlide to slide {slide_number} of targetDoc
-                    set newSlide to duplicate sourceSlide
-                    
-                    if {new_position} is not 0 then
-                        move newSlide to slide {new_position} of targetDoc
-                    end if
-                    
-                    return slide number of newSlide
-                end tell
-            ''')
+            with self.mirror.mutating(doc_name):
+                result = await self.runner.run_template_async(DUPLICATE_SLIDE, doc_name, slide_number, new_position)
+            self.mirror.slide_duplicated(doc_name, slide_number, result)
             
             return [TextContent(
                 type="text",
@@ -305,19 +679,12 @@ class SlideTools:
         try:
             validate_slide_number(from_position)
             validate_slide_number(to_position)
+            self.mirror.check_slide(doc_name, from_position)
+            self.mirror.check_slide(doc_name, to_position)
             
-            self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    set sourceSlide to slide {from_position} of targetDoc
-                    move sourceSlide to slide {to_position} of targetDoc
-                end tell
-            ''')
+            with self.mirror.mutating(doc_name):
+                await self.runner.run_template_async(MOVE_SLIDE, doc_name, from_position, to_position)
+            self.mirror.slide_moved(doc_name, from_position, to_position)
             
             return [TextContent(
                 type="text",
@@ -330,24 +697,15 @@ class SlideTools:
                 text=f"❌ 移动幻灯片失败: {str(e)}"
             )]
     
+    @coalesced
     async def get_slide_count(self, doc_name: str = "") -> List[TextContent]:
         """获取幻灯片数量"""
         try:
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    return count of slides of targetDoc
-                end tell
-            ''')
+            deck = await self.mirror.get(doc_name)
             
             return [TextContent(
                 type="text",
-                text=f"📊 幻灯片数量: {result}"
+                text=f"📊 幻灯片数量: {deck.slide_count}"
             )]
             
         except Exception as e:
@@ -360,18 +718,9 @@ class SlideTools:
         """选择指定幻灯片"""
         try:
             validate_slide_number(slide_number)
+            self.mirror.check_slide(doc_name, slide_number)
             
-            self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    set current slide of targetDoc to slide {slide_number} of targetDoc
-                end tell
-            ''')
+            await self.runner.run_template_async(SELECT_SLIDE, doc_name, slide_number)
             
             return [TextContent(
                 type="text",
@@ -388,39 +737,20 @@ class SlideTools:
         """设置幻灯片布局"""
         try:
             validate_slide_number(slide_number)
+            self.mirror.check_slide(doc_name, slide_number)
             
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    try
-                        -- 找到目标布局
-                        set targetLayout to missing value
-                        repeat with masterSlide in master slides of targetDoc
-                            if name of masterSlide is "{layout}" then
-                                set targetLayout to masterSlide
-                                exit repeat
-                            end if
-                        end repeat
-                        
-                        if targetLayout is missing value then
-                            return "layout_not_found"
-                        end if
-                        
-                        -- 设置幻灯片布局（使用正确的语法：base slide）
-                        set base slide of slide {slide_number} of targetDoc to targetLayout
-                        return "success"
-                    on error errMsg
-                        return "error: " & errMsg
-                    end try
-                end tell
-            ''')
+            # 布局不存在时直接返回，不执行设置脚本
+            if layout not in await self.available_layouts(doc_name):
+                result = "layout_not_found"
+            else:
+                with self.mirror.mutating(doc_name):
+                    result = await self.runner.run_template_async(SET_SLIDE_LAYOUT, doc_name, slide_number, layout)
+                if result == "layout_not_found":
+                    # 缓存的布局列表已过时
+                    self.catalogs.invalidate_document(doc_name)
             
             if result == "success":
+                self.mirror.layout_set(doc_name, slide_number, layout)
                 return [TextContent(
                     type="text",
                     text=f"✅ 成功设置幻灯片 {slide_number} 的布局为: {layout}"
@@ -442,52 +772,18 @@ class SlideTools:
                 text=f"❌ 设置幻灯片布局失败: {str(e)}"
             )]
     
+    @coalesced
     async def get_slide_info(self, slide_number: int, doc_name: str = "") -> List[TextContent]:
         """获取幻灯片信息"""
         try:
             validate_slide_number(slide_number)
             
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    set targetSlide to slide {slide_number} of targetDoc
-                    set slideInfo to {{}}
-                    
-                    set end of slideInfo to slide number of targetSlide
-                    
-                    try
-                        set end of slideInfo to name of master slide of targetSlide
-                    on error
-                        set end of slideInfo to "Unknown Layout"
-                    end try
-                    
-                    try
-                        set end of slideInfo to count of text items of targetSlide
-                    on error
-                        set end of slideInfo to 0
-                    end try
-                    
-                    return slideInfo as string
-                end tell
-            ''')
-            
-            info_parts = result.replace("{", "").replace("}", "").split(", ")
-            if len(info_parts) >= 3:
-                number, layout, text_count = info_parts[0], info_parts[1], info_parts[2]
-                return [TextContent(
-                    type="text",
-                    text=f"📊 幻灯片 {slide_number} 信息:\n• 编号: {number}\n• 布局: {layout}\n• 文本框数量: {text_count}"
-                )]
-            else:
-                return [TextContent(
-                    type="text",
-                    text=f"📊 幻灯片 {slide_number} 信息: {result}"
-                )]
+            slide = (await self.mirror.get(doc_name)).slide(slide_number)
+            
+            return [TextContent(
+                type="text",
+                text=f"📊 幻灯片 {slide_number} 信息:\n• 编号: {slide_number}\n• 布局: {slide.layout}\n• 文本框数量: {slide.text_item_count}"
+            )]
                 
         except Exception as e:
             return [TextContent(
@@ -495,34 +791,14 @@ class SlideTools:
                 text=f"❌ 获取幻灯片信息失败: {str(e)}"
             )]
     
+    @coalesced
     async def get_available_layouts(self, doc_name: str = "") -> List[TextContent]:
         """获取可用布局列表"""
         try:
-            result = self.runner.run_inline_script(f'''
-                tell application "Keynote"
-                    if "{doc_name}" is "" then
-                        set targetDoc to front document
-                    else
-                        set targetDoc to document "{doc_name}"
-                    end if
-                    
-                    set layoutList to {{}}
-                    repeat with masterSlide in master slides of targetDoc
-                        set end of layoutList to name of masterSlide
-                    end repeat
-                    
-                    -- 使用特殊分隔符来避免布局名称中的逗号问题
-                    set AppleScript's text item delimiters to "|||"
-                    set layoutString to layoutList as string
-                    set AppleScript's text item delimiters to ""
-                    
-                    return layoutString
-                end tell
-            ''')
+            result = await self.available_layouts(doc_name)
             
             if result:
-                layouts = result.split("|||")
-                layout_list = "\n".join([f"• {layout.strip()}" for layout in layouts if layout.strip()])
+                layout_list = "\n".join([f"• {layout.strip()}" for layout in result if layout.strip()])
                 return [TextContent(
                     type="text",
                     text=f"📐 可用布局:\n{layout_list}"
@@ -537,4 +813,190 @@ class SlideTools:
             return [TextContent(
                 type="text",
                 text=f"❌ 获取布局列表失败: {str(e)}"
-            )] 
\ No newline at end of file
+            )]
+    
+    async def dump_deck_geometry(self, doc_name: str = "", first_slide: int = 1, last_slide: int = 0) -> List[TextContent]:
+        """获取幻灯片上所有对象的几何信息（列式）"""
+        try:
+            validate_slide_number(first_slide)
+            if last_slide:
+                validate_slide_number(last_slide)
+                if last_slide < first_slide:
+                    raise ParameterError(f"last_slide {last_slide} is before first_slide {first_slide}")
+            self.mirror.check_slide(doc_name, first_slide)
+            
+            geometry = await self.runner.dump_deck_geometry_async(doc_name, first_slide, last_slide)
+            
+            return [TextContent(
+                type="text",
+                text=f"📐 幻灯片几何信息（{geometry['item_count']} 个对象）:\n" + json.dumps(geometry, separators=(",", ":"))
+            )]
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 获取幻灯片几何信息失败: {str(e)}"
+            )]
+    
+    async def extract_deck_text(self, doc_name: str = "", first_slide: int = 1, last_slide: int = 0,
+                                include_notes: bool = True, format: str = "text",
+                                max_slides: int = 0) -> List[TextContent]:
+        """
+        批量读取幻灯片文本，每张幻灯片一条结果
+        
+        MCP 响应需要一次返回，结果在内存中缓冲；max_slides 限制单次返回的幻灯片数量，
+        超出部分通过结果末尾给出的 first_slide 继续读取
+        """
+        try:
+            validate_slide_number(first_slide)
+            if last_slide:
+                validate_slide_number(last_slide)
+                if last_slide < first_slide:
+                    raise ParameterError(f"last_slide {last_slide} is before first_slide {first_slide}")
+            if format not in ("text", "json"):
+                raise ParameterError(f"Unsupported format: {format}")
+            max_slides = max_slides or env_int("KEYNOTE_MCP_TEXT_MAX_SLIDES", 200)
+            if max_slides < 1:
+                raise ParameterError(f"max_slides must be at least 1, got {max_slides}")
+            self.mirror.check_slide(doc_name, first_slide)
+            
+            # 多读取一张，只用于判断是否还有剩余的幻灯片（它总是最后一张，读取随之结束）
+            stop = first_slide + max_slides
+            if last_slide:
+                stop = min(stop, last_slide)
+            contents = []
+            has_more = False
+            async for slide in iter_slide_text(self.runner, doc_name, first_slide, stop):
+                if len(contents) == max_slides:
+                    has_more = True
+                    continue
+                if format == "json":
+                    data = slide.to_dict()
+                    if not include_notes:
+                        del data["notes"]
+                    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+                else:
+                    text = self._format_slide_text(slide, include_notes)
+                contents.append(TextContent(type="text", text=text))
+            
+            if not contents:
+                return [TextContent(
+                    type="text",
+                    text="📄 文档中没有幻灯片"
+                )]
+            last = first_slide + len(contents) - 1
+            result = [TextContent(
+                type="text",
+                text=f"📄 幻灯片文本（第 {first_slide}-{last} 张，共 {len(contents)} 张）"
+            )] + contents
+            if has_more:
+                result.append(TextContent(
+                    type="text",
+                    text=f"⏭️ 还有更多幻灯片，使用 first_slide={last + 1} 继续读取"
+                ))
+            return result
+            
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 读取幻灯片文本失败: {str(e)}"
+            )]
+    
+    @staticmethod
+    def _format_slide_text(slide: SlideText, include_notes: bool) -> str:
+        """单张幻灯片文本的可读格式"""
+        lines = [f"## 幻灯片 {slide.slide_number}"]
+        if slide.title:
+            lines.append(f"标题: {slide.title}")
+        for text in list(slide.texts) + list(slide.shape_texts):
+            if text.strip() and text != slide.title:
+                lines.append(text)
+        if include_notes and slide.notes.strip():
+            lines.append(f"备注: {slide.notes}")
+        if len(lines) == 1:
+            lines.append("（无文本）")
+        return "\n".join(lines)
+    
+    async def get_presenter_notes(self, slide_numbers: Optional[List[int]] = None,
+                                  doc_name: str = "") -> List[TextContent]:
+        """批量读取演讲者备注"""
+        try:
+            slide_numbers = slide_numbers or []
+            if not isinstance(slide_numbers, list):
+                raise ParameterError("slide_numbers must be a list")
+            for slide_number in slide_numbers:
+                validate_slide_number(slide_number)
+                self.mirror.check_slide(doc_name, slide_number)
+            
+            dump = await self.runner.run_template_async(DUMP_PRESENTER_NOTES, doc_name, slide_numbers)
+            missing = missing_slides(slide_numbers, dump)
+            if missing:
+                raise ParameterError(
+                    f"Slide number {missing[0]} out of range: document has {dump['slideCount']} slides"
+                )
+            notes = notes_from_dump(dump)
+            
+            with_notes = sum(1 for text in notes.values() if text.strip())
+            return [TextContent(
+                type="text",
+                text=f"📝 演讲者备注（{len(notes)} 张幻灯片，{with_notes} 张有备注）:\n"
+                     + json.dumps({str(number): text for number, text in notes.items()}, ensure_ascii=False)
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 读取演讲者备注失败: {str(e)}"
+            )]
+    
+    async def set_presenter_notes(self, notes: Dict[str, str], doc_name: str = "") -> List[TextContent]:
+        """批量设置演讲者备注"""
+        try:
+            if not isinstance(notes, dict) or not notes:
+                raise ParameterError("notes must be a non-empty object")
+            slide_notes: Dict[int, str] = {}
+            for key, text in notes.items():
+                try:
+                    slide_number = int(key)
+                except (TypeError, ValueError):
+                    raise ParameterError(f"Invalid slide number: {key}")
+                validate_slide_number(slide_number)
+                self.mirror.check_slide(doc_name, slide_number)
+                if not isinstance(text, str):
+                    raise ParameterError(f"Notes for slide {slide_number} must be a string")
+                slide_notes[slide_number] = text
+            
+            # 备注不影响文档模型中的布局和对象，写入后无需更新模型
+            batches = plan_notes_batches(slide_notes)
+            written = set()
+            for operations in batches:
+                results = await self.runner.run_batch_async(operations, doc_name, True)
+                for operation, result in zip(operations, results):
+                    slide_number = operation.args[0]
+                    if result.ok:
+                        written.add(slide_number)
+                    elif result.executed:
+                        # 超长备注分段写入时，失败的幻灯片可能只写入了一部分
+                        written.discard(slide_number)
+                        return [TextContent(
+                            type="text",
+                            text=(
+                                f"❌ 设置演讲者备注失败（已写入 {len(written)}/{len(slide_notes)} 张）: "
+                                f"幻灯片 {slide_number}: {result.error}"
+                            )
+                        )]
+            
+            return [TextContent(
+                type="text",
+                text=f"✅ 成功设置 {len(slide_notes)} 张幻灯片的演讲者备注（{len(batches)} 次脚本调用）"
+            )]
+        
+        except Exception as e:
+            return [TextContent(
+                type="text",
+                text=f"❌ 设置演讲者备注失败: {str(e)}"
+            )]
+    
+    async def available_layouts(self, doc_name: str = "") -> List[str]:
+        """获取文档可用布局名称列表（带缓存）"""
+        return await load_available_layouts(self.runner, self.catalogs, doc_name)
\ No newline at end of file
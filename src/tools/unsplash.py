@@ -10,13 +10,17 @@ import aiofiles
 from pathlib import Path
 from mcp.types import Tool, TextContent
 from ..utils import AppleScriptRunner, validate_slide_number, ParameterError
+from ..utils.deck_mirror import DeckMirror
+from .content import ADD_IMAGE
 
 
 class UnsplashTools:
     """Unsplash配图工具类"""
     
-    def __init__(self):
-        self.runner = AppleScriptRunner()
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, mirror: Optional[DeckMirror] = None):
+        self.runner = runner or AppleScriptRunner()
+        # 文档模型缓存：添加图片后更新幻灯片的对象数量
+        self.mirror = mirror or DeckMirror(self.runner)
         
         # 尝试加载 .env 文件
         self._load_env_if_needed()
@@ -426,55 +430,14 @@ class UnsplashTools:
             # 转换为绝对路径
             abs_path = os.path.abspath(image_path)
             
-            # 构建位置参数
-            position_params = ""
-            if x is not None and y is not None:
-                position_params = f", position:{{{x}, {y}}}"
+            # 只有同时指定 x 和 y 时才设置位置
+            if x is None or y is None:
+                x = y = None
             
-            # 使用修正后的AppleScript语法（基于独立脚本中成功的实现）
-            script = f'''
-            tell application "Keynote"
-                activate
-                set targetDoc to front document
-                
-                tell targetDoc
-                    tell slide {slide_number}
-                        -- 使用修正后的语法
-                        set imageFile to POSIX file "{abs_path}" as alias
-                        
-                        -- 方法1: 尝试标准image对象
-                        try
-                            set newImage to make new image with properties {{file:imageFile{position_params}}}
-                            return "image_success"
-                        on error
-                            -- 方法2: 尝试movie对象
-                            try
-                                set newMovie to make new movie with properties {{file:imageFile{position_params}}}
-                                return "movie_success"
-                            on error
-                                -- 方法3: 使用剪贴板方法
-                                try
-                                    tell application "Finder"
-                                        select imageFile
-                                        copy selection
-                                    end tell
-                                    
-                                    delay 0.5
-                                    paste
-                                    
-                                    return "clipboard_success"
-                                on error
-                                    error "所有图片添加方法都失败"
-                                end try
-                            end try
-                        end try
-                    end tell
-                end tell
-            end tell
-            '''
-            
-            # 执行AppleScript
-            result = self.runner.run_inline_script(script)
+            # 与 add_image 共用同一个模板
+            with self.mirror.mutating(""):
+                result = await self.runner.run_template_async(ADD_IMAGE, "", slide_number, abs_path, x, y)
+            self.mirror.item_added("", slide_number, text=False)
             
         except Exception as e:
             error_msg = f"添加图片到幻灯片失败: {e}"
@@ -3,6 +3,7 @@ Utility modules for Keynote-MCP
 """
 
 from .applescript_runner import AppleScriptRunner
+from .script_library import CompiledScriptCache
 from .error_handler import (
     KeynoteError, 
     AppleScriptError, 
@@ -15,6 +16,7 @@ from .error_handler import (
 
 __all__ = [
     'AppleScriptRunner', 
+    'CompiledScriptCache',
     'KeynoteError', 
     'AppleScriptError', 
     'FileOperationError',
@@ -2,24 +2,44 @@
 AppleScript execution utilities for Keynote-MCP
 """
 
+import asyncio
 import subprocess
 import os
 import json
-from typing import Any, Dict, List, Optional, Union
+import shlex
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 
-from .error_handler import handle_applescript_error, AppleScriptError
+from .error_handler import handle_applescript_error, raise_script_error, AppleScriptError, ParameterError
+from .config import env_bool, env_int, env_str
+from .osascript_pool import OsascriptWorkerPool, WorkerUnavailableError, encode_call_payload
+from .script_library import CompiledScriptCache, encode_argument
+from .script_templates import (
+    BatchOperation, BatchResult, ScriptTemplate, batch_program_name, parse_batch_output,
+    program_name, render_batch_program, templates
+)
+from .geometry import DUMP_GEOMETRY, geometry_from_dump
 
 
 class AppleScriptRunner:
     """AppleScript 执行器"""
     
-    def __init__(self, script_dir: Optional[str] = None):
+    def __init__(self, script_dir: Optional[str] = None, pool_size: Optional[int] = None,
+                 pool_max_executions: Optional[int] = None, worker_command: Optional[List[str]] = None,
+                 headless: Optional[bool] = None):
         """
         初始化 AppleScript 执行器
         
         Args:
             script_dir: AppleScript 脚本目录路径
+            pool_size: 常驻 osascript 工作进程数量，0 表示每次调用启动新进程
+                （默认读取环境变量 KEYNOTE_MCP_POOL_SIZE）
+            pool_max_executions: 单个工作进程执行多少次后回收
+                （默认读取环境变量 KEYNOTE_MCP_POOL_MAX_RUNS）
+            worker_command: 工作进程启动命令
+                （默认读取环境变量 KEYNOTE_MCP_POOL_WORKER，否则使用 osascript_worker.js）
+            headless: 无界面模式，脚本不再激活 Keynote 窗口、不抢占焦点
+                （默认读取环境变量 KEYNOTE_MCP_HEADLESS）
         """
         if script_dir is None:
             # 默认脚本目录
@@ -28,41 +48,232 @@ class AppleScriptRunner:
         
         self.script_dir = Path(script_dir)
         self._ensure_script_dir()
+        
+        self.timeout = 30  # 30秒超时
+        self.batch_operation_timeout = 2  # 批处理中每个操作额外增加的超时时间（秒）
+        self.headless = env_bool("KEYNOTE_MCP_HEADLESS") if headless is None else headless
+        
+        # 异步执行的并发上限（默认读取环境变量 KEYNOTE_MCP_MAX_CONCURRENCY）
+        self.max_concurrency = max(1, env_int("KEYNOTE_MCP_MAX_CONCURRENCY", 4))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        
+        if pool_size is None:
+            pool_size = env_int("KEYNOTE_MCP_POOL_SIZE", 0)
+        if pool_max_executions is None:
+            pool_max_executions = env_int("KEYNOTE_MCP_POOL_MAX_RUNS", 100)
+        if worker_command is None:
+            command = env_str("KEYNOTE_MCP_POOL_WORKER")
+            worker_command = shlex.split(command) if command else None
+        
+        self._compiled_scripts: Optional[CompiledScriptCache] = None
+        # 按当前文档执行的模板和批处理报告当前文档的 id 时调用（参数为 document id）
+        self.front_document_listeners: List[Callable[[str], None]] = []
+        
+        self.pool: Optional[OsascriptWorkerPool] = None
+        if pool_size > 0:
+            self.pool = OsascriptWorkerPool(
+                size=pool_size,
+                max_executions=pool_max_executions,
+                command=worker_command
+            )
     
     def _ensure_script_dir(self) -> None:
         """确保脚本目录存在"""
         if not self.script_dir.exists():
             self.script_dir.mkdir(parents=True, exist_ok=True)
     
-    def run_script(self, script_name: str, function_name: str, *args) -> str:
+    @property
+    def compiled_scripts(self) -> CompiledScriptCache:
+        """模板和批处理程序的编译缓存（首次访问时创建）"""
+        if self._compiled_scripts is None:
+            self._compiled_scripts = CompiledScriptCache(self)
+        return self._compiled_scripts
+    
+    def run_template(self, template: Union[str, ScriptTemplate], *args) -> Any:
         """
-        运行 AppleScript 脚本中的指定函数
+        运行脚本模板
+        
+        模板文本固定，首次使用时编译并缓存，参数通过 argv 传入
         
         Args:
-            script_name: 脚本文件名（不含扩展名）
-            function_name: 函数名
-            *args: 函数参数
+            template: 模板名或模板对象
+            *args: 模板参数
             
         Returns:
-            脚本执行结果
+            模板返回值（由 JSON 结果解码得到的 str / int / float / bool / list / dict）
+        """
+        script_path, argv = self._prepare_template(template, args)
+        return self._template_result(self.run_compiled_script(script_path, argv))
+    
+    async def run_template_async(self, template: Union[str, ScriptTemplate], *args,
+                                 timeout: Optional[float] = None) -> Any:
+        """异步运行脚本模板（参数同 run_template）"""
+        loop = asyncio.get_event_loop()
+        # 首次使用时需要编译，放到线程池中避免阻塞事件循环
+        script_path, argv = await loop.run_in_executor(None, self._prepare_template, template, args)
+        return self._template_result(await self.run_compiled_script_async(script_path, argv, timeout))
+    
+    def _prepare_template(self, template: Union[str, ScriptTemplate], args: Sequence[Any]) -> Tuple[Path, List[str]]:
+        """编译模板（已缓存时直接返回）并编码参数"""
+        template = templates.get(template)
+        template.check_arguments(args)
+        script_path = self.compiled_scripts.compile_source(
+            program_name(f"template_{template.name}", self.headless), template.render_program(self.headless)
+        )
+        return script_path, [encode_argument(arg) for arg in args]
+    
+    def run_batch(self, operations: Sequence[BatchOperation], doc_name: str = "",
+                  stop_on_error: bool = True) -> List[BatchResult]:
+        """
+        在一次脚本调用中依次执行多个模板操作
+        
+        文档只解析一次，每个操作单独报告成功或失败
+        
+        Args:
+            operations: 操作列表（模板均需以 docRef 为第一个参数）
+            doc_name: 目标文档名称，空字符串表示当前文档
+            stop_on_error: 遇到失败时是否停止执行后续操作
+            
+        Returns:
+            与 operations 顺序一致的执行结果，未执行的操作 executed 为 False
+        """
+        if not operations:
+            return []
+        script_path, argv = self._prepare_batch(operations, doc_name, stop_on_error)
+        return parse_batch_output(self._template_result(self.run_compiled_script(script_path, argv)), len(operations))
+    
+    async def run_batch_async(self, operations: Sequence[BatchOperation], doc_name: str = "",
+                              stop_on_error: bool = True, timeout: Optional[float] = None) -> List[BatchResult]:
+        """
+        异步执行批处理（参数同 run_batch）
+        
+        未指定 timeout 时，超时时间按操作数量在 self.timeout 的基础上递增
+        """
+        if not operations:
+            return []
+        if timeout is None:
+            timeout = self.timeout + self.batch_operation_timeout * len(operations)
+        
+        loop = asyncio.get_event_loop()
+        script_path, argv = await loop.run_in_executor(
+            None, self._prepare_batch, operations, doc_name, stop_on_error
+        )
+        output = await self.run_compiled_script_async(script_path, argv, timeout)
+        return parse_batch_output(self._template_result(output), len(operations))
+    
+    def dump_deck_geometry(self, doc_name: str = "", first_slide: int = 1, last_slide: int = 0) -> Dict[str, Any]:
+        """
+        在一次脚本调用中导出幻灯片上所有对象的几何信息
+        
+        Args:
+            doc_name: 文档名称或句柄，空字符串表示当前文档
+            first_slide: 起始幻灯片编号
+            last_slide: 结束幻灯片编号（包含），0 表示到最后一张
+            
+        Returns:
+            列式几何数据，见 geometry_from_dump
+        """
+        return geometry_from_dump(self.run_template(DUMP_GEOMETRY, doc_name, first_slide, last_slide))
+    
+    async def dump_deck_geometry_async(self, doc_name: str = "", first_slide: int = 1, last_slide: int = 0,
+                                       timeout: Optional[float] = None) -> Dict[str, Any]:
+        """异步导出几何信息（参数同 dump_deck_geometry）"""
+        dump = await self.run_template_async(DUMP_GEOMETRY, doc_name, first_slide, last_slide, timeout=timeout)
+        return geometry_from_dump(dump)
+    
+    def _prepare_batch(self, operations: Sequence[BatchOperation], doc_name: str,
+                       stop_on_error: bool) -> Tuple[Path, List[str]]:
+        """编译批处理程序（按模板集合缓存）并编码全部操作的参数"""
+        batch_templates = []
+        argv = [encode_argument(doc_name), encode_argument(stop_on_error)]
+        
+        for operation in operations:
+            template = templates.get(operation.template)
+            if not template.document:
+                raise ParameterError(f"Template {template.name} does not target a document and cannot be batched")
+            args = list(operation.args)
+            template.check_arguments(["docRef"] + args)
+            batch_templates.append(template)
+            
+            argv.append(template.name)
+            argv.append(operation.expect or "")
+            argv.append(str(len(args)))
+            argv.extend(encode_argument(arg) for arg in args)
+        
+        script_path = self.compiled_scripts.compile_source(
+            batch_program_name(batch_templates, self.headless),
+            render_batch_program(batch_templates, self.headless)
+        )
+        return script_path, argv
+    
+    @staticmethod
+    def parse_result(output: str) -> Any:
+        """
+        解析脚本输出的 JSON 结果信封
+        
+        Args:
+            output: 脚本输出，格式为 {"ok":true,"value":...} 或 {"ok":false,"error":...,"number":...}
+            
+        Returns:
+            结果值
             
         Raises:
-            AppleScriptError: 脚本执行错误
+            AppleScriptError: 脚本报告错误（按错误码映射为对应异常）或输出格式无效
         """
-        script_path = self.script_dir / f"{script_name}.scpt"
+        return AppleScriptRunner._envelope_value(AppleScriptRunner._parse_envelope(output))
+    
+    @staticmethod
+    def _parse_envelope(output: str) -> Dict[str, Any]:
+        try:
+            envelope = json.loads(output, strict=False)
+        except ValueError:
+            raise AppleScriptError(f"Invalid script result: {output[:200]}")
         
-        if not script_path.exists():
-            raise AppleScriptError(f"Script file not found: {script_path}")
+        if not isinstance(envelope, dict) or "ok" not in envelope:
+            raise AppleScriptError(f"Invalid script result: {output[:200]}")
+        return envelope
         
-        # 构建 AppleScript 调用命令
-        script_args = self._format_args(*args)
-        applescript_code = f"""
-        set scriptFile to "{script_path}"
-        set scriptObj to load script POSIX file scriptFile
-        tell scriptObj to {function_name}({script_args})
+    @staticmethod
+    def _envelope_value(envelope: Dict[str, Any]) -> Any:
+        if envelope["ok"]:
+            return envelope.get("value")
+        
+        raise_script_error(envelope.get("error", ""), envelope.get("number"))
+    
+    def _template_result(self, output: str) -> Any:
+        """解析模板或批处理的结果信封；信封附带当前文档的 id 时通知 front_document_listeners"""
+        envelope = self._parse_envelope(output)
+        front = envelope.get("front")
+        if front is not None:
+            for listener in self.front_document_listeners:
+                listener(str(front))
+        return self._envelope_value(envelope)
+    
+    def run_compiled_script(self, script_path: Union[str, Path], argv: Sequence[str] = ()) -> str:
         """
+        以 argv 运行已编译脚本（.scpt）的 run 处理器
         
-        return self._execute_applescript(applescript_code)
+        Args:
+            script_path: 已编译脚本路径
+            argv: 字符串参数
+            
+        Returns:
+            脚本执行结果
+        """
+        argv = [str(arg) for arg in argv]
+        return self._run(
+            "CALL", encode_call_payload(str(script_path), argv),
+            ["osascript", str(script_path)] + argv
+        )
+    
+    async def run_compiled_script_async(self, script_path: Union[str, Path], argv: Sequence[str] = (),
+                                        timeout: Optional[float] = None) -> str:
+        """异步运行已编译脚本（参数同 run_compiled_script）"""
+        argv = [str(arg) for arg in argv]
+        return await self._run_async(
+            "CALL", encode_call_payload(str(script_path), argv),
+            ["osascript", str(script_path)] + argv, timeout
+        )
     
     def run_inline_script(self, script_code: str) -> str:
         """
@@ -76,6 +287,125 @@ class AppleScriptRunner:
         """
         return self._execute_applescript(script_code)
     
+    async def run_inline_script_async(self, script_code: str, timeout: Optional[float] = None) -> str:
+        """
+        异步运行内联 AppleScript 代码，不阻塞事件循环
+        
+        Args:
+            script_code: AppleScript 代码
+            timeout: 超时时间（秒），默认使用 self.timeout
+            
+        Returns:
+            脚本执行结果
+        """
+        return await self._execute_applescript_async(script_code, timeout)
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """获取并发限制信号量（在事件循环内延迟创建）"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def _execute_applescript_async(self, script_code: str, timeout: Optional[float] = None) -> str:
+        """
+        异步执行 AppleScript 代码
+        
+        Args:
+            script_code: AppleScript 代码
+            timeout: 超时时间（秒），默认使用 self.timeout
+            
+        Returns:
+            执行结果
+        """
+        return await self._run_async(
+            "RUN", script_code.encode("utf-8"), ["osascript", "-e", script_code], timeout
+        )
+    
+    async def _run_async(self, kind: str, payload: bytes, command: List[str],
+                         timeout: Optional[float] = None) -> str:
+        """
+        异步执行一个脚本请求
+        
+        同时运行的脚本数量受 max_concurrency 限制；调用被取消时会终止对应的子进程
+        
+        Args:
+            kind: 工作进程请求类型（RUN / CALL）
+            payload: 工作进程请求负载
+            command: 回退到一次性执行时使用的 osascript 命令
+            timeout: 超时时间（秒），默认使用 self.timeout
+            
+        Returns:
+            执行结果
+        """
+        timeout = self.timeout if timeout is None else timeout
+        
+        async with self._get_semaphore():
+            if self.pool is not None:
+                try:
+                    return await self._submit_to_pool_async(kind, payload, timeout)
+                except WorkerUnavailableError:
+                    # 回退到一次性执行
+                    pass
+            
+            return await self._execute_oneshot_async(command, timeout)
+    
+    async def _submit_to_pool_async(self, kind: str, payload: bytes, timeout: float) -> str:
+        """在常驻工作进程中异步执行脚本请求"""
+        loop = asyncio.get_event_loop()
+        
+        acquire_future = loop.run_in_executor(None, self.pool.acquire, timeout)
+        try:
+            worker = await asyncio.shield(acquire_future)
+        except asyncio.CancelledError:
+            # 调用已取消，工作进程获取成功后立即归还
+            def _release(future: "asyncio.Future") -> None:
+                if not future.cancelled() and future.exception() is None:
+                    self.pool.release(future.result())
+            acquire_future.add_done_callback(_release)
+            raise
+        
+        try:
+            return await loop.run_in_executor(None, self.pool.submit_on, worker, kind, payload, timeout)
+        except asyncio.CancelledError:
+            # 终止工作进程，执行线程读到 EOF 后会将其回收
+            worker.abort()
+            raise
+    
+    async def _execute_oneshot_async(self, command: List[str], timeout: float) -> str:
+        """启动独立的 osascript 子进程异步执行脚本"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            raise AppleScriptError(f"Failed to execute AppleScript: {e}")
+        
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self._kill_process(process)
+            raise AppleScriptError("AppleScript execution timed out")
+        except asyncio.CancelledError:
+            await self._kill_process(process)
+            raise
+        
+        if process.returncode != 0:
+            handle_applescript_error(stderr.decode("utf-8", errors="replace"))
+        
+        return stdout.decode("utf-8", errors="replace").strip()
+    
+    @staticmethod
+    async def _kill_process(process: "asyncio.subprocess.Process") -> None:
+        """终止子进程并回收"""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+    
     def _execute_applescript(self, script_code: str) -> str:
         """
         执行 AppleScript 代码
@@ -83,16 +413,51 @@ class AppleScriptRunner:
         Args:
             script_code: AppleScript 代码
             
+        Returns:
+            执行结果
+        """
+        return self._run("RUN", script_code.encode("utf-8"), ["osascript", "-e", script_code])
+    
+    def _run(self, kind: str, payload: bytes, command: List[str]) -> str:
+        """
+        执行一个脚本请求
+        
+        启用进程池时交给常驻工作进程执行，没有可用工作进程时回退到一次性 osascript 进程
+        
+        Args:
+            kind: 工作进程请求类型（RUN / CALL）
+            payload: 工作进程请求负载
+            command: 回退到一次性执行时使用的 osascript 命令
+            
+        Returns:
+            执行结果
+        """
+        if self.pool is not None:
+            try:
+                return self.pool.submit(kind, payload, timeout=self.timeout)
+            except WorkerUnavailableError:
+                # 回退到一次性执行
+                pass
+        
+        return self._execute_oneshot(command)
+    
+    def _execute_oneshot(self, command: List[str]) -> str:
+        """
+        启动独立的 osascript 进程执行脚本
+        
+        Args:
+            command: osascript 命令及参数
+            
         Returns:
             执行结果
         """
         try:
             # 使用 osascript 执行 AppleScript
             result = subprocess.run(
-                ["osascript", "-e", script_code],
+                command,
                 capture_output=True,
                 text=True,
-                timeout=30  # 30秒超时
+                timeout=self.timeout
             )
             
             if result.returncode != 0:
@@ -105,76 +470,51 @@ class AppleScriptRunner:
         except subprocess.SubprocessError as e:
             raise AppleScriptError(f"Failed to execute AppleScript: {e}")
     
-    def _format_args(self, *args) -> str:
-        """
-        格式化函数参数为 AppleScript 格式
-        
-        Args:
-            *args: 参数列表
-            
-        Returns:
-            格式化后的参数字符串
-        """
-        formatted_args = []
-        
-        for arg in args:
-            if arg is None:
-                formatted_args.append('""')
-            elif isinstance(arg, bool):
-                formatted_args.append("true" if arg else "false")
-            elif isinstance(arg, (int, float)):
-                formatted_args.append(str(arg))
-            elif isinstance(arg, str):
-                # 转义字符串中的引号
-                escaped_arg = arg.replace('"', '\\"')
-                formatted_args.append(f'"{escaped_arg}"')
-            elif isinstance(arg, (list, tuple)):
-                # 处理列表参数
-                list_items = [self._format_single_arg(item) for item in arg]
-                formatted_args.append(f"{{{', '.join(list_items)}}}")
-            else:
-                # 其他类型转为字符串
-                formatted_args.append(f'"{str(arg)}"')
-        
-        return ", ".join(formatted_args)
-    
-    def _format_single_arg(self, arg: Any) -> str:
-        """格式化单个参数"""
-        if arg is None:
-            return '""'
-        elif isinstance(arg, bool):
-            return "true" if arg else "false"
-        elif isinstance(arg, (int, float)):
-            return str(arg)
-        elif isinstance(arg, str):
-            escaped_arg = arg.replace('"', '\\"')
-            return f'"{escaped_arg}"'
-        else:
-            return f'"{str(arg)}"'
-    
-    def check_keynote_running(self) -> bool:
-        """检查 Keynote 是否正在运行"""
-        script = '''
+    _CHECK_KEYNOTE_SCRIPT = '''
         tell application "System Events"
             return (name of processes) contains "Keynote"
         end tell
         '''
-        
+    
+    _LAUNCH_KEYNOTE_SCRIPT = '''
+        tell application "Keynote"
+            activate
+        end tell
+        '''
+    
+    # 无界面模式下只启动 Keynote，不将其切换到前台
+    _LAUNCH_KEYNOTE_HEADLESS_SCRIPT = '''
+        tell application "Keynote"
+            launch
+        end tell
+        '''
+    
+    def check_keynote_running(self) -> bool:
+        """检查 Keynote 是否正在运行"""
+        try:
+            result = self._execute_applescript(self._CHECK_KEYNOTE_SCRIPT)
+            return result.lower() == "true"
+        except AppleScriptError:
+            return False
+    
+    async def check_keynote_running_async(self) -> bool:
+        """异步检查 Keynote 是否正在运行"""
         try:
-            result = self._execute_applescript(script)
+            result = await self._execute_applescript_async(self._CHECK_KEYNOTE_SCRIPT)
             return result.lower() == "true"
         except AppleScriptError:
             return False
     
     def launch_keynote(self) -> None:
         """启动 Keynote 应用"""
-        script = '''
-        tell application "Keynote"
-            activate
-        end tell
-        '''
-        
-        self._execute_applescript(script)
+        self._execute_applescript(self._launch_script())
+    
+    async def launch_keynote_async(self) -> None:
+        """异步启动 Keynote 应用"""
+        await self._execute_applescript_async(self._launch_script())
+    
+    def _launch_script(self) -> str:
+        return self._LAUNCH_KEYNOTE_HEADLESS_SCRIPT if self.headless else self._LAUNCH_KEYNOTE_SCRIPT
     
     def quit_keynote(self) -> None:
         """退出 Keynote 应用"""
@@ -222,13 +562,19 @@ class AppleScriptRunner:
         except subprocess.SubprocessError as e:
             raise AppleScriptError(f"Failed to compile script: {e}")
     
+    def close(self) -> None:
+        """关闭常驻工作进程池"""
+        if self.pool is not None:
+            self.pool.close()
+    
     def list_available_scripts(self) -> List[str]:
-        """列出可用的脚本文件"""
+        """列出可用的脚本文件（.applescript 源码或 .scpt 编译脚本）"""
         if not self.script_dir.exists():
             return []
         
-        scripts = []
-        for script_file in self.script_dir.glob("*.scpt"):
-            scripts.append(script_file.stem)
+        scripts = set()
+        for pattern in ("*.applescript", "*.scpt"):
+            for script_file in self.script_dir.glob(pattern):
+                scripts.add(script_file.stem)
         
         return sorted(scripts) 
\ No newline at end of file
@@ -0,0 +1,170 @@
+"""
+Local auto-layout for Keynote-MCP
+
+未指定坐标的文本内容在本地计算放置位置：根据幻灯片尺寸和已有对象的矩形，
+在安全区域内按从上到下、从左到右的顺序寻找第一个不与已有对象重叠的位置。
+文本尺寸按字符宽度在本地估算，不需要额外的 Keynote 调用。
+
+候选位置取安全区域的左上角以及已有对象的右边缘、下边缘（"bottom-left" 装箱的候选点），
+重叠检测使用均匀网格空间索引，只检查候选矩形覆盖的网格单元中的对象。
+"""
+
+import math
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .config import env_bool
+
+# 未指定字号时估算使用的字号
+DEFAULT_FONT_SIZE = 24
+# 行高与字号之比
+LINE_HEIGHT = 1.25
+# 拉丁字符、全角字符的平均宽度与字号之比
+NARROW_CHAR_WIDTH = 0.55
+WIDE_CHAR_WIDTH = 1.0
+# 安全区域边距占幻灯片短边的比例
+MARGIN_RATIO = 0.05
+# 对象之间的最小间距（像素）
+ITEM_GAP = 12
+
+Rect = Sequence[float]
+
+
+def auto_layout_enabled() -> bool:
+    """是否启用自动布局（环境变量 KEYNOTE_MCP_AUTO_LAYOUT，默认启用）"""
+    return env_bool("KEYNOTE_MCP_AUTO_LAYOUT", True)
+
+
+def safe_margin(slide_width: float, slide_height: float) -> int:
+    """安全区域边距"""
+    return round(min(slide_width, slide_height) * MARGIN_RATIO)
+
+
+def _char_width(char: str) -> float:
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return WIDE_CHAR_WIDTH
+    return NARROW_CHAR_WIDTH
+
+
+def estimate_text_size(text: str, font_size: Optional[float], max_width: float) -> Tuple[float, float]:
+    """
+    估算文本框尺寸
+
+    Args:
+        text: 文本内容（可包含换行）
+        font_size: 字号，None 时使用 DEFAULT_FONT_SIZE
+        max_width: 文本框最大宽度，超出时按此宽度折行
+
+    Returns:
+        (宽度, 高度)
+    """
+    font_size = font_size or DEFAULT_FONT_SIZE
+    # 文本框内边距
+    padding = font_size * 0.5
+    usable_width = max(max_width - padding, font_size)
+
+    widest = 0.0
+    line_count = 0
+    for line in text.split("\n"):
+        line_width = sum(_char_width(char) for char in line) * font_size
+        widest = max(widest, line_width)
+        line_count += max(1, math.ceil(line_width / usable_width))
+
+    width = min(widest, usable_width) + padding
+    height = line_count * font_size * LINE_HEIGHT + padding
+    return width, height
+
+
+class RectIndex:
+    """均匀网格空间索引"""
+
+    def __init__(self, rects: Iterable[Rect] = (), cell_size: float = 128.0):
+        self.cell_size = cell_size
+        self._rects: List[Rect] = []
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        for rect in rects:
+            self.insert(rect)
+
+    def _cell_range(self, rect: Rect) -> Iterable[Tuple[int, int]]:
+        x, y, w, h = rect
+        for cx in range(int(x // self.cell_size), int((x + w) // self.cell_size) + 1):
+            for cy in range(int(y // self.cell_size), int((y + h) // self.cell_size) + 1):
+                yield cx, cy
+
+    def insert(self, rect: Rect) -> None:
+        index = len(self._rects)
+        self._rects.append(rect)
+        for cell in self._cell_range(rect):
+            self._cells.setdefault(cell, []).append(index)
+
+    def intersects(self, rect: Rect, gap: float = 0.0) -> bool:
+        """判断矩形（四周扩展 gap 后）是否与已有矩形相交"""
+        x, y, w, h = rect
+        expanded = (x - gap, y - gap, w + 2 * gap, h + 2 * gap)
+        seen: Set[int] = set()
+        for cell in self._cell_range(expanded):
+            for index in self._cells.get(cell, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+                ox, oy, ow, oh = self._rects[index]
+                if (expanded[0] < ox + ow and ox < expanded[0] + expanded[2]
+                        and expanded[1] < oy + oh and oy < expanded[1] + expanded[3]):
+                    return True
+        return False
+
+
+def find_free_position(slide_width: float, slide_height: float, rects: Sequence[Rect],
+                       width: float, height: float, gap: float = ITEM_GAP) -> Optional[Tuple[float, float]]:
+    """
+    在安全区域内寻找不与已有对象重叠的位置
+
+    Args:
+        slide_width: 幻灯片宽度
+        slide_height: 幻灯片高度
+        rects: 已有对象的矩形 [x, y, w, h]
+        width: 待放置对象的宽度
+        height: 待放置对象的高度
+        gap: 与已有对象之间的最小间距
+
+    Returns:
+        左上角坐标 (x, y)；没有足够空间时返回 None
+    """
+    margin = safe_margin(slide_width, slide_height)
+    right, bottom = slide_width - margin, slide_height - margin
+    if width > right - margin or height > bottom - margin:
+        return None
+
+    index = RectIndex(rects)
+    xs = sorted({margin} | {rect[0] + rect[2] + gap for rect in rects})
+    ys = sorted({margin} | {rect[1] + rect[3] + gap for rect in rects})
+
+    for y in ys:
+        if y + height > bottom:
+            break
+        for x in xs:
+            if x + width > right:
+                break
+            if not index.intersects((x, y, width, height), gap):
+                return float(x), float(y)
+    return None
+
+
+def place_text(slide_width: float, slide_height: float, rects: Sequence[Rect], text: str,
+               font_size: Optional[float]) -> Optional[Tuple[float, float, float, float]]:
+    """
+    为文本计算放置位置和文本框尺寸
+
+    文本框宽度按估算宽度留出 10% 余量，避免实际折行比估算多而超出预留高度
+
+    Returns:
+        (x, y, 宽度, 估算高度)；没有足够空间时返回 None
+    """
+    margin = safe_margin(slide_width, slide_height)
+    max_width = slide_width - 2 * margin
+    width, height = estimate_text_size(text, font_size, max_width)
+    width = min(width * 1.1, max_width)
+    position = find_free_position(slide_width, slide_height, rects, width, height)
+    if position is None:
+        return None
+    return position[0], position[1], float(math.ceil(width)), height
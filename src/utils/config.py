@@ -0,0 +1,64 @@
+"""
+Environment-based settings for Keynote-MCP
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+
+def env_int(name: str, default: int) -> int:
+    """读取整数类型的环境变量，无效值时返回默认值"""
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """读取浮点类型的环境变量，无效值时返回默认值"""
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    """读取布尔类型的环境变量（1/true/yes/on 视为真）"""
+    value = os.getenv(name, "").strip().lower()
+    if not value:
+        return default
+    return value in ("1", "true", "yes", "on")
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    """读取字符串类型的环境变量，空字符串视为未设置"""
+    value = os.getenv(name, "").strip()
+    return value if value else default
+
+
+def cache_dir(*parts: str) -> Path:
+    """
+    获取缓存目录（可通过环境变量 KEYNOTE_MCP_CACHE_DIR 覆盖）
+
+    Args:
+        *parts: 缓存根目录下的子目录
+
+    Returns:
+        缓存目录路径（不保证已存在）
+    """
+    root = env_str("KEYNOTE_MCP_CACHE_DIR")
+    if root:
+        base = Path(root).expanduser()
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches" / "keynote-mcp"
+    else:
+        base = Path(os.getenv("XDG_CACHE_HOME", str(Path.home() / ".cache"))) / "keynote-mcp"
+    return base.joinpath(*parts)
@@ -0,0 +1,347 @@
+"""
+In-memory deck mirror for Keynote-MCP
+
+每个文档维护一份幻灯片模型（布局、文本框数量、对象数量和矩形、幻灯片尺寸等），
+由一次批量导出脚本填充，之后由本服务器自己的修改操作增量更新。
+只读工具直接从模型中读取，不再访问 Keynote。
+
+AppleScript 无法订阅文档变化，外部修改（用户在 Keynote 中手动编辑）通过两种方式处理：
+模型超过最大存活时间（KEYNOTE_MCP_MIRROR_TTL，默认 30 秒）后重新导出；
+任何修改操作失败时丢弃对应文档的模型。
+空字符串（当前文档）只是指向某个文档模型的别名，用户随时可能切换窗口：
+按当前文档执行的每个模板在结果中附带当前文档的 id（不增加脚本调用），别名随之更正；
+按别名检查幻灯片编号失败时丢弃别名，再次调用时由 Keynote 检查，避免窗口切换后反复误报。
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .applescript_runner import AppleScriptRunner
+from .config import env_float
+from .document_handles import is_handle, make_handle
+from .error_handler import ParameterError
+from .geometry import GEOMETRY_COLUMNS_SCRIPT, KIND_NAMES
+from .script_templates import script_template
+from .singleflight import SingleFlight
+
+# 一次导出整个文档的模型；各幻灯片的布局以及所有对象的几何信息以并列数组返回
+DUMP_DECK = script_template(
+    "dump_deck",
+    ["docRef"],
+    '''
+    set firstSlide to 1
+    set lastSlide to count of slides of targetDoc
+
+    set layoutNames to {}
+    repeat with targetSlide in slides of targetDoc
+        try
+            set end of layoutNames to name of base slide of targetSlide
+        on error
+            set end of layoutNames to "Unknown Layout"
+        end try
+    end repeat
+''' + GEOMETRY_COLUMNS_SCRIPT + '''
+    try
+        set themeName to name of document theme of targetDoc
+    on error
+        set themeName to "Unknown Theme"
+    end try
+
+    try
+        set slideWidth to width of targetDoc
+        set slideHeight to height of targetDoc
+    on error
+        set slideWidth to 1920
+        set slideHeight to 1080
+    end try
+
+    return my jsonObject({"id", id of targetDoc, "name", name of targetDoc, "theme", themeName, "width", slideWidth, "height", slideHeight, "layouts", layoutNames, "slide", slideColumn, "kind", kindColumn, "x", xColumn, "y", yColumn, "w", wColumn, "h", hColumn})
+    '''
+)
+
+# 文本框在 kind 列中的编码
+TEXT_KIND = KIND_NAMES.index("text")
+
+
+class SlideState:
+    """单张幻灯片的模型"""
+
+    __slots__ = ("layout", "text_item_count", "item_count", "rects")
+
+    def __init__(self, layout: str, text_item_count: int = 0, item_count: int = 0,
+                 rects: Optional[List[List[float]]] = None):
+        self.layout = layout
+        self.text_item_count = text_item_count
+        self.item_count = item_count
+        # 对象矩形 [x, y, w, h]；None 表示未知（如添加了默认位置的图片），需要重新读取
+        self.rects = rects
+
+    def copy(self) -> "SlideState":
+        rects = [list(rect) for rect in self.rects] if self.rects is not None else None
+        return SlideState(self.layout, self.text_item_count, self.item_count, rects)
+
+
+class DeckState:
+    """单个文档的模型"""
+
+    def __init__(self, doc_id: str, name: str, theme: str, width: int, height: int, slides: List[SlideState]):
+        self.doc_id = doc_id
+        self.name = name
+        self.theme = theme
+        self.width = width
+        self.height = height
+        self.slides = slides
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def from_dump(cls, dump: Dict[str, Any]) -> "DeckState":
+        """由 DUMP_DECK 的结果构建模型"""
+        slides = [SlideState(layout, rects=[]) for layout in dump["layouts"]]
+        columns = zip(dump["slide"], dump["kind"], dump["x"], dump["y"], dump["w"], dump["h"])
+        for slide_number, kind, x, y, w, h in columns:
+            slide = slides[slide_number - 1]
+            slide.item_count += 1
+            if kind == TEXT_KIND:
+                slide.text_item_count += 1
+            slide.rects.append([x, y, w, h])
+        return cls(str(dump["id"]), dump["name"], dump["theme"], dump["width"], dump["height"], slides)
+
+    @property
+    def handle(self) -> str:
+        return make_handle(self.doc_id)
+
+    @property
+    def slide_count(self) -> int:
+        return len(self.slides)
+
+    def check_slide(self, slide_number: int) -> None:
+        """
+        检查幻灯片编号是否存在
+
+        Raises:
+            ParameterError: 幻灯片编号超出范围
+        """
+        if not 1 <= slide_number <= len(self.slides):
+            raise ParameterError(
+                f"Slide number {slide_number} out of range: document has {len(self.slides)} slides"
+            )
+
+    def slide(self, slide_number: int) -> SlideState:
+        self.check_slide(slide_number)
+        return self.slides[slide_number - 1]
+
+
+class DeckMirror:
+    """文档模型缓存"""
+
+    def __init__(self, runner: Optional[AppleScriptRunner] = None, max_age: Optional[float] = None):
+        """
+        初始化文档模型缓存
+
+        Args:
+            runner: AppleScript 执行器
+            max_age: 模型最大存活时间（秒），默认读取环境变量 KEYNOTE_MCP_MIRROR_TTL；
+                     小于等于 0 时不缓存，每次读取都重新导出
+        """
+        self.runner = runner or AppleScriptRunner()
+        self.max_age = env_float("KEYNOTE_MCP_MIRROR_TTL", 30.0) if max_age is None else max_age
+        # 句柄 -> 模型
+        self._decks: Dict[str, DeckState] = {}
+        # 文档名称或空字符串（当前文档） -> 句柄
+        self._aliases: Dict[str, str] = {}
+        # 同一文档的并发导出只执行一次
+        self._loads = SingleFlight()
+        self.hits = 0
+        self.invalidations = 0
+        self.front_switches = 0
+
+    def _handle(self, doc_ref: str) -> Optional[str]:
+        doc_ref = doc_ref or ""
+        if is_handle(doc_ref):
+            return doc_ref
+        return self._aliases.get(doc_ref)
+
+    def cached(self, doc_ref: str) -> Optional[DeckState]:
+        """
+        获取仍然有效的模型，不访问 Keynote
+
+        Args:
+            doc_ref: 文档句柄、名称或空字符串（当前文档）
+
+        Returns:
+            模型；未缓存或已过期时返回 None
+        """
+        handle = self._handle(doc_ref)
+        deck = self._decks.get(handle) if handle else None
+        if deck is None:
+            return None
+        if time.monotonic() - deck.loaded_at > self.max_age:
+            self._discard(handle)
+            return None
+        return deck
+
+    async def get(self, doc_ref: str = "") -> DeckState:
+        """
+        获取文档模型，未缓存时通过一次批量导出加载
+
+        Args:
+            doc_ref: 文档句柄、名称或空字符串（当前文档）
+
+        Returns:
+            文档模型
+        """
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            self.hits += 1
+            return deck
+        return await self._loads.do(doc_ref or "", lambda: self._load(doc_ref or ""))
+
+    async def _load(self, doc_ref: str) -> DeckState:
+        dump = await self.runner.run_template_async(DUMP_DECK, doc_ref)
+        deck = DeckState.from_dump(dump)
+        if self.max_age > 0:
+            self._decks[deck.handle] = deck
+            if not is_handle(doc_ref):
+                self._aliases[doc_ref] = deck.handle
+        return deck
+
+    def check_slide(self, doc_ref: str, slide_number: int) -> None:
+        """
+        在已缓存的模型上检查幻灯片编号，未缓存时不做检查
+
+        Raises:
+            ParameterError: 幻灯片编号超出范围
+        """
+        deck = self.cached(doc_ref)
+        if deck is None:
+            return
+        try:
+            deck.check_slide(slide_number)
+        except ParameterError:
+            if not doc_ref:
+                # 别名可能指向切换窗口前的文档：丢弃别名，重试时不再按旧模型检查
+                self._aliases.pop("", None)
+            raise
+
+    def invalidate(self, doc_ref: Optional[str] = None) -> None:
+        """
+        丢弃文档模型
+
+        Args:
+            doc_ref: 文档句柄、名称或空字符串（当前文档）；None 表示丢弃全部模型
+        """
+        if doc_ref is None:
+            self.invalidations += len(self._decks)
+            self._decks.clear()
+            self._aliases.clear()
+            return
+        handle = self._handle(doc_ref)
+        if handle is not None:
+            self._discard(handle)
+            self.invalidations += 1
+        self._aliases.pop(doc_ref or "", None)
+
+    def _discard(self, handle: str) -> None:
+        self._decks.pop(handle, None)
+        for alias in [alias for alias, target in self._aliases.items() if target == handle]:
+            del self._aliases[alias]
+
+    def front_document_changed(self) -> None:
+        """当前文档发生变化（新建、打开或关闭文档）后调用"""
+        self._aliases.pop("", None)
+
+    def front_document_seen(self, doc_id: str) -> None:
+        """
+        按当前文档执行的脚本报告了当前文档的 id（见 AppleScriptRunner.front_document_listeners）
+
+        当前文档已切换时改为指向新文档的模型（已按句柄缓存时），否则丢弃别名
+        """
+        handle = make_handle(doc_id)
+        alias = self._aliases.get("")
+        if alias is None or alias == handle:
+            return
+        self.front_switches += 1
+        if handle in self._decks:
+            self._aliases[""] = handle
+        else:
+            self.front_document_changed()
+
+    @contextmanager
+    def mutating(self, doc_ref: str) -> Iterator[None]:
+        """包裹修改操作：操作失败时文档状态未知，丢弃对应模型"""
+        try:
+            yield
+        except BaseException:
+            self.invalidate(doc_ref)
+            raise
+
+    # 以下方法在本服务器的修改操作成功后调用，增量更新已缓存的模型
+
+    def slide_added(self, doc_ref: str, slide: Dict[str, Any]) -> None:
+        """slide 为 add_slide 模板返回的新幻灯片信息"""
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            deck.slides.insert(slide["slideNumber"] - 1, SlideState(
+                slide["layout"], slide["textItemCount"], slide["itemCount"], slide["rects"]
+            ))
+
+    def slide_deleted(self, doc_ref: str, slide_number: int) -> None:
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            del deck.slides[slide_number - 1]
+
+    def slide_duplicated(self, doc_ref: str, slide_number: int, new_slide_number: int) -> None:
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            deck.slides.insert(new_slide_number - 1, deck.slide(slide_number).copy())
+
+    def slide_moved(self, doc_ref: str, from_position: int, to_position: int) -> None:
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            deck.slides.insert(to_position - 1, deck.slides.pop(from_position - 1))
+
+    def layout_set(self, doc_ref: str, slide_number: int, layout: str) -> None:
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            deck.slide(slide_number).layout = layout
+
+    def item_added(self, doc_ref: str, slide_number: int, text: bool = True,
+                   rect: Optional[List[float]] = None) -> None:
+        """rect 为新对象的 [x, y, w, h]，未知时幻灯片的对象矩形标记为未知"""
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            slide = deck.slide(slide_number)
+            slide.item_count += 1
+            if text:
+                slide.text_item_count += 1
+            if rect is None:
+                slide.rects = None
+            elif slide.rects is not None:
+                slide.rects.append(list(rect))
+
+    def slide_content_changed(self, doc_ref: str, slide_number: int) -> None:
+        """修改了对象的文本：对象尺寸可能变化，幻灯片的对象矩形标记为未知"""
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            deck.slide(slide_number).rects = None
+
+    def slide_geometry_loaded(self, doc_ref: str, slide_number: int, geometry: Dict[str, Any]) -> None:
+        """用单张幻灯片的列式几何数据（见 geometry_from_dump）刷新对象矩形"""
+        deck = self.cached(doc_ref)
+        if deck is not None:
+            columns = zip(geometry["slide"], geometry["x"], geometry["y"], geometry["w"], geometry["h"])
+            deck.slide(slide_number).rects = [
+                [x, y, w, h] for number, x, y, w, h in columns if number == slide_number
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        return {
+            "documents": len(self._decks),
+            "hits": self.hits,
+            "loads": self._loads.misses,
+            "invalidations": self.invalidations,
+            "front_switches": self.front_switches,
+            "max_age_s": self.max_age,
+        }
@@ -0,0 +1,200 @@
+"""
+Deck reconciliation for Keynote-MCP
+
+比较期望的幻灯片列表与文档中的现有幻灯片，计算最小编辑脚本：
+
+1. 用 difflib 对两边的幻灯片指纹做序列比对，相同指纹的幻灯片保持不动；
+2. 被删除和新增的幻灯片中指纹相同的配对为移动；
+3. 同一替换区间内结构相同（文本框数量和字号、图片数量一致）只是文本不同的幻灯片改为修改文本；
+4. 其余幻灯片删除或新建。
+
+保留的幻灯片按最长递增子序列确定不需要移动的部分，只移动其余幻灯片，
+编辑脚本的长度与变化量成正比，而与文档大小无关。
+"""
+
+import bisect
+import difflib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+# 字号比较的容差
+SIZE_TOLERANCE = 0.5
+
+
+class SlideFingerprint(NamedTuple):
+    """幻灯片指纹：文本框的文本和字号、图片数量、其他对象数量"""
+    texts: Tuple[str, ...]
+    # None 表示不限定字号（期望一侧）或读取失败（现有一侧）
+    sizes: Tuple[Optional[float], ...]
+    image_count: int
+    other_count: int = 0
+
+    @property
+    def key(self) -> Tuple:
+        """序列比对使用的键（字号单独比较，以支持不限定字号）"""
+        return self.texts, self.image_count, self.other_count
+
+    def same_structure(self, other: "SlideFingerprint") -> bool:
+        """文本框数量和字号、图片和其他对象数量都一致"""
+        if (len(self.texts), self.image_count, self.other_count) != (
+                len(other.texts), other.image_count, other.other_count):
+            return False
+        return all(
+            a is None or b is None or abs(a - b) <= SIZE_TOLERANCE for a, b in zip(self.sizes, other.sizes)
+        )
+
+    def matches(self, other: "SlideFingerprint") -> bool:
+        return self.key == other.key and self.same_structure(other)
+
+
+class EditStep(NamedTuple):
+    """
+    编辑脚本中的一步（幻灯片编号均为执行到这一步时的编号）
+
+    - delete: 删除 slide_number
+    - move: 把 slide_number 移动到 target（与 move_slide 一致，移动后幻灯片位于 target）
+    - insert: 在末尾（slide_number）新建第 desired 张期望幻灯片并填充内容
+    - retext: 按第 desired 张期望幻灯片修改 slide_number（原第 live 张现有幻灯片）上文本框的文本
+    """
+    action: str
+    slide_number: int
+    target: int = 0
+    desired: int = -1
+    live: int = -1
+
+
+def longest_increasing_subsequence(values: Sequence[int]) -> Set[int]:
+    """
+    最长严格递增子序列（O(n log n)）
+
+    Returns:
+        子序列元素在 values 中的下标
+    """
+    # tails[k] 为长度 k+1 的递增子序列的最小结尾值在 values 中的下标
+    tails: List[int] = []
+    tail_values: List[int] = []
+    previous: List[Optional[int]] = [None] * len(values)
+    for index, value in enumerate(values):
+        position = bisect.bisect_left(tail_values, value)
+        previous[index] = tails[position - 1] if position > 0 else None
+        if position == len(tails):
+            tails.append(index)
+            tail_values.append(value)
+        else:
+            tails[position] = index
+            tail_values[position] = value
+
+    result: Set[int] = set()
+    index = tails[-1] if tails else None
+    while index is not None:
+        result.add(index)
+        index = previous[index]
+    return result
+
+
+def plan_moves(order: Sequence[int]) -> List[Tuple[int, int]]:
+    """
+    计算把幻灯片重排为目标顺序的最少移动
+
+    最长递增子序列中的幻灯片保持不动，其余幻灯片按目标顺序依次移动到目标前一张之后，
+    移动次数为 n - LIS 长度，即单步移动能达到的最小值
+
+    Args:
+        order: 当前顺序中每张幻灯片的目标下标（0..n-1 的排列）
+
+    Returns:
+        [(原位置, 新位置), ...]，编号从 1 开始，语义与 move_slide 一致（移动后幻灯片位于新位置）
+    """
+    stable = {order[k] for k in longest_increasing_subsequence(order)}
+    current = list(order)
+    moves = []
+    for target in range(len(current)):
+        if target in stable:
+            continue
+        index = current.index(target)
+        current.pop(index)
+        # 目标前一张要么在稳定部分，要么已经处理过，二者始终保持目标的相对顺序
+        position = current.index(target - 1) + 1 if target > 0 else 0
+        current.insert(position, target)
+        if position != index:
+            moves.append((index + 1, position + 1))
+    return moves
+
+
+def match_slides(live: Sequence[SlideFingerprint],
+                 desired: Sequence[SlideFingerprint]) -> Tuple[Dict[int, int], Set[int]]:
+    """
+    为期望的幻灯片匹配可以复用的现有幻灯片
+
+    Returns:
+        (期望下标 -> 现有下标, 需要修改文本的期望下标)
+    """
+    matcher = difflib.SequenceMatcher(None, [f.key for f in live], [f.key for f in desired], autojunk=False)
+    source: Dict[int, int] = {}
+    unmatched: List[Tuple[range, range]] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                if live[i].matches(desired[j]):
+                    source[j] = i
+                else:
+                    unmatched.append((range(i, i + 1), range(j, j + 1)))
+        else:
+            unmatched.append((range(i1, i2), range(j1, j2)))
+
+    # 被删除的幻灯片与新增的幻灯片指纹相同：改为移动
+    free_live: Dict[Tuple, List[int]] = {}
+    for live_range, _ in unmatched:
+        for i in live_range:
+            free_live.setdefault(live[i].key, []).append(i)
+    used: Set[int] = set()
+    for _, desired_range in unmatched:
+        for j in desired_range:
+            for i in free_live.get(desired[j].key, ()):
+                if i not in used and live[i].matches(desired[j]):
+                    source[j] = i
+                    used.add(i)
+                    break
+
+    # 同一区间内剩余的幻灯片按顺序配对，结构相同的只修改文本
+    retext: Set[int] = set()
+    for live_range, desired_range in unmatched:
+        remaining_live = [i for i in live_range if i not in used]
+        remaining_desired = [j for j in desired_range if j not in source]
+        for i, j in zip(remaining_live, remaining_desired):
+            if live[i].same_structure(desired[j]):
+                source[j] = i
+                used.add(i)
+                retext.add(j)
+    return source, retext
+
+
+def reconcile_slides(live: Sequence[SlideFingerprint], desired: Sequence[SlideFingerprint]) -> List[EditStep]:
+    """
+    计算把现有幻灯片变为期望幻灯片的编辑脚本
+
+    执行顺序：从后往前删除；在末尾按期望顺序新建幻灯片；按 plan_moves 移动到期望顺序；
+    最后修改文本（此时幻灯片编号即期望位置）
+
+    Args:
+        live: 现有幻灯片的指纹
+        desired: 期望幻灯片的指纹
+
+    Returns:
+        编辑步骤列表
+    """
+    source, retext = match_slides(live, desired)
+    kept = set(source.values())
+    steps = [EditStep("delete", i + 1) for i in reversed(range(len(live))) if i not in kept]
+
+    # 删除并在末尾新建后的当前顺序，以期望下标表示
+    target_of = {i: j for j, i in source.items()}
+    order = [target_of[i] for i in range(len(live)) if i in kept]
+    for j in range(len(desired)):
+        if j not in source:
+            order.append(j)
+            steps.append(EditStep("insert", len(order), desired=j))
+
+    steps.extend(EditStep("move", from_position, to_position) for from_position, to_position in plan_moves(order))
+
+    steps.extend(EditStep("retext", j + 1, desired=j, live=source[j]) for j in sorted(retext))
+    return steps
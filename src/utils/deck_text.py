@@ -0,0 +1,171 @@
+"""
+Bulk slide text dump for Keynote-MCP
+
+一次脚本调用读取一段幻灯片上的标题、所有文本框和形状的文本、文本框字号、演讲者备注，
+以及图片和其他对象的数量。每张幻灯片只按类型批量读取（``object text of every text item`` 等），
+Apple Event 数量与幻灯片数量成线性关系，与文本框数量无关。
+
+iter_slide_text 按固定大小的分段依次导出整个文档，逐张幻灯片产出结果，
+同时预取下一段，内存中最多保留两段的数据。
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from .applescript_runner import AppleScriptRunner
+from .config import env_int
+from .error_handler import ParameterError
+from .script_templates import script_template
+
+# 读取 firstSlide..lastSlide（lastSlide 为 0 表示到最后一张）的文本；
+# texts、sizes、shapes 为每张幻灯片一个列表，按对象的先后顺序排列
+DUMP_SLIDE_TEXT = script_template(
+    "dump_slide_text",
+    ["docRef", "firstSlide", "lastSlide"],
+    '''
+    set slideCount to count of slides of targetDoc
+    if lastSlide is 0 or lastSlide > slideCount then set lastSlide to slideCount
+
+    set slideTitles to {}
+    set slideTexts to {}
+    set slideSizes to {}
+    set slideShapes to {}
+    set slideNotes to {}
+    set slideImages to {}
+    set slideOthers to {}
+    repeat with slideIndex from firstSlide to lastSlide
+        tell slide slideIndex of targetDoc
+            try
+                if title showing then
+                    set end of slideTitles to object text of default title item
+                else
+                    set end of slideTitles to ""
+                end if
+            on error
+                set end of slideTitles to ""
+            end try
+            set end of slideTexts to object text of every text item
+            try
+                set end of slideSizes to size of object text of every text item
+            on error
+                set end of slideSizes to {}
+            end try
+            set end of slideShapes to object text of every shape
+            try
+                set end of slideNotes to presenter notes
+            on error
+                set end of slideNotes to ""
+            end try
+            set imageCount to count of images
+            set end of slideImages to imageCount
+            set end of slideOthers to (count of iWork items) - (count of text items) - imageCount
+        end tell
+    end repeat
+
+    try
+        set slideWidth to width of targetDoc
+        set slideHeight to height of targetDoc
+    on error
+        set slideWidth to 1920
+        set slideHeight to 1080
+    end try
+
+    return my jsonObject({"slideCount", slideCount, "firstSlide", firstSlide, "width", slideWidth, "height", slideHeight, "titles", slideTitles, "texts", slideTexts, "sizes", slideSizes, "shapes", slideShapes, "notes", slideNotes, "images", slideImages, "others", slideOthers})
+    '''
+)
+
+
+class SlideText(NamedTuple):
+    """单张幻灯片的文本内容"""
+    slide_number: int
+    # 文本框的文本，按先后顺序
+    texts: List[str]
+    # 文本框的字号，读取失败时为 None
+    sizes: List[Optional[float]]
+    image_count: int
+    # 文本框和图片以外的对象数量
+    other_count: int
+    # 标题占位符的文本（不显示标题时为空）
+    title: str = ""
+    # 形状（包括标题和正文占位符）的文本，按先后顺序（没有文本的形状为空字符串）
+    shape_texts: Tuple[str, ...] = ()
+    # 演讲者备注
+    notes: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "slide": self.slide_number,
+            "title": self.title,
+            "texts": self.texts,
+            "shape_texts": [text for text in self.shape_texts if text],
+            "notes": self.notes,
+        }
+
+
+def normalize_text(text: str) -> str:
+    """统一换行符（Keynote 返回的段落分隔符可能是 return）"""
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def slide_texts_from_dump(dump: Dict[str, Any]) -> List[SlideText]:
+    """将 DUMP_SLIDE_TEXT 的结果整理为每张幻灯片一项"""
+    slides = []
+    columns = zip(
+        dump["texts"], dump["sizes"], dump["images"], dump["others"], dump["titles"], dump["shapes"], dump["notes"]
+    )
+    for offset, (texts, sizes, image_count, other_count, title, shapes, notes) in enumerate(columns):
+        if len(sizes) != len(texts):
+            sizes = [None] * len(texts)
+        slides.append(SlideText(
+            dump["firstSlide"] + offset, [normalize_text(text) for text in texts], list(sizes), image_count,
+            other_count, normalize_text(title), tuple(normalize_text(text) for text in shapes), normalize_text(notes)
+        ))
+    return slides
+
+
+async def iter_slide_text(runner: AppleScriptRunner, doc_name: str = "", first_slide: int = 1, last_slide: int = 0,
+                          chunk_size: Optional[int] = None) -> AsyncIterator[SlideText]:
+    """
+    分段导出幻灯片文本，逐张产出
+
+    处理当前分段时已在后台导出下一段；调用方停止迭代时取消未完成的预取
+
+    Args:
+        runner: AppleScript 执行器
+        doc_name: 文档名称或句柄，空字符串表示当前文档
+        first_slide: 起始幻灯片编号
+        last_slide: 结束幻灯片编号（包含），0 表示到最后一张
+        chunk_size: 每次脚本调用导出的幻灯片数量，默认读取环境变量 KEYNOTE_MCP_TEXT_CHUNK（默认 50）
+
+    Yields:
+        每张幻灯片的文本
+
+    Raises:
+        ParameterError: 起始幻灯片编号超出范围
+    """
+    chunk_size = max(1, chunk_size or env_int("KEYNOTE_MCP_TEXT_CHUNK", 50))
+
+    def fetch(start: int, end: int) -> "asyncio.Task":
+        return asyncio.ensure_future(runner.run_template_async(DUMP_SLIDE_TEXT, doc_name, start, end))
+
+    end = first_slide + chunk_size - 1
+    if last_slide:
+        end = min(end, last_slide)
+    pending = fetch(first_slide, end)
+    try:
+        while pending is not None:
+            dump = await pending
+            pending = None
+            if dump["firstSlide"] > dump["slideCount"] and first_slide > 1:
+                raise ParameterError(
+                    f"Slide number {first_slide} out of range: document has {dump['slideCount']} slides"
+                )
+            end = dump["firstSlide"] + len(dump["texts"]) - 1
+            stop = min(last_slide or dump["slideCount"], dump["slideCount"])
+            if end < stop:
+                pending = fetch(end + 1, min(end + chunk_size, stop))
+            for slide in slide_texts_from_dump(dump):
+                yield slide
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,98 @@
+"""
+Stable document handles for Keynote-MCP
+
+句柄基于 Keynote 的 document id（格式 "doc:<id>"），脚本中通过 ``document id`` 直接定位文档，
+不受重名文档和前台文档切换的影响。
+"""
+
+from typing import Dict, List, Optional, Set
+
+HANDLE_PREFIX = "doc:"
+
+
+def make_handle(doc_id: str) -> str:
+    """由 document id 生成文档句柄"""
+    return f"{HANDLE_PREFIX}{doc_id}"
+
+
+def is_handle(doc_ref: str) -> bool:
+    """判断文档引用是否为句柄"""
+    return bool(doc_ref) and doc_ref.startswith(HANDLE_PREFIX)
+
+
+class DocumentHandles:
+    """文档句柄缓存：记录已知文档的 句柄 <-> 名称 对应关系"""
+
+    def __init__(self):
+        self._names: Dict[str, str] = {}
+        self._handles_by_name: Dict[str, Set[str]] = {}
+
+    def register(self, doc_id: str, name: str) -> str:
+        """
+        记录文档
+
+        Args:
+            doc_id: Keynote document id
+            name: 文档名称
+
+        Returns:
+            文档句柄
+        """
+        handle = make_handle(doc_id)
+        old_name = self._names.get(handle)
+        if old_name is not None and old_name != name:
+            self._discard_name(old_name, handle)
+        self._names[handle] = name
+        self._handles_by_name.setdefault(name, set()).add(handle)
+        return handle
+
+    def forget(self, doc_ref: str) -> None:
+        """移除文档（按句柄或唯一的名称）"""
+        handle = self.resolve(doc_ref)
+        name = self._names.pop(handle, None)
+        if name is not None:
+            self._discard_name(name, handle)
+
+    def _discard_name(self, name: str, handle: str) -> None:
+        handles = self._handles_by_name.get(name)
+        if handles is not None:
+            handles.discard(handle)
+            if not handles:
+                del self._handles_by_name[name]
+
+    def replace_all(self, documents: Dict[str, str]) -> None:
+        """用当前打开的全部文档（document id -> 名称）替换缓存"""
+        self._names.clear()
+        self._handles_by_name.clear()
+        for doc_id, name in documents.items():
+            self.register(doc_id, name)
+
+    def resolve(self, doc_ref: Optional[str]) -> str:
+        """
+        将文档引用转换为句柄
+
+        已是句柄或空字符串（当前文档）时原样返回；名称只对应一个已知句柄时返回该句柄，
+        否则（未知或重名）保留名称，由脚本按名称解析
+
+        Args:
+            doc_ref: 文档句柄、名称或空字符串
+
+        Returns:
+            文档引用
+        """
+        if not doc_ref or is_handle(doc_ref):
+            return doc_ref or ""
+        handles = self._handles_by_name.get(doc_ref)
+        if handles and len(handles) == 1:
+            return next(iter(handles))
+        return doc_ref
+
+    def name(self, handle: str) -> Optional[str]:
+        """获取句柄对应的文档名称"""
+        return self._names.get(handle)
+
+    def handles(self) -> List[str]:
+        return sorted(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
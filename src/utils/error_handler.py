@@ -58,6 +58,40 @@ def handle_applescript_error(error_output: str) -> None:
         raise AppleScriptError(f"Unknown AppleScript error: {error_output}")
 
 
+# AppleScript 错误码与异常类型的对应关系
+_ERROR_NUMBER_TYPES = {
+    -1728: ("Object not found", AppleScriptError),    # errAENoSuchObject
+    -1719: ("Object not found", AppleScriptError),    # errAEIllegalIndex
+    -1743: ("Permission denied", AppleScriptError),   # errAEEventNotPermitted
+    -10004: ("Permission denied", AppleScriptError),  # privilege violation
+    -43: ("File operation error", FileOperationError),    # fnfErr
+    -120: ("File operation error", FileOperationError),   # dirNFErr
+    -1712: ("AppleScript execution timed out", AppleScriptError),  # errAETimeout
+}
+
+
+def raise_script_error(message: str, number: Optional[int] = None) -> None:
+    """
+    根据脚本返回的结构化错误（错误信息 + 错误码）抛出对应异常
+    
+    Args:
+        message: 错误信息
+        number: AppleScript 错误码
+    """
+    detail = f"{message} ({number})" if number is not None else message
+    
+    if number is not None and number in _ERROR_NUMBER_TYPES:
+        prefix, error_type = _ERROR_NUMBER_TYPES[number]
+        raise error_type(f"{prefix}: {detail}")
+    
+    if number is not None and -2763 <= number <= -2740:
+        raise AppleScriptError(f"AppleScript syntax error: {detail}")
+    
+    # 其他错误码按错误信息分类
+    handle_applescript_error(detail)
+    raise AppleScriptError("Unknown AppleScript error")
+
+
 def validate_slide_number(slide_number: Optional[int], max_slides: Optional[int] = None) -> int:
     """验证幻灯片编号"""
     if slide_number is None:
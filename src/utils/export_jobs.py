@@ -0,0 +1,446 @@
+"""
+Background export jobs for Keynote-MCP
+
+Keynote 的导出是一次长时间运行的 Apple Event，期间无法从脚本中获得进度。
+导出作业在后台任务中运行导出脚本，同时轮询导出目录：每出现一个新的图片文件即视为完成一张幻灯片，
+通过进度回调（MCP 进度通知）报告。轮询使用 asyncio.wait 的超时，不占用事件循环。
+
+导出脚本的超时按幻灯片数量计算（KEYNOTE_MCP_EXPORT_SLIDE_TIMEOUT，默认每张 10 秒），
+大文档不会触发执行器默认的 30 秒超时。
+
+ExportJobManager 按优先级排队执行导出作业，提交后立即返回作业编号。作业在文档的读写队列中执行：
+PDF 和 PowerPoint 导出以读操作执行，图片导出会临时修改幻灯片的跳过状态，以写操作独占文档；
+导出期间同一文档上的修改操作排在其后。作业状态保存在缓存目录的 jobs.json 中，
+服务器重启后仍可查询；已完成且源文件未修改的导出直接复用已有的输出文件。
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .config import cache_dir, env_float, env_int
+from .error_handler import ParameterError
+from .scheduler import READ, DocumentScheduler
+
+# 进度回调：(已完成数量, 总数, 消息)
+ProgressCallback = Callable[[float, Optional[float], str], Awaitable[None]]
+
+# 导出图片文件名末尾的序号
+_IMAGE_SEQUENCE = re.compile(r"(\d+)\.[^.]+$")
+
+
+def exported_image_files(folder: str) -> List[str]:
+    """导出目录中的图片文件，按文件名中的序号排序"""
+    names = [name for name in os.listdir(folder) if not name.startswith(".")]
+
+    def sequence(name: str) -> tuple:
+        match = _IMAGE_SEQUENCE.search(name)
+        return (int(match.group(1)) if match else 0, name)
+
+    return [os.path.join(folder, name) for name in sorted(names, key=sequence)]
+
+
+def export_timeout(base_timeout: float, slide_count: int) -> float:
+    """导出脚本的超时时间：基础超时加上每张幻灯片的导出时间"""
+    per_slide = env_float("KEYNOTE_MCP_EXPORT_SLIDE_TIMEOUT", 10.0)
+    return base_timeout + per_slide * max(1, slide_count)
+
+
+async def watch_export(task: "asyncio.Future", folder: str, total: int,
+                       progress: Optional[ProgressCallback] = None, completed: int = 0,
+                       interval: float = 0.25) -> Any:
+    """
+    等待导出任务完成，期间轮询导出目录并报告进度
+
+    Args:
+        task: 运行导出脚本的任务
+        folder: 导出目录
+        total: 预计导出的图片数量
+        progress: 进度回调，None 时只等待任务完成
+        completed: 导出开始前已完成的数量（如命中缓存的幻灯片）
+        interval: 轮询间隔（秒）
+
+    Returns:
+        导出任务的结果
+    """
+    seen: Set[str] = set()
+
+    async def scan() -> None:
+        nonlocal progress
+        try:
+            names = {name for name in os.listdir(folder) if not name.startswith(".")}
+        except FileNotFoundError:
+            return
+        for name in sorted(names - seen):
+            seen.add(name)
+            done = min(completed + len(seen), total)
+            try:
+                await progress(done, total, f"已导出 {done}/{total} 张幻灯片: {name}")
+            except Exception:
+                # 客户端已断开等情况下停止报告进度，导出继续进行
+                progress = None
+                return
+
+    while not task.done():
+        await asyncio.wait({task}, timeout=interval)
+        if progress is not None:
+            await scan()
+    result = task.result()
+    if progress is not None:
+        await scan()
+    return result
+
+
+# 作业状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# 优先级名称 -> 排序值（越小越先执行）
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class ExportJob:
+    """一个导出作业"""
+
+    def __init__(self, job_id: str, kind: str, doc_name: str, output: str, priority: str = "normal",
+                 key: Optional[str] = None):
+        self.job_id = job_id
+        # "pdf"、"images" 或 "powerpoint"
+        self.kind = kind
+        self.doc_name = doc_name
+        # 输出文件或目录
+        self.output = output
+        self.priority = priority
+        # 复用键：源文件路径、修改时间和导出参数；文档有未保存的修改时为 None，不复用
+        self.key = key
+        self.status = QUEUED
+        self.progress = 0.0
+        self.total: Optional[float] = None
+        self.message = ""
+        self.outputs: List[str] = []
+        self.error = ""
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # 以下为运行时状态，不持久化
+        self.task: Optional[asyncio.Task] = None
+        self.listeners: List[ProgressCallback] = []
+        self._finished: Optional[asyncio.Event] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def elapsed(self) -> float:
+        """已运行时间（秒）；尚未开始时为 0"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def waited(self) -> float:
+        """排队等待时间（秒）"""
+        return (self.started_at or self.finished_at or time.time()) - self.created_at
+
+    def finished_event(self) -> asyncio.Event:
+        if self._finished is None:
+            self._finished = asyncio.Event()
+            if self.finished:
+                self._finished.set()
+        return self._finished
+
+    async def report(self, progress: float, total: Optional[float], message: str) -> None:
+        """更新进度并转发给等待中的请求"""
+        self.progress = progress
+        self.total = total
+        self.message = message
+        for listener in list(self.listeners):
+            try:
+                await listener(progress, total, message)
+            except Exception:
+                self.listeners.remove(listener)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "kind": self.kind,
+            "doc_name": self.doc_name,
+            "output": self.output,
+            "priority": self.priority,
+            "key": self.key,
+            "status": self.status,
+            "progress": self.progress,
+            "total": self.total,
+            "message": self.message,
+            "outputs": self.outputs,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExportJob":
+        job = cls(data["id"], data["kind"], data.get("doc_name", ""), data["output"],
+                  data.get("priority", "normal"), data.get("key"))
+        job.status = data.get("status", FAILED)
+        job.progress = data.get("progress", 0.0)
+        job.total = data.get("total")
+        job.message = data.get("message", "")
+        job.outputs = list(data.get("outputs") or [])
+        job.error = data.get("error", "")
+        job.created_at = data.get("created_at", job.created_at)
+        job.started_at = data.get("started_at")
+        job.finished_at = data.get("finished_at")
+        return job
+
+
+# 作业的执行函数：完成导出并返回输出文件路径
+JobRunner = Callable[[ExportJob], Awaitable[List[str]]]
+
+
+class ExportJobManager:
+    """导出作业队列"""
+
+    def __init__(self, scheduler: Optional[DocumentScheduler] = None, state_path: Optional[str] = None,
+                 workers: Optional[int] = None, history: Optional[int] = None):
+        """
+        初始化导出作业队列
+
+        Args:
+            scheduler: 文档读写调度器，作业按提交时指定的访问方式在其中执行；None 时不参与调度
+            state_path: 作业状态文件，默认为缓存目录下的 export_jobs/jobs.json
+            workers: 同时执行的作业数量（默认读取环境变量 KEYNOTE_MCP_EXPORT_WORKERS，默认 1）
+            history: 保留的已结束作业数量（默认读取环境变量 KEYNOTE_MCP_EXPORT_JOB_HISTORY，默认 100）
+        """
+        self.scheduler = scheduler
+        self.state_path = Path(state_path) if state_path else cache_dir("export_jobs") / "jobs.json"
+        self.workers = max(1, workers or env_int("KEYNOTE_MCP_EXPORT_WORKERS", 1))
+        self.history = max(1, history or env_int("KEYNOTE_MCP_EXPORT_JOB_HISTORY", 100))
+        # 作业编号 -> 作业，按提交顺序排列
+        self._jobs: Dict[str, ExportJob] = {}
+        self._runners: Dict[str, Tuple[JobRunner, str]] = {}
+        # (优先级, 提交序号, 作业编号)
+        self._queue: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self._ready: Optional[asyncio.Condition] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._loaded = False
+
+    def _load(self) -> None:
+        """读取上次运行保存的作业状态；当时未结束的作业标记为被中断"""
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            saved = json.loads(self.state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for data in saved.get("jobs", []) if isinstance(saved, dict) else []:
+            try:
+                job = ExportJob.from_dict(data)
+            except (KeyError, TypeError):
+                continue
+            if not job.finished:
+                job.status = FAILED
+                job.error = "Interrupted by server restart"
+                job.finished_at = job.finished_at or time.time()
+            self._jobs[job.job_id] = job
+
+    def _save(self) -> None:
+        """保存作业状态（写入临时文件后替换，保存失败不影响作业执行）"""
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.job_id]
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".jobs-", suffix=".json", dir=str(self.state_path.parent))
+            with os.fdopen(fd, "w", encoding="utf-8") as state_file:
+                json.dump({"jobs": [job.to_dict() for job in self._jobs.values()]}, state_file, ensure_ascii=False)
+            os.replace(temp_path, self.state_path)
+        except OSError:
+            pass
+
+    def find_reusable(self, key: Optional[str]) -> Optional[ExportJob]:
+        """查找复用键相同、已完成且输出文件都还存在的作业"""
+        if key is None:
+            return None
+        self._load()
+        for job in reversed(list(self._jobs.values())):
+            if job.key == key and job.status == DONE and job.outputs and all(
+                    os.path.exists(path) for path in job.outputs):
+                return job
+        return None
+
+    def submit(self, kind: str, doc_name: str, output: str, run: JobRunner, priority: str = "normal",
+               key: Optional[str] = None, mode: str = READ) -> ExportJob:
+        """
+        提交导出作业，立即返回
+
+        Args:
+            kind: 作业类型
+            doc_name: 文档名称或句柄，空字符串表示当前文档
+            output: 输出文件或目录
+            run: 执行函数
+            priority: 优先级 high / normal / low
+            key: 复用键
+            mode: 运行期间对文档的访问方式（READ / WRITE），临时修改文档的导出使用 WRITE
+
+        Returns:
+            新作业
+
+        Raises:
+            ParameterError: 优先级无效
+        """
+        if priority not in PRIORITIES:
+            raise ParameterError(f"Invalid priority: {priority}. Must be one of: {', '.join(PRIORITIES)}")
+        self._load()
+        job = ExportJob(uuid.uuid4().hex[:12], kind, doc_name, output, priority, key)
+        self._jobs[job.job_id] = job
+        self._runners[job.job_id] = (run, mode)
+        heapq.heappush(self._queue, (PRIORITIES[priority], next(self._sequence), job.job_id))
+        self._save()
+        self._start_workers()
+        asyncio.ensure_future(self._notify())
+        return job
+
+    def get(self, job_id: str) -> ExportJob:
+        """
+        Raises:
+            ParameterError: 作业不存在
+        """
+        self._load()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise ParameterError(f"Export job not found: {job_id}")
+        return job
+
+    def jobs(self) -> List[ExportJob]:
+        """全部作业，最近提交的在前"""
+        self._load()
+        return list(reversed(list(self._jobs.values())))
+
+    def queue_position(self, job_id: str) -> int:
+        """排队中作业前面还有多少个排队的作业"""
+        waiting = sorted(entry for entry in self._queue if self._jobs[entry[2]].status == QUEUED)
+        for position, entry in enumerate(waiting):
+            if entry[2] == job_id:
+                return position
+        return 0
+
+    async def wait(self, job_id: str, progress: Optional[ProgressCallback] = None) -> ExportJob:
+        """等待作业结束，期间把进度转发给 progress"""
+        job = self.get(job_id)
+        if progress is not None:
+            job.listeners.append(progress)
+        try:
+            await job.finished_event().wait()
+        finally:
+            if progress in job.listeners:
+                job.listeners.remove(progress)
+        return job
+
+    async def cancel(self, job_id: str) -> ExportJob:
+        """
+        取消作业：排队中的作业直接取消，运行中的作业取消执行任务并等待它结束
+        （图片导出会等导出脚本结束、恢复幻灯片的跳过状态后才结束）
+
+        Raises:
+            ParameterError: 作业不存在或已经结束
+        """
+        job = self.get(job_id)
+        if job.finished:
+            raise ParameterError(f"Export job {job_id} has already finished ({job.status})")
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)
+        elif job.task is not None:
+            job.task.cancel()
+            await job.finished_event().wait()
+        return job
+
+    def close(self) -> None:
+        """停止作业执行（服务器退出时调用）；运行中的作业在下次启动时显示为被中断"""
+        for task in self._worker_tasks:
+            task.cancel()
+        self._worker_tasks.clear()
+        for job in self._jobs.values():
+            if job.task is not None:
+                job.task.cancel()
+
+    def _start_workers(self) -> None:
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        if self._ready is None:
+            self._ready = asyncio.Condition()
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.ensure_future(self._worker()))
+
+    async def _notify(self) -> None:
+        async with self._ready:
+            self._ready.notify()
+
+    async def _next_job(self) -> ExportJob:
+        async with self._ready:
+            while True:
+                while self._queue:
+                    _, _, job_id = heapq.heappop(self._queue)
+                    job = self._jobs.get(job_id)
+                    if job is not None and job.status == QUEUED:
+                        return job
+                await self._ready.wait()
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._next_job()
+            await self._run(job)
+
+    @asynccontextmanager
+    async def _document_access(self, doc_name: str, mode: str) -> AsyncIterator[None]:
+        if self.scheduler is None:
+            yield
+        else:
+            async with self.scheduler.schedule(doc_name, mode):
+                yield
+
+    async def _run(self, job: ExportJob) -> None:
+        run, mode = self._runners.pop(job.job_id)
+        async with self._document_access(job.doc_name, mode):
+            if job.status != QUEUED:
+                # 等待文档期间被取消
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._save()
+            job.task = asyncio.ensure_future(run(job))
+            # 单独等待作业任务：作业被取消时工作协程继续处理下一个作业
+            await asyncio.wait({job.task})
+
+        if job.task.cancelled():
+            self._finish(job, CANCELLED)
+        elif job.task.exception() is not None:
+            self._finish(job, FAILED, str(job.task.exception()))
+        else:
+            job.outputs = list(job.task.result())
+            self._finish(job, DONE)
+        job.task = None
+
+    def _finish(self, job: ExportJob, status: str, error: str = "") -> None:
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        self._runners.pop(job.job_id, None)
+        self._save()
+        job.finished_event().set()
@@ -0,0 +1,118 @@
+"""
+Whole-deck geometry dump for Keynote-MCP
+
+一次脚本调用导出文档中所有对象的位置、尺寸、类型和文本长度，结果按列组织：
+每一列是一个等长数组，第 i 个对象的数据分布在各列的第 i 个元素中，
+可以直接交给 NumPy（如 ``numpy.asarray(geometry["x"])``）做布局计算。
+
+每张幻灯片只按对象类型批量读取属性（``position of every iWork item`` 等），
+Apple Event 数量与幻灯片数量成线性关系，与对象数量无关。
+"""
+
+from typing import Any, Dict, List
+
+from .script_templates import script_template
+
+# kind 列中的类型编码，按下标对应类型名称
+KIND_NAMES: List[str] = ["other", "text", "shape", "image", "table", "chart", "line", "movie", "group", "audio"]
+
+# 列名，顺序与 DUMP_GEOMETRY 返回的数组一致
+GEOMETRY_COLUMNS: List[str] = ["slide", "kind", "x", "y", "w", "h", "text_length"]
+
+# 读取 firstSlide..lastSlide 上所有对象的几何信息，结果放在 slideColumn、kindColumn、xColumn、yColumn、
+# wColumn、hColumn、textColumn 这几个等长列表中；可嵌入其他模板正文（如文档模型导出）
+GEOMETRY_COLUMNS_SCRIPT = '''
+    set slideColumn to {}
+    set kindColumn to {}
+    set xColumn to {}
+    set yColumn to {}
+    set wColumn to {}
+    set hColumn to {}
+    set textColumn to {}
+
+    repeat with slideIndex from firstSlide to lastSlide
+        set targetSlide to slide slideIndex of targetDoc
+        tell targetSlide
+            -- 批量读取属性：每个属性一个 Apple Event
+            set itemClasses to class of every iWork item
+            set itemPositions to position of every iWork item
+            set itemWidths to width of every iWork item
+            set itemHeights to height of every iWork item
+            -- 文本框和形状的文本按各自类型批量读取，按出现顺序与对象对应
+            set textItemTexts to object text of every text item
+            set shapeTexts to object text of every shape
+        end tell
+
+        set textItemIndex to 0
+        set shapeIndex to 0
+        repeat with itemIndex from 1 to count of itemClasses
+            set itemClass to item itemIndex of itemClasses
+            set textLength to 0
+            if itemClass is text item then
+                set kindCode to 1
+                set textItemIndex to textItemIndex + 1
+                set textLength to length of (item textItemIndex of textItemTexts)
+            else if itemClass is shape then
+                set kindCode to 2
+                set shapeIndex to shapeIndex + 1
+                set textLength to length of (item shapeIndex of shapeTexts)
+            else if itemClass is image then
+                set kindCode to 3
+            else if itemClass is table then
+                set kindCode to 4
+            else if itemClass is chart then
+                set kindCode to 5
+            else if itemClass is line then
+                set kindCode to 6
+            else if itemClass is movie then
+                set kindCode to 7
+            else if itemClass is group then
+                set kindCode to 8
+            else if itemClass is audio clip then
+                set kindCode to 9
+            else
+                set kindCode to 0
+            end if
+
+            set itemPosition to item itemIndex of itemPositions
+            set end of slideColumn to slideIndex
+            set end of kindColumn to kindCode
+            set end of xColumn to item 1 of itemPosition
+            set end of yColumn to item 2 of itemPosition
+            set end of wColumn to item itemIndex of itemWidths
+            set end of hColumn to item itemIndex of itemHeights
+            set end of textColumn to textLength
+        end repeat
+    end repeat
+'''
+
+# 导出 firstSlide..lastSlide（lastSlide 为 0 表示到最后一张）上所有对象的几何信息
+DUMP_GEOMETRY = script_template(
+    "dump_geometry",
+    ["docRef", "firstSlide", "lastSlide"],
+    '''
+    set slideCount to count of slides of targetDoc
+    if lastSlide is 0 or lastSlide > slideCount then set lastSlide to slideCount
+''' + GEOMETRY_COLUMNS_SCRIPT + '''
+    return my jsonObject({"slideCount", slideCount, "slide", slideColumn, "kind", kindColumn, "x", xColumn, "y", yColumn, "w", wColumn, "h", hColumn, "textLength", textColumn})
+    '''
+)
+
+
+def geometry_from_dump(dump: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    将 DUMP_GEOMETRY 的结果整理为列式结构
+
+    Returns:
+        {"slide_count", "item_count", "kinds", "slide", "kind", "x", "y", "w", "h", "text_length"}，
+        其中 kinds 为 kind 列编码对应的类型名称
+    """
+    geometry: Dict[str, Any] = {
+        "slide_count": dump["slideCount"],
+        "item_count": len(dump["slide"]),
+        "kinds": list(KIND_NAMES),
+    }
+    for column, key in zip(GEOMETRY_COLUMNS, ["slide", "kind", "x", "y", "w", "h", "textLength"]):
+        geometry[column] = dump[key]
+    return geometry
+
@@ -0,0 +1,248 @@
+"""
+Markdown outline parser for Keynote-MCP
+
+把 Markdown 大纲解析为幻灯片列表，每张幻灯片由标题和若干内容块组成，
+内容块与现有内容工具一一对应（副标题、文本框、项目符号列表、编号列表、代码块、引用、图片）。
+
+分页规则：一级和二级标题开始新的幻灯片，``---`` 分隔线也开始新的幻灯片；
+三级及以下标题作为副标题。行内的强调、行内代码和链接标记会被去掉，只保留文本。
+"""
+
+import re
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from .error_handler import ParameterError
+
+# 内容块类型
+SUBTITLE = "subtitle"
+TEXT = "text"
+BULLETS = "bullets"
+NUMBERED = "numbered"
+CODE = "code"
+QUOTE = "quote"
+IMAGE = "image"
+
+_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+_RULE = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+_FENCE = re.compile(r"^\s{0,3}(`{3,}|~{3,})")
+_BULLET = re.compile(r"^(\s*)[-*+]\s+(.*)$")
+_NUMBERED = re.compile(r"^(\s*)\d+[.)]\s+(.*)$")
+_QUOTE = re.compile(r"^\s{0,3}>\s?(.*)$")
+_IMAGE = re.compile(r"^\s*!\[([^\]]*)\]\(\s*<?([^\s)>]+)>?(?:\s+\"[^\"]*\")?\s*\)\s*$")
+
+# 行内标记：图片、链接、行内代码、粗体、删除线、斜体
+_INLINE = [
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),
+    (re.compile(r"\[([^\]]*)\]\([^)]*\)"), r"\1"),
+    (re.compile(r"`([^`]+)`"), r"\1"),
+    (re.compile(r"(\*\*|__)(\S(?:.*?\S)?)\1"), r"\2"),
+    (re.compile(r"~~(\S(?:.*?\S)?)~~"), r"\1"),
+    (re.compile(r"(?<![\w*])\*(\S(?:.*?\S)?)\*(?![\w*])"), r"\1"),
+    (re.compile(r"(?<!\w)_(\S(?:.*?\S)?)_(?!\w)"), r"\1"),
+]
+
+# 列表缩进：每级缩进的空格数（制表符按 4 个空格计算）
+_INDENT_WIDTH = 2
+
+
+class Block(NamedTuple):
+    """幻灯片中的一个内容块"""
+    kind: str
+    # 副标题、文本、代码、引用的文本；图片为图片路径
+    text: str = ""
+    # 列表项 (缩进级别, 文本)
+    items: Tuple[Tuple[int, str], ...] = ()
+
+
+class SlideSpec(NamedTuple):
+    """一张幻灯片：标题（可为空）和内容块"""
+    title: str
+    blocks: Tuple[Block, ...]
+    # 开始这张幻灯片的 Markdown 行号（JSON 形式为幻灯片序号，均从 1 开始），用于报告错误
+    line: int
+
+
+def strip_inline(text: str) -> str:
+    """去掉行内 Markdown 标记，只保留文本"""
+    for pattern, replacement in _INLINE:
+        text = pattern.sub(replacement, text)
+    return text.strip()
+
+
+def _indent_level(indent: str) -> int:
+    return len(indent.expandtabs(4)) // _INDENT_WIDTH
+
+
+class _SlideBuilder:
+    def __init__(self, title: str, line: int):
+        self.title = title
+        self.line = line
+        self.blocks: List[Block] = []
+
+    def build(self) -> SlideSpec:
+        return SlideSpec(self.title, tuple(self.blocks), self.line)
+
+
+def parse_markdown(markdown: str) -> List[SlideSpec]:
+    """
+    解析 Markdown 大纲
+
+    Args:
+        markdown: Markdown 文本
+
+    Returns:
+        幻灯片列表，省略既没有标题也没有内容的幻灯片
+
+    Raises:
+        ParameterError: 代码块没有闭合
+    """
+    slides: List[_SlideBuilder] = []
+    current: Optional[_SlideBuilder] = None
+    # 正在收集的段落、列表或引用：(类型, 行)
+    pending_kind: Optional[str] = None
+    pending: List[str] = []
+    pending_items: List[Tuple[int, str]] = []
+
+    def slide(line_number: int) -> _SlideBuilder:
+        nonlocal current
+        if current is None:
+            current = _SlideBuilder("", line_number)
+            slides.append(current)
+        return current
+
+    def flush() -> None:
+        nonlocal pending_kind
+        if pending_kind in (BULLETS, NUMBERED):
+            current.blocks.append(Block(pending_kind, items=tuple(pending_items)))
+        elif pending_kind == TEXT:
+            current.blocks.append(Block(TEXT, " ".join(strip_inline(line) for line in pending)))
+        elif pending_kind == QUOTE:
+            # 引用中的空行分隔段落，其余折行合并为一行
+            paragraphs = " ".join(line.strip() or "\n" for line in pending).split("\n")
+            current.blocks.append(Block(QUOTE, "\n".join(strip_inline(text) for text in paragraphs if text.strip())))
+        pending_kind = None
+        pending.clear()
+        pending_items.clear()
+
+    lines = markdown.splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        line_number = index + 1
+        index += 1
+
+        fence = _FENCE.match(line)
+        if fence:
+            flush()
+            marker = fence.group(1)
+            code_lines = []
+            while index < len(lines) and not lines[index].strip().startswith(marker):
+                code_lines.append(lines[index])
+                index += 1
+            if index >= len(lines):
+                raise ParameterError(f"Line {line_number}: code fence is not closed")
+            index += 1
+            slide(line_number).blocks.append(Block(CODE, "\n".join(code_lines)))
+            continue
+
+        if not line.strip():
+            # 空行结束段落和引用；列表中的空行不结束列表
+            if pending_kind in (TEXT, QUOTE):
+                flush()
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            flush()
+            text = strip_inline(heading.group(2))
+            if len(heading.group(1)) <= 2:
+                current = _SlideBuilder(text, line_number)
+                slides.append(current)
+            else:
+                slide(line_number).blocks.append(Block(SUBTITLE, text))
+            continue
+
+        if _RULE.match(line):
+            flush()
+            current = None
+            continue
+
+        image = _IMAGE.match(line)
+        if image:
+            flush()
+            slide(line_number).blocks.append(Block(IMAGE, image.group(2)))
+            continue
+
+        for kind, pattern in ((BULLETS, _BULLET), (NUMBERED, _NUMBERED)):
+            item = pattern.match(line)
+            if item:
+                level = _indent_level(item.group(1))
+                # 缩进的列表项属于当前列表，即使列表类型不同
+                if pending_kind not in (BULLETS, NUMBERED) or (level == 0 and pending_kind != kind):
+                    flush()
+                    slide(line_number)
+                    pending_kind = kind
+                pending_items.append((level, strip_inline(item.group(2))))
+                break
+        else:
+            quote = _QUOTE.match(line)
+            if quote:
+                if pending_kind != QUOTE:
+                    flush()
+                    slide(line_number)
+                    pending_kind = QUOTE
+                pending.append(quote.group(1))
+            elif pending_kind in (BULLETS, NUMBERED) and line.startswith((" ", "\t")) and pending_items:
+                # 列表项的续行
+                level, text = pending_items[-1]
+                pending_items[-1] = (level, f"{text} {strip_inline(line)}")
+            else:
+                if pending_kind != TEXT:
+                    flush()
+                    slide(line_number)
+                    pending_kind = TEXT
+                pending.append(line)
+
+    flush()
+    return [builder.build() for builder in slides if builder.title or builder.blocks]
+
+
+def slides_from_spec(spec: Any) -> List[SlideSpec]:
+    """
+    解析 JSON 形式的幻灯片列表
+
+    格式: [{"title": "...", "blocks": [{"type": "bullets", "items": ["a", "b"]}, {"type": "code", "text": "..."},
+    {"type": "image", "path": "..."}, ...]}, ...]；type 取值与 Block.kind 相同，
+    列表项可以是字符串或 {"text": "...", "level": 缩进级别}
+
+    Raises:
+        ParameterError: 格式错误
+    """
+    if not isinstance(spec, list):
+        raise ParameterError("slides must be a list")
+
+    slides = []
+    for number, slide in enumerate(spec, start=1):
+        if not isinstance(slide, dict):
+            raise ParameterError(f"Slide {number} must be an object")
+        blocks = []
+        for block in slide.get("blocks") or []:
+            kind = block.get("type") if isinstance(block, dict) else None
+            if kind in (BULLETS, NUMBERED):
+                items = []
+                for item in block.get("items") or []:
+                    if isinstance(item, dict):
+                        items.append((int(item.get("level", 0)), str(item.get("text", ""))))
+                    else:
+                        items.append((0, str(item)))
+                blocks.append(Block(kind, items=tuple(items)))
+            elif kind == IMAGE:
+                if not block.get("path"):
+                    raise ParameterError(f"Slide {number}: image block requires a path")
+                blocks.append(Block(IMAGE, str(block["path"])))
+            elif kind in (SUBTITLE, TEXT, CODE, QUOTE):
+                blocks.append(Block(kind, str(block.get("text", ""))))
+            else:
+                raise ParameterError(f"Slide {number}: unknown block type: {kind}")
+        slides.append(SlideSpec(str(slide.get("title", "")), tuple(blocks), number))
+    return slides
@@ -0,0 +1,394 @@
+"""
+Persistent osascript worker pool for Keynote-MCP
+
+每个工作进程是一个常驻的解释器循环（默认是 osascript_worker.js），通过 stdin/stdout
+上的分帧协议接收 AppleScript 源码并返回结果，从而省去每次调用的进程创建开销。
+
+请求帧: ``<KIND> <字节数>\\n<负载>``，KIND 为 RUN / CALL / PING / QUIT
+（CALL 的负载为以 NUL 分隔的已编译脚本路径和 argv 参数）
+响应帧: ``OK <字节数>\\n<结果>``、``ERR <字节数>\\n<错误信息>`` 或 ``PONG 0\\n``
+"""
+
+import os
+import select
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .error_handler import AppleScriptError, handle_applescript_error
+
+
+DEFAULT_WORKER_SCRIPT = Path(__file__).parent.parent / "applescript" / "osascript_worker.js"
+
+
+def default_worker_command() -> List[str]:
+    """默认的工作进程启动命令"""
+    return ["osascript", "-l", "JavaScript", str(DEFAULT_WORKER_SCRIPT)]
+
+
+def encode_call_payload(script_path: str, argv: Sequence[str]) -> bytes:
+    """编码 CALL 帧的负载"""
+    fields = [str(script_path)] + [str(arg) for arg in argv]
+    if any("\0" in field for field in fields):
+        raise AppleScriptError("Script arguments cannot contain NUL characters")
+    return "\0".join(fields).encode("utf-8")
+
+
+class WorkerUnavailableError(AppleScriptError):
+    """没有可用的工作进程（无法启动或握手失败），调用方可以回退到一次性执行"""
+    pass
+
+
+class WorkerProtocolError(AppleScriptError):
+    """工作进程返回了无法识别的数据或意外退出"""
+    pass
+
+
+class OsascriptWorker:
+    """单个常驻 osascript 工作进程"""
+
+    def __init__(self, command: Sequence[str]):
+        """
+        启动工作进程
+
+        Args:
+            command: 启动命令及参数
+
+        Raises:
+            WorkerUnavailableError: 进程无法启动
+        """
+        try:
+            self.process = subprocess.Popen(
+                list(command),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as e:
+            raise WorkerUnavailableError(f"Failed to start osascript worker: {e}")
+
+        self.executions = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+        self._buffer = b""
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def is_alive(self) -> bool:
+        """工作进程是否仍在运行且协议状态正常"""
+        return not self.broken and self.process.poll() is None
+
+    def _send(self, kind: str, payload: bytes = b"") -> None:
+        header = f"{kind} {len(payload)}\n".encode("ascii")
+        try:
+            self.process.stdin.write(header + payload)
+            self.process.stdin.flush()
+        except (OSError, ValueError) as e:
+            self.broken = True
+            raise WorkerProtocolError(f"Failed to write to osascript worker: {e}")
+
+    def _fill(self, deadline: float) -> None:
+        """从 stdout 读取更多数据到缓冲区，超时则终止进程"""
+        fd = self.process.stdout.fileno()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.kill()
+            raise AppleScriptError("AppleScript execution timed out")
+
+        ready, _, _ = select.select([fd], [], [], remaining)
+        if not ready:
+            self.kill()
+            raise AppleScriptError("AppleScript execution timed out")
+
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            self.broken = True
+            raise WorkerProtocolError("osascript worker exited unexpectedly")
+        self._buffer += chunk
+
+    def _receive(self, deadline: float) -> Tuple[str, bytes]:
+        """读取一个完整的响应帧"""
+        while b"\n" not in self._buffer:
+            self._fill(deadline)
+
+        header, self._buffer = self._buffer.split(b"\n", 1)
+        try:
+            kind, length_text = header.decode("ascii").split(" ", 1)
+            length = int(length_text)
+        except ValueError:
+            self.broken = True
+            raise WorkerProtocolError(f"Malformed frame header from osascript worker: {header!r}")
+
+        while len(self._buffer) < length:
+            self._fill(deadline)
+
+        payload, self._buffer = self._buffer[:length], self._buffer[length:]
+        return kind, payload
+
+    def execute(self, script_code: str, timeout: float) -> str:
+        """
+        在工作进程中执行 AppleScript 代码
+
+        Args:
+            script_code: AppleScript 代码
+            timeout: 超时时间（秒）
+
+        Returns:
+            执行结果
+        """
+        return self.submit("RUN", script_code.encode("utf-8"), timeout)
+
+    def call(self, script_path: str, argv: Sequence[str], timeout: float) -> str:
+        """
+        以 argv 调用已编译脚本的 run 处理器（脚本在工作进程内只加载一次）
+
+        Args:
+            script_path: 已编译 .scpt 文件路径
+            argv: 传给 run 处理器的字符串参数
+            timeout: 超时时间（秒）
+
+        Returns:
+            执行结果
+        """
+        return self.submit("CALL", encode_call_payload(script_path, argv), timeout)
+
+    def submit(self, kind: str, payload: bytes, timeout: float) -> str:
+        """发送一个请求帧并等待执行结果"""
+        deadline = time.monotonic() + timeout
+        self._send(kind, payload)
+        kind, payload = self._receive(deadline)
+
+        self.executions += 1
+        self.last_used = time.monotonic()
+        text = payload.decode("utf-8", errors="replace")
+
+        if kind == "OK":
+            return text.strip()
+        if kind == "ERR":
+            handle_applescript_error(text or "Unknown error")
+        self.broken = True
+        raise WorkerProtocolError(f"Unexpected frame from osascript worker: {kind}")
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        """健康检查：发送 PING 并等待 PONG"""
+        if not self.is_alive():
+            return False
+        try:
+            self._send("PING")
+            kind, _ = self._receive(time.monotonic() + timeout)
+        except AppleScriptError:
+            self.broken = True
+            return False
+        self.last_used = time.monotonic()
+        return kind == "PONG"
+
+    def abort(self) -> None:
+        """
+        终止正在执行的脚本（可在其他线程调用）
+
+        只结束进程而不关闭管道，执行线程会读到 EOF 并正常归还该工作进程
+        """
+        self.broken = True
+        if self.process.poll() is None:
+            self.process.kill()
+
+    def kill(self) -> None:
+        """立即终止工作进程"""
+        self.broken = True
+        if self.process.poll() is None:
+            self.process.kill()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        self._close_pipes()
+
+    def close(self) -> None:
+        """发送 QUIT 并等待进程退出，必要时强制终止"""
+        if self.process.poll() is None and not self.broken:
+            try:
+                self._send("QUIT")
+                self.process.wait(timeout=2)
+            except (AppleScriptError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+    def _close_pipes(self) -> None:
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                if stream:
+                    stream.close()
+            except OSError:
+                pass
+
+
+class OsascriptWorkerPool:
+    """常驻 osascript 工作进程池"""
+
+    def __init__(self, size: int, max_executions: int = 100, command: Optional[Sequence[str]] = None,
+                 health_check_interval: float = 30.0, spawn_retry_interval: float = 30.0):
+        """
+        初始化工作进程池（进程按需启动）
+
+        Args:
+            size: 最大工作进程数
+            max_executions: 单个工作进程执行多少次后回收重建（<=0 表示不回收）
+            command: 工作进程启动命令，默认使用 osascript 运行 osascript_worker.js
+            health_check_interval: 空闲超过该秒数的工作进程在复用前先做 PING 检查
+            spawn_retry_interval: 启动失败后暂停启动新进程的秒数
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        self.size = size
+        self.max_executions = max_executions
+        self.command = list(command) if command else default_worker_command()
+        self.health_check_interval = health_check_interval
+        self.spawn_retry_interval = spawn_retry_interval
+
+        self._idle: List[OsascriptWorker] = []
+        self._total = 0
+        self._closed = False
+        self._spawn_blocked_until = 0.0
+        self._cond = threading.Condition()
+
+        self._stats = {
+            "spawned": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "executions": 0,
+            "spawn_failures": 0,
+        }
+
+    def _spawn(self) -> OsascriptWorker:
+        worker = OsascriptWorker(self.command)
+        if not worker.ping():
+            worker.kill()
+            raise WorkerUnavailableError("osascript worker failed the startup handshake")
+        return worker
+
+    def _is_healthy(self, worker: OsascriptWorker) -> bool:
+        if not worker.is_alive():
+            return False
+        if time.monotonic() - worker.last_used < self.health_check_interval:
+            return True
+        return worker.ping()
+
+    def acquire(self, timeout: float = 30.0) -> OsascriptWorker:
+        """
+        获取一个健康的工作进程
+
+        Raises:
+            WorkerUnavailableError: 无法启动工作进程或等待超时
+        """
+        deadline = time.monotonic() + timeout
+
+        while True:
+            spawn = False
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise WorkerUnavailableError("osascript worker pool is closed")
+                    if self._idle:
+                        worker = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        if time.monotonic() < self._spawn_blocked_until:
+                            raise WorkerUnavailableError("osascript worker spawning is temporarily disabled")
+                        self._total += 1
+                        spawn = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise WorkerUnavailableError("Timed out waiting for an osascript worker")
+                    self._cond.wait(remaining)
+
+            if spawn:
+                try:
+                    worker = self._spawn()
+                except WorkerUnavailableError:
+                    with self._cond:
+                        self._total -= 1
+                        self._stats["spawn_failures"] += 1
+                        self._spawn_blocked_until = time.monotonic() + self.spawn_retry_interval
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["spawned"] += 1
+                return worker
+
+            # 健康检查在锁外进行，失败则丢弃后重新获取
+            if self._is_healthy(worker):
+                return worker
+            self._discard(worker)
+
+    def release(self, worker: OsascriptWorker) -> None:
+        """归还工作进程；已损坏或达到执行上限的进程会被回收"""
+        recycle = self.max_executions > 0 and worker.executions >= self.max_executions
+        if not worker.is_alive() or recycle or self._closed:
+            self._discard(worker, recycled=recycle)
+            return
+
+        with self._cond:
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def _discard(self, worker: OsascriptWorker, recycled: bool = False) -> None:
+        worker.close()
+        with self._cond:
+            self._total -= 1
+            self._stats["recycled" if recycled else "discarded"] += 1
+            self._cond.notify()
+
+    def execute(self, script_code: str, timeout: float = 30.0) -> str:
+        """
+        从池中取出工作进程执行 AppleScript 代码
+
+        Raises:
+            WorkerUnavailableError: 没有可用的工作进程（脚本尚未发送）
+            AppleScriptError: 脚本执行错误或超时
+        """
+        return self.submit("RUN", script_code.encode("utf-8"), timeout)
+
+    def call(self, script_path: str, argv: Sequence[str], timeout: float = 30.0) -> str:
+        """从池中取出工作进程调用已编译脚本（异常同 execute）"""
+        return self.submit("CALL", encode_call_payload(script_path, argv), timeout)
+
+    def submit(self, kind: str, payload: bytes, timeout: float = 30.0) -> str:
+        """从池中取出工作进程发送请求帧"""
+        worker = self.acquire(timeout)
+        return self.submit_on(worker, kind, payload, timeout)
+
+    def submit_on(self, worker: OsascriptWorker, kind: str, payload: bytes, timeout: float = 30.0) -> str:
+        """在已获取的工作进程上发送请求帧，执行结束后自动归还"""
+        try:
+            return worker.submit(kind, payload, timeout)
+        finally:
+            with self._cond:
+                self._stats["executions"] += 1
+            self.release(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取进程池统计信息"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self.size,
+                "workers": self._total,
+                "idle": len(self._idle),
+            })
+        return stats
+
+    def close(self) -> None:
+        """关闭进程池并终止所有空闲工作进程"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            worker.close()
@@ -0,0 +1,154 @@
+"""
+Presenter notes for Keynote-MCP
+
+读取：一次脚本调用按编号列表读取多张幻灯片的演讲者备注。
+写入：所有幻灯片的备注作为一个批处理执行；批处理的参数通过 argv 传给 osascript，
+参数总长度超过上限（KEYNOTE_MCP_MAX_ARG_BYTES，默认 256 KiB）时拆分为多次脚本调用，
+单条超长的备注拆分为一次设置和若干次追加，保证任何一次调用的参数都不超过上限。
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from .config import env_int
+from .deck_text import normalize_text
+from .script_library import encode_argument
+from .script_templates import BatchOperation, script_template
+
+# 读取 slideNumbers 中各幻灯片的备注（空列表表示全部幻灯片），超出范围的编号跳过
+DUMP_PRESENTER_NOTES = script_template(
+    "dump_presenter_notes",
+    ["docRef", "slideNumbers"],
+    '''
+    set slideCount to count of slides of targetDoc
+    if (count of slideNumbers) is 0 then
+        set slideNumbers to {}
+        repeat with slideIndex from 1 to slideCount
+            set end of slideNumbers to slideIndex
+        end repeat
+    end if
+
+    set foundSlides to {}
+    set slideNotes to {}
+    repeat with slideNumber in slideNumbers
+        set slideNumber to contents of slideNumber
+        if slideNumber is not greater than slideCount then
+            set end of foundSlides to slideNumber
+            try
+                set end of slideNotes to presenter notes of slide slideNumber of targetDoc
+            on error
+                set end of slideNotes to ""
+            end try
+        end if
+    end repeat
+
+    return my jsonObject({"slideCount", slideCount, "slides", foundSlides, "notes", slideNotes})
+    '''
+)
+
+# 修改演讲者备注
+SET_PRESENTER_NOTES = script_template(
+    "set_presenter_notes",
+    ["docRef", "slideNumber", "notesText"],
+    '''
+    set presenter notes of slide slideNumber of targetDoc to notesText
+    return "success"
+    '''
+)
+
+# 在演讲者备注末尾追加文本（超长备注拆分写入时使用）
+APPEND_PRESENTER_NOTES = script_template(
+    "append_presenter_notes",
+    ["docRef", "slideNumber", "notesText"],
+    '''
+    tell slide slideNumber of targetDoc
+        set presenter notes to (presenter notes as text) & notesText
+    end tell
+    return "success"
+    '''
+)
+
+# 批处理中每个操作除参数以外的固定开销（模板名称、期望值、参数个数）的估算上限
+_OPERATION_OVERHEAD = 64
+
+
+def max_argument_bytes() -> int:
+    """单次脚本调用的参数总长度上限（环境变量 KEYNOTE_MCP_MAX_ARG_BYTES，默认 256 KiB）"""
+    return max(4096, env_int("KEYNOTE_MCP_MAX_ARG_BYTES", 256 * 1024))
+
+
+def split_text(text: str, max_bytes: int) -> List[str]:
+    """
+    按 UTF-8 编码长度把文本拆分为若干段（在字符边界拆分）
+
+    Args:
+        text: 文本
+        max_bytes: 每段编码后的最大字节数
+
+    Returns:
+        文本段列表，空文本返回 [""]；单个字符超过 max_bytes 时该字符单独成段
+    """
+    pieces = []
+    start = 0
+    while start < len(text):
+        # 每个字符至少一个字节，先按字符数取上限，再按实际编码长度收缩
+        end = min(len(text), start + max_bytes)
+        size = len(text[start:end].encode("utf-8"))
+        while size > max_bytes and end - start > 1:
+            end = start + max(1, (end - start) * max_bytes // size)
+            size = len(text[start:end].encode("utf-8"))
+        pieces.append(text[start:end])
+        start = end
+    return pieces or [""]
+
+
+def _operation_bytes(operation: BatchOperation) -> int:
+    return _OPERATION_OVERHEAD + sum(len(encode_argument(arg).encode("utf-8")) + 1 for arg in operation.args)
+
+
+def plan_notes_batches(notes: Dict[int, str], max_bytes: Optional[int] = None) -> List[List[BatchOperation]]:
+    """
+    把备注写入拆分为若干批处理，每个批处理的参数总长度不超过 max_bytes
+
+    Args:
+        notes: 幻灯片编号 -> 备注文本
+        max_bytes: 单次脚本调用的参数总长度上限，默认 max_argument_bytes()
+
+    Returns:
+        批处理列表（按顺序执行）；通常只有一个
+    """
+    max_bytes = max_bytes or max_argument_bytes()
+    # 留出文档参数和单个操作的固定开销
+    piece_bytes = max(1, max_bytes // 2 - _OPERATION_OVERHEAD)
+
+    operations: List[BatchOperation] = []
+    for slide_number in sorted(notes):
+        pieces = split_text(notes[slide_number], piece_bytes)
+        operations.append(BatchOperation(SET_PRESENTER_NOTES, [slide_number, pieces[0]], expect="success"))
+        operations.extend(
+            BatchOperation(APPEND_PRESENTER_NOTES, [slide_number, piece], expect="success") for piece in pieces[1:]
+        )
+
+    batches: List[List[BatchOperation]] = []
+    used = 0
+    for operation in operations:
+        size = _operation_bytes(operation)
+        if not batches or used + size > max_bytes - _OPERATION_OVERHEAD:
+            batches.append([])
+            used = 0
+        batches[-1].append(operation)
+        used += size
+    return batches
+
+
+def notes_from_dump(dump: Dict[str, Any]) -> Dict[int, str]:
+    """将 DUMP_PRESENTER_NOTES 的结果整理为 幻灯片编号 -> 备注"""
+    return {
+        slide_number: normalize_text(notes)
+        for slide_number, notes in zip(dump["slides"], dump["notes"])
+    }
+
+
+def missing_slides(requested: Sequence[int], dump: Dict[str, Any]) -> List[int]:
+    """请求的幻灯片中超出文档范围的编号"""
+    found = set(dump["slides"])
+    return [slide_number for slide_number in requested if slide_number not in found]
@@ -0,0 +1,220 @@
+"""
+Slide render cache for Keynote-MCP
+
+导出前用一次脚本调用读取幻灯片的指纹数据（布局、文本框和形状的文本、图片文件名、所有对象的类型和几何信息，
+以及主题和幻灯片尺寸），按内容计算每张幻灯片的指纹。渲染结果以 <指纹>.<扩展名> 保存在缓存目录中，
+指纹相同的幻灯片直接复制缓存的图片，只导出发生变化的幻灯片。
+
+缓存按总大小限制（KEYNOTE_MCP_RENDER_CACHE_MB，默认 512 MB，0 表示禁用），
+超出时按最近使用时间（命中时更新文件修改时间）淘汰最久未使用的图片。
+
+指纹不包含字体、颜色等样式和表格、图表的内容：只修改这些属性时仍会返回旧的渲染结果。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import cache_dir, env_int
+from .geometry import GEOMETRY_COLUMNS_SCRIPT
+from .script_templates import script_template
+
+# 读取 firstSlide..lastSlide（lastSlide 为 0 表示到最后一张）的指纹数据
+DUMP_RENDER_STATE = script_template(
+    "dump_render_state",
+    ["docRef", "firstSlide", "lastSlide"],
+    '''
+    set slideCount to count of slides of targetDoc
+    if lastSlide is 0 or lastSlide > slideCount then set lastSlide to slideCount
+
+    set layoutNames to {}
+    set slideTexts to {}
+    set slideShapes to {}
+    set slideImageFiles to {}
+    repeat with slideIndex from firstSlide to lastSlide
+        tell slide slideIndex of targetDoc
+            try
+                set end of layoutNames to name of base slide
+            on error
+                set end of layoutNames to ""
+            end try
+            set end of slideTexts to object text of every text item
+            set end of slideShapes to object text of every shape
+            try
+                set end of slideImageFiles to file name of every image
+            on error
+                set end of slideImageFiles to {}
+            end try
+        end tell
+    end repeat
+''' + GEOMETRY_COLUMNS_SCRIPT + '''
+    try
+        set themeName to name of document theme of targetDoc
+    on error
+        set themeName to ""
+    end try
+
+    try
+        set slideWidth to width of targetDoc
+        set slideHeight to height of targetDoc
+    on error
+        set slideWidth to 1920
+        set slideHeight to 1080
+    end try
+
+    return my jsonObject({"slideCount", slideCount, "firstSlide", firstSlide, "theme", themeName, "width", slideWidth, "height", slideHeight, "layouts", layoutNames, "texts", slideTexts, "shapes", slideShapes, "imageFiles", slideImageFiles, "slide", slideColumn, "kind", kindColumn, "x", xColumn, "y", yColumn, "w", wColumn, "h", hColumn})
+    '''
+)
+
+
+def slide_fingerprints(dump: Dict[str, Any], image_format: str) -> Dict[int, str]:
+    """
+    由 DUMP_RENDER_STATE 的结果计算每张幻灯片的指纹
+
+    Args:
+        dump: 指纹数据
+        image_format: 图片格式（不同格式的渲染结果分别缓存）
+
+    Returns:
+        幻灯片编号 -> 指纹（SHA-256 十六进制）
+    """
+    items: Dict[int, list] = {}
+    columns = zip(dump["slide"], dump["kind"], dump["x"], dump["y"], dump["w"], dump["h"])
+    for slide_number, kind, x, y, w, h in columns:
+        items.setdefault(slide_number, []).append([kind, round(x, 2), round(y, 2), round(w, 2), round(h, 2)])
+
+    fingerprints = {}
+    rows = zip(dump["layouts"], dump["texts"], dump["shapes"], dump["imageFiles"])
+    for offset, (layout, texts, shapes, image_files) in enumerate(rows):
+        slide_number = dump["firstSlide"] + offset
+        payload = json.dumps([
+            image_format.lower(), dump["theme"], dump["width"], dump["height"], layout, texts, shapes,
+            image_files, items.get(slide_number, [])
+        ], ensure_ascii=False, separators=(",", ":"))
+        fingerprints[slide_number] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return fingerprints
+
+
+class RenderCache:
+    """按内容指纹寻址的幻灯片图片缓存（按总大小 LRU 淘汰）"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        初始化渲染缓存
+
+        Args:
+            directory: 缓存目录，默认为缓存根目录下的 renders
+            max_bytes: 缓存总大小上限，默认读取环境变量 KEYNOTE_MCP_RENDER_CACHE_MB；0 表示禁用
+        """
+        self.directory = Path(directory) if directory else cache_dir("renders")
+        if max_bytes is None:
+            max_bytes = env_int("KEYNOTE_MCP_RENDER_CACHE_MB", 512) * 1024 * 1024
+        self.max_bytes = max(0, max_bytes)
+        # 指纹 -> (文件名, 大小)，按最近使用时间排列（最久未使用的在前）
+        self._entries: Optional["OrderedDict[str, tuple]"] = None
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _index(self) -> "OrderedDict[str, tuple]":
+        """首次使用时扫描缓存目录，按文件修改时间建立 LRU 顺序"""
+        if self._entries is None:
+            found = []
+            try:
+                for entry in os.scandir(self.directory):
+                    if entry.is_file() and not entry.name.startswith("."):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.name, stat.st_size))
+            except FileNotFoundError:
+                pass
+            self._entries = OrderedDict()
+            for _, name, size in sorted(found):
+                self._entries[name.split(".", 1)[0]] = (name, size)
+            self._total = sum(size for _, size in self._entries.values())
+        return self._entries
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        """
+        查找缓存的图片
+
+        Returns:
+            缓存文件路径；未命中时返回 None
+        """
+        if not self.enabled:
+            return None
+        entries = self._index()
+        entry = entries.get(fingerprint)
+        path = self.directory / entry[0] if entry else None
+        if path is None or not path.exists():
+            if entry is not None:
+                self._remove(fingerprint)
+            self.misses += 1
+            return None
+        entries.move_to_end(fingerprint)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return str(path)
+
+    def put(self, fingerprint: str, source: str) -> None:
+        """把渲染结果复制到缓存（写入临时文件后替换），超出大小上限时淘汰最久未使用的图片"""
+        if not self.enabled:
+            return
+        entries = self._index()
+        name = fingerprint + os.path.splitext(source)[1]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{fingerprint}-", dir=str(self.directory))
+        os.close(fd)
+        try:
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, self.directory / name)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        if fingerprint in entries:
+            self._remove(fingerprint, delete=False)
+        size = os.path.getsize(self.directory / name)
+        entries[fingerprint] = (name, size)
+        self._total += size
+        self._evict()
+
+    def _remove(self, fingerprint: str, delete: bool = True) -> None:
+        name, size = self._entries.pop(fingerprint)
+        self._total -= size
+        if delete:
+            try:
+                os.remove(self.directory / name)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        # 至少保留最近写入的一张，单张图片超过上限时也能命中一次
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        entries = self._index() if self.enabled else {}
+        return {
+            "enabled": self.enabled,
+            "entries": len(entries),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,239 @@
+"""
+Per-document operation scheduler for Keynote-MCP
+
+同一文档上的写操作按到达顺序串行执行；读操作之间可以并发，但不会与写操作交错。
+每个文档维护一个先进先出的等待队列：队首连续的读操作一起放行，写操作独占执行，
+因此同一文档上的操作顺序与请求到达顺序一致。
+
+空字符串表示当前（前台）文档，它可能就是某个按句柄访问的文档，因此前台文档的操作与所有文档冲突：
+按文档访问的操作同时在前台文档队列中登记读/写意向（多粒度锁的 IS/IX），
+意向之间互不冲突，前台文档的读操作只与写意向冲突，前台文档的写操作与一切冲突。
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+READ = "read"
+WRITE = "write"
+
+# 前台文档队列中的意向模式：按文档访问的读/写操作在前台文档队列中登记的访问
+_INTENT_READ = "intent_read"
+_INTENT_WRITE = "intent_write"
+
+FRONT_DOCUMENT = ""
+
+# 可以同时持有的访问模式
+_COMPATIBLE = {
+    READ: {READ, _INTENT_READ},
+    WRITE: set(),
+    _INTENT_READ: {READ, _INTENT_READ, _INTENT_WRITE},
+    _INTENT_WRITE: {_INTENT_READ, _INTENT_WRITE},
+}
+
+
+class _AccessStats:
+    """某类访问的计数和等待时间统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float) -> None:
+        self.count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def merge(self, other: "_AccessStats") -> None:
+        self.count += other.count
+        self.total_wait += other.total_wait
+        self.max_wait = max(self.max_wait, other.max_wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_wait_ms": round(self.total_wait / self.count * 1000, 3) if self.count else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class _DocumentQueue:
+    """单个文档的读写队列"""
+
+    def __init__(self):
+        self.waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+        self.active = {mode: 0 for mode in _COMPATIBLE}
+        self.stats = {READ: _AccessStats(), WRITE: _AccessStats()}
+
+    @property
+    def active_readers(self) -> int:
+        return self.active[READ]
+
+    @property
+    def active_writer(self) -> bool:
+        return self.active[WRITE] > 0
+
+    @property
+    def idle(self) -> bool:
+        return not self.waiters and not any(self.active.values())
+
+    def can_grant(self, mode: str) -> bool:
+        return all(not count or held in _COMPATIBLE[mode] for held, count in self.active.items())
+
+    def grant(self, mode: str) -> None:
+        self.active[mode] += 1
+
+    def release(self, mode: str) -> None:
+        self.active[mode] -= 1
+        self.wake()
+
+    def wake(self) -> None:
+        """按队列顺序放行：队首的写操作单独放行，队首连续的可共存操作一起放行"""
+        while self.waiters:
+            mode, future = self.waiters[0]
+            if future.done():
+                # 已取消的等待者
+                self.waiters.popleft()
+                continue
+            if not self.can_grant(mode):
+                return
+            self.waiters.popleft()
+            self.grant(mode)
+            future.set_result(None)
+
+
+class DocumentScheduler:
+    """按文档调度读写操作"""
+
+    def __init__(self):
+        self._queues: Dict[str, _DocumentQueue] = {}
+        # 已清理的空闲队列的累计统计，保证统计数据不随队列回收而丢失
+        self._totals = {READ: _AccessStats(), WRITE: _AccessStats()}
+
+    def _queue(self, document: str) -> _DocumentQueue:
+        queue = self._queues.get(document)
+        if queue is None:
+            queue = self._queues[document] = _DocumentQueue()
+        return queue
+
+    async def acquire(self, document: str, mode: str) -> float:
+        """
+        获取文档的读或写权限
+
+        Args:
+            document: 文档标识（空字符串表示当前文档）
+            mode: READ 或 WRITE
+
+        Returns:
+            排队等待的时间（秒）
+        """
+        if mode not in (READ, WRITE):
+            raise ValueError(f"Invalid access mode: {mode}")
+
+        started = time.monotonic()
+        if document == FRONT_DOCUMENT:
+            await self._wait(FRONT_DOCUMENT, mode)
+        else:
+            # 先在前台文档队列中登记意向，再进入文档自身的队列（加锁顺序固定，不会死锁）
+            intent = _INTENT_WRITE if mode == WRITE else _INTENT_READ
+            await self._wait(FRONT_DOCUMENT, intent)
+            try:
+                await self._wait(document, mode)
+            except asyncio.CancelledError:
+                self._release(FRONT_DOCUMENT, intent)
+                raise
+
+        wait = time.monotonic() - started
+        self._queues[document].stats[mode].record(wait)
+        return wait
+
+    async def _wait(self, document: str, mode: str) -> None:
+        """在一个队列中排队直到获得权限"""
+        queue = self._queue(document)
+
+        # 队列中已有等待者时必须排在其后，保证先到先执行
+        if not queue.waiters and queue.can_grant(mode):
+            queue.grant(mode)
+        else:
+            future = asyncio.get_event_loop().create_future()
+            queue.waiters.append((mode, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # 已获得权限但调用被取消，归还权限
+                    queue.release(mode)
+                else:
+                    future.cancel()
+                    queue.wake()
+                self._discard_if_idle(document)
+                raise
+
+    def release(self, document: str, mode: str) -> None:
+        """释放 acquire 获取的权限"""
+        self._release(document, mode)
+        if document != FRONT_DOCUMENT:
+            self._release(FRONT_DOCUMENT, _INTENT_WRITE if mode == WRITE else _INTENT_READ)
+
+    def _release(self, document: str, mode: str) -> None:
+        queue = self._queues.get(document)
+        if queue is None:
+            return
+        queue.release(mode)
+        self._discard_if_idle(document)
+
+    def _discard_if_idle(self, document: str) -> None:
+        queue = self._queues.get(document)
+        if queue is not None and queue.idle:
+            for mode, stats in queue.stats.items():
+                self._totals[mode].merge(stats)
+            del self._queues[document]
+
+    @asynccontextmanager
+    async def schedule(self, document: Optional[str], mode: str) -> AsyncIterator[None]:
+        """
+        在文档的读写队列中执行一段操作
+
+        Args:
+            document: 文档标识；None 表示操作不针对文档，直接执行
+            mode: READ 或 WRITE
+        """
+        if document is None:
+            yield
+            return
+
+        await self.acquire(document, mode)
+        try:
+            yield
+        finally:
+            self.release(document, mode)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取调度统计：各文档的队列深度、执行中的操作以及等待时间"""
+        totals = {READ: _AccessStats(), WRITE: _AccessStats()}
+        documents = {}
+
+        for document, queue in self._queues.items():
+            # 前台文档队列中的意向只是其他文档操作的登记，不计入队列深度
+            pending = [mode for mode, future in queue.waiters if not future.done() and mode in (READ, WRITE)]
+            documents[document or "<front document>"] = {
+                "queue_depth": len(pending),
+                "queued_writes": pending.count(WRITE),
+                "active_readers": queue.active_readers,
+                "active_writer": queue.active_writer,
+            }
+            for mode, stats in queue.stats.items():
+                totals[mode].merge(stats)
+
+        for mode, stats in self._totals.items():
+            totals[mode].merge(stats)
+
+        return {
+            "queue_depth": sum(doc["queue_depth"] for doc in documents.values()),
+            "documents": documents,
+            READ: totals[READ].snapshot(),
+            WRITE: totals[WRITE].snapshot(),
+        }
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+Compiled AppleScript support for Keynote-MCP
+
+脚本模板（见 script_templates）共用的 AppleScript 处理器：参数解码（与 encode_argument 对应）
+和 JSON 结果信封（见 RESULT_ENCODER）；以及按内容哈希缓存的 .scpt 编译结果，
+同一脚本只编译一次，之后直接以 argv 运行编译结果。
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+from .config import cache_dir
+from .error_handler import ParameterError
+
+if TYPE_CHECKING:
+    from .applescript_runner import AppleScriptRunner
+
+
+# 列表元素分隔符（ASCII Unit Separator）
+LIST_SEPARATOR = "\x1f"
+
+# 参数解码处理器，与 encode_argument 对应
+ARGUMENT_DECODER = '''
+on decodeArgument(encodedValue)
+    set valueTag to text 1 thru 2 of encodedValue
+    if (count of encodedValue) > 2 then
+        set valueText to text 3 thru -1 of encodedValue
+    else
+        set valueText to ""
+    end if
+
+    if valueTag is "s:" then
+        return valueText
+    else if valueTag is "i:" then
+        return valueText as number
+    else if valueTag is "r:" then
+        return my decodeReal(valueText)
+    else if valueTag is "b:" then
+        return valueText is "true"
+    else if valueTag is "n:" then
+        return missing value
+    else if valueTag is "l:" then
+        set itemList to {}
+        if valueText is "" then return itemList
+        set savedDelimiters to AppleScript's text item delimiters
+        set AppleScript's text item delimiters to character id 31
+        set encodedItems to text items of valueText
+        set AppleScript's text item delimiters to savedDelimiters
+        repeat with encodedItem in encodedItems
+            set end of itemList to my decodeArgument(encodedItem as text)
+        end repeat
+        return itemList
+    end if
+
+    error "Invalid argument encoding: " & encodedValue number -1700
+end decodeArgument
+
+-- 不依赖系统小数点设置的实数解析
+on decodeReal(valueText)
+    set isNegative to valueText starts with "-"
+    if isNegative then set valueText to text 2 thru -1 of valueText
+
+    set savedDelimiters to AppleScript's text item delimiters
+    set AppleScript's text item delimiters to "."
+    set numberParts to text items of valueText
+    set AppleScript's text item delimiters to savedDelimiters
+
+    set realValue to (item 1 of numberParts) as number
+    if (count of numberParts) > 1 then
+        set fractionText to item 2 of numberParts
+        if fractionText is not "" then
+            set realValue to realValue + (fractionText as number) / (10 ^ (count of fractionText))
+        end if
+    end if
+
+    if isNegative then set realValue to -realValue
+    return realValue
+end decodeReal
+'''
+
+
+# 结果编码处理器：脚本结果统一编码为 JSON 信封
+# 成功: {"ok":true,"value":<结果>}（按当前文档执行时另有 "front":"<document id>"），
+# 失败: {"ok":false,"error":"<错误信息>","number":<错误码>}
+# 记录（record）无法枚举字段，对象需通过 jsonObject({"键", 值, ...}) 构建
+RESULT_ENCODER = r'''
+on jsonResult(resultValue)
+    return "{\"ok\":true,\"value\":" & my jsonEncode(resultValue) & "}"
+end jsonResult
+
+-- 按当前文档（docRef 为空字符串）执行时附带当前文档的 id，调用方据此确认缓存的当前文档是否已切换
+on jsonDocumentResult(resultValue, frontId)
+    if frontId is missing value then return my jsonResult(resultValue)
+    return "{\"ok\":true,\"value\":" & my jsonEncode(resultValue) & ",\"front\":" & my jsonString(frontId as text) & "}"
+end jsonDocumentResult
+
+on jsonError(errMsg, errNum)
+    return "{\"ok\":false,\"error\":" & my jsonString(errMsg as text) & ",\"number\":" & (errNum as integer) & "}"
+end jsonError
+
+on jsonObject(keyValuePairs)
+    set encodedFields to {}
+    repeat with i from 1 to (count of keyValuePairs) by 2
+        set end of encodedFields to my jsonString((item i of keyValuePairs) as text) & ":" & my jsonEncode(item (i + 1) of keyValuePairs)
+    end repeat
+    return {jsonText:"{" & my joinText(encodedFields, ",") & "}"}
+end jsonObject
+
+on jsonEncode(jsonValue)
+    if jsonValue is missing value then return "null"
+    set valueClass to class of jsonValue
+    if valueClass is boolean then
+        if jsonValue then return "true"
+        return "false"
+    else if valueClass is integer then
+        return jsonValue as text
+    else if valueClass is real then
+        -- 不依赖系统小数点设置
+        return my replaceText(jsonValue as text, ",", ".")
+    else if valueClass is list then
+        set encodedItems to {}
+        repeat with itemRef in jsonValue
+            set end of encodedItems to my jsonEncode(contents of itemRef)
+        end repeat
+        return "[" & my joinText(encodedItems, ",") & "]"
+    else if valueClass is record then
+        return jsonText of jsonValue
+    end if
+    return my jsonString(jsonValue as text)
+end jsonEncode
+
+on jsonString(textValue)
+    set textValue to my replaceText(textValue, "\\", "\\\\")
+    set textValue to my replaceText(textValue, "\"", "\\\"")
+    set textValue to my replaceText(textValue, linefeed, "\\n")
+    set textValue to my replaceText(textValue, return, "\\r")
+    set textValue to my replaceText(textValue, tab, "\\t")
+    return "\"" & textValue & "\""
+end jsonString
+
+on replaceText(textValue, searchText, replacementText)
+    if textValue does not contain searchText then return textValue
+    set savedDelimiters to AppleScript's text item delimiters
+    set AppleScript's text item delimiters to searchText
+    set textParts to text items of textValue
+    set AppleScript's text item delimiters to replacementText
+    set textValue to textParts as text
+    set AppleScript's text item delimiters to savedDelimiters
+    return textValue
+end replaceText
+
+on joinText(textList, separator)
+    set savedDelimiters to AppleScript's text item delimiters
+    set AppleScript's text item delimiters to separator
+    set joinedText to textList as text
+    set AppleScript's text item delimiters to savedDelimiters
+    return joinedText
+end joinText
+'''
+
+
+def encode_argument(value: Any, _nested: bool = False) -> str:
+    """
+    将 Python 值编码为带类型前缀的 argv 字符串
+
+    s: 文本, i: 整数, r: 实数, b: 布尔, n: missing value, l: 列表（元素以 \\x1f 分隔）
+
+    Args:
+        value: 参数值
+
+    Returns:
+        编码后的字符串
+    """
+    if value is None:
+        return "n:"
+    if isinstance(value, bool):
+        return "b:true" if value else "b:false"
+    if isinstance(value, int):
+        return f"i:{value}"
+    if isinstance(value, float):
+        text = repr(value)
+        if "e" in text or "E" in text:
+            text = format(value, "f")
+        return f"r:{text}"
+    if isinstance(value, (list, tuple)):
+        if _nested:
+            raise ParameterError("Nested lists are not supported as script arguments")
+        return "l:" + LIST_SEPARATOR.join(encode_argument(item, _nested=True) for item in value)
+
+    text = str(value)
+    if _nested and LIST_SEPARATOR in text:
+        raise ParameterError("List items cannot contain the \\x1f separator character")
+    return f"s:{text}"
+
+
+class CompiledScriptCache:
+    """按内容哈希缓存的 AppleScript 编译结果"""
+
+    def __init__(self, runner: "AppleScriptRunner", cache_path: Optional[Union[str, Path]] = None):
+        """
+        初始化编译缓存
+
+        Args:
+            runner: 用于编译脚本的执行器
+            cache_path: 编译结果缓存目录，默认使用 cache_dir("scripts")
+        """
+        self.runner = runner
+        self.cache_path = Path(cache_path) if cache_path else cache_dir("scripts")
+
+        self._lock = threading.Lock()
+        # 内容哈希 -> 编译结果路径
+        self._compiled: Dict[str, Path] = {}
+
+    def compile_source(self, name: str, source: str) -> Path:
+        """
+        编译 AppleScript 源码并按内容哈希缓存
+
+        Args:
+            name: 缓存文件名前缀（同名的旧版本会被清理）
+            source: AppleScript 源码
+
+        Returns:
+            编译结果路径
+        """
+        digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        key = f"{name}-{digest}"
+
+        compiled = self._compiled.get(key)
+        if compiled is not None and compiled.exists():
+            return compiled
+
+        with self._lock:
+            compiled = self.cache_path / f"{key}.scpt"
+            if not compiled.exists():
+                self.cache_path.mkdir(parents=True, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(prefix=f".{key}-", suffix=".scpt", dir=str(self.cache_path))
+                os.close(fd)
+                try:
+                    self.runner.compile_script(source, temp_path)
+                    os.replace(temp_path, compiled)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                self._remove_stale(name, compiled)
+            self._compiled[key] = compiled
+
+        return compiled
+
+    def _remove_stale(self, name: str, current: Path) -> None:
+        """删除同名脚本的旧版本编译结果"""
+        for stale in self.cache_path.glob(f"{name}-*.scpt"):
+            stem_suffix = stale.stem[len(name) + 1:]
+            if stale != current and len(stem_suffix) == 16:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,326 @@
+"""
+Parameterized AppleScript templates for Keynote-MCP
+
+每个模板是一个固定文本的 AppleScript 处理器，所有用户数据都通过 argv 传入，
+因此脚本文本不随调用变化，只需编译一次即可反复执行，也不再需要把值转义进源码。
+
+生成的程序结构::
+
+    on run argv
+        -- 解码带类型前缀的参数后调用模板处理器
+    end run
+
+    on addTextItem(docRef, slideNumber, ...)
+        tell application "Keynote"
+            set targetDoc to my resolveDocument(docRef)
+            -- 模板正文
+        end tell
+    end addTextItem
+"""
+
+import hashlib
+import textwrap
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Union
+
+from .error_handler import AppleScriptError, ParameterError
+from .script_library import ARGUMENT_DECODER, RESULT_ENCODER
+
+
+# 文档解析处理器：空字符串表示当前（最前面的）文档，"doc:<id>" 句柄按 document id 定位，其余按名称定位
+DOCUMENT_RESOLVER = '''
+on resolveDocument(docRef)
+    tell application "Keynote"
+        if docRef is "" then return front document
+        if docRef starts with "doc:" then return document id (text 5 thru -1 of docRef)
+        return document docRef
+    end tell
+end resolveDocument
+'''
+
+
+def _handler_name(name: str) -> str:
+    """snake_case 模板名转换为 camelCase 处理器名"""
+    first, *rest = name.split("_")
+    return first + "".join(part.capitalize() for part in rest)
+
+
+class ScriptTemplate:
+    """固定文本、通过 argv 传参的 AppleScript 模板"""
+
+    def __init__(self, name: str, params: Sequence[str], body: str,
+                 document: bool = True, activate: bool = False):
+        """
+        定义模板
+
+        Args:
+            name: 模板名（snake_case，同时用作编译缓存的文件名）
+            params: 处理器参数名；document 为 True 时第一个参数必须是 docRef
+            body: 处理器正文，位于 tell application "Keynote" 块内
+            document: 是否在正文前把 docRef 解析为 targetDoc
+            activate: 执行前是否激活 Keynote 窗口
+        """
+        if document and (not params or params[0] != "docRef"):
+            raise ValueError(f"Template {name} must take docRef as its first parameter")
+
+        self.name = name
+        self.params = list(params)
+        self.body = textwrap.dedent(body).strip("\n")
+        self.document = document
+        self.activate = activate
+
+    @property
+    def handler_name(self) -> str:
+        return _handler_name(self.name)
+
+    def render_handler(self, batch: bool = False, headless: bool = False) -> str:
+        """
+        渲染模板处理器定义
+
+        Args:
+            batch: 是否渲染批处理版本（第一个参数直接接收已解析的 targetDoc，不再激活窗口）
+            headless: 无界面模式，不激活 Keynote 窗口
+        """
+        params = list(self.params)
+        if batch:
+            if not self.document:
+                raise ValueError(f"Template {self.name} does not target a document and cannot be batched")
+            params[0] = "targetDoc"
+
+        lines = [f"on {self.handler_name}({', '.join(params)})"]
+        lines.append('    tell application "Keynote"')
+        if self.activate and not batch and not headless:
+            lines.append("        activate")
+        if self.document and not batch:
+            lines.append("        set targetDoc to my resolveDocument(docRef)")
+        lines.append(textwrap.indent(self.body, " " * 8))
+        lines.append("    end tell")
+        lines.append(f"end {self.handler_name}")
+        return "\n".join(lines)
+
+    def render_program(self, headless: bool = False) -> str:
+        """
+        渲染以 argv 调用该模板的完整程序
+
+        Args:
+            headless: 无界面模式，不激活 Keynote 窗口
+        """
+        call_args = ", ".join(f"item {i} of handlerArgs" for i in range(1, len(self.params) + 1))
+        lines = [
+            "on run argv",
+            "    set handlerArgs to {}",
+            "    repeat with encodedValue in argv",
+            "        set end of handlerArgs to my decodeArgument(encodedValue as text)",
+            "    end repeat",
+            "    try",
+        ]
+        if self.document:
+            # 按当前文档执行时在结果中附带当前文档的 id（同一次脚本调用，不增加 osascript 调用）
+            lines.extend([
+                "        set frontId to missing value",
+                '        if item 1 of handlerArgs is "" then',
+                '            tell application "Keynote" to set frontId to id of front document',
+                "        end if",
+                f"        return my jsonDocumentResult(my {self.handler_name}({call_args}), frontId)",
+            ])
+        else:
+            lines.append(f"        return my jsonResult(my {self.handler_name}({call_args}))")
+        lines.extend([
+            "    on error errMsg number errNum",
+            "        return my jsonError(errMsg, errNum)",
+            "    end try",
+            "end run",
+        ])
+        run_handler = "\n".join(lines)
+        sections = [
+            run_handler, self.render_handler(headless=headless),
+            DOCUMENT_RESOLVER.strip(), ARGUMENT_DECODER.strip(), RESULT_ENCODER.strip()
+        ]
+        return "\n\n".join(sections) + "\n"
+
+    def check_arguments(self, args: Sequence) -> None:
+        """检查参数个数"""
+        if len(args) != len(self.params):
+            raise ParameterError(
+                f"Template {self.name} expects {len(self.params)} arguments, got {len(args)}"
+            )
+
+
+class BatchResult(NamedTuple):
+    """批处理中单个操作的执行结果"""
+    ok: bool
+    value: Any = None
+    error: str = ""
+    executed: bool = True
+
+
+class BatchOperation(NamedTuple):
+    """批处理中的单个操作"""
+    template: Union[str, ScriptTemplate]
+    # 模板参数（不含 docRef，文档由整个批处理统一指定）
+    args: Sequence = ()
+    # 期望的返回值，不一致时视为失败（None 表示不检查）
+    expect: Optional[str] = None
+
+
+def program_name(name: str, headless: bool = False) -> str:
+    """编译缓存中使用的程序名，无界面模式的程序单独缓存"""
+    return f"{name}_headless" if headless else name
+
+
+def batch_program_name(batch_templates: Sequence[ScriptTemplate], headless: bool = False) -> str:
+    """批处理程序的缓存名，按使用到的模板集合区分"""
+    names = sorted({template.name for template in batch_templates})
+    return program_name("batch_" + hashlib.sha1("+".join(names).encode("utf-8")).hexdigest()[:8], headless)
+
+
+def render_batch_program(batch_templates: Sequence[ScriptTemplate], headless: bool = False) -> str:
+    """
+    渲染批处理程序：只解析一次文档，然后依次执行 argv 中的操作
+
+    argv 结构: docRef, stopOnError, 然后每个操作依次为
+    模板名、期望结果（空字符串表示不检查）、参数个数、参数...
+
+    返回值为 JSON 信封，其中的 value 是与已执行操作一一对应的结果信封列表
+
+    Args:
+        batch_templates: 批处理中用到的模板（必须都以 docRef 为第一个参数）
+        headless: 无界面模式，不激活 Keynote 窗口
+
+    Returns:
+        AppleScript 程序源码
+    """
+    unique = {template.name: template for template in batch_templates}
+    ordered = [unique[name] for name in sorted(unique)]
+
+    lines = [
+        "on run argv",
+        "    set docRef to my decodeArgument(item 1 of argv)",
+        "    set stopOnError to my decodeArgument(item 2 of argv)",
+        "    try",
+        '        tell application "Keynote"',
+    ]
+    if not headless and any(template.activate for template in ordered):
+        lines.append("            activate")
+    lines.extend([
+        "            set targetDoc to my resolveDocument(docRef)",
+        "            set frontId to missing value",
+        '            if docRef is "" then set frontId to id of targetDoc',
+        "        end tell",
+        "    on error errMsg number errNum",
+        "        return my jsonError(errMsg, errNum)",
+        "    end try",
+        "",
+        "    set opResults to {}",
+        "    set argIndex to 3",
+        "    repeat while argIndex < (count of argv)",
+        "        set opName to item argIndex of argv",
+        "        set expectedResult to item (argIndex + 1) of argv",
+        "        set argCount to (item (argIndex + 2) of argv) as integer",
+        "        set handlerArgs to {}",
+        "        repeat with i from (argIndex + 3) to (argIndex + 2 + argCount)",
+        "            set end of handlerArgs to my decodeArgument(item i of argv)",
+        "        end repeat",
+        "        set argIndex to argIndex + 3 + argCount",
+        "",
+        "        try",
+    ])
+
+    keyword = "if"
+    for template in ordered:
+        call_args = ", ".join(
+            ["targetDoc"] + [f"item {i} of handlerArgs" for i in range(1, len(template.params))]
+        )
+        lines.append(f'            {keyword} opName is "{template.name}" then')
+        lines.append(f"                set opResult to my {template.handler_name}({call_args})")
+        keyword = "else if"
+    if ordered:
+        lines.append("            else")
+        lines.append('                error "Unknown operation: " & opName number -1708')
+        lines.append("            end if")
+    else:
+        lines.append('            error "Unknown operation: " & opName number -1708')
+
+    lines.extend([
+        "            if expectedResult is not \"\" then",
+        "                if (opResult as text) is not expectedResult then error (opResult as text)",
+        "            end if",
+        "            set end of opResults to my jsonResult(opResult)",
+        "        on error errMsg number errNum",
+        "            set end of opResults to my jsonError(errMsg, errNum)",
+        "            if stopOnError then exit repeat",
+        "        end try",
+        "    end repeat",
+        "",
+        '    return my jsonDocumentResult({jsonText:"[" & my joinText(opResults, ",") & "]"}, frontId)',
+        "end run",
+    ])
+
+    sections = ["\n".join(lines)]
+    sections.extend(template.render_handler(batch=True) for template in ordered)
+    sections.extend([DOCUMENT_RESOLVER.strip(), ARGUMENT_DECODER.strip(), RESULT_ENCODER.strip()])
+    return "\n\n".join(sections) + "\n"
+
+
+def parse_batch_output(envelopes: List[Dict[str, Any]], operation_count: int) -> List[BatchResult]:
+    """
+    解析批处理程序的结果
+
+    Args:
+        envelopes: 已执行操作的结果信封列表
+        operation_count: 提交的操作数量（因出错而未执行的操作标记为 executed=False）
+
+    Returns:
+        与提交顺序一致的结果列表
+    """
+    if not isinstance(envelopes, list) or len(envelopes) > operation_count:
+        raise AppleScriptError(f"Unexpected batch result for {operation_count} operations: {envelopes!r}")
+
+    results = []
+    for envelope in envelopes:
+        if envelope.get("ok"):
+            results.append(BatchResult(True, value=envelope.get("value")))
+        else:
+            results.append(BatchResult(False, error=f"{envelope.get('error', '')} ({envelope.get('number', 0)})"))
+
+    while len(results) < operation_count:
+        results.append(BatchResult(False, error="skipped", executed=False))
+    return results
+
+
+class TemplateRegistry:
+    """脚本模板注册表"""
+
+    def __init__(self):
+        self._templates: Dict[str, ScriptTemplate] = {}
+
+    def register(self, template: ScriptTemplate) -> ScriptTemplate:
+        """注册模板，同名模板不允许重复定义"""
+        existing = self._templates.get(template.name)
+        if existing is not None and existing is not template:
+            raise ValueError(f"Template already registered: {template.name}")
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: Union[str, ScriptTemplate]) -> ScriptTemplate:
+        """按名称获取模板"""
+        if isinstance(name, ScriptTemplate):
+            return name
+        template = self._templates.get(name)
+        if template is None:
+            raise AppleScriptError(f"Script template not found: {name}")
+        return template
+
+    def names(self) -> List[str]:
+        return sorted(self._templates)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+
+templates = TemplateRegistry()
+
+
+def script_template(name: str, params: Sequence[str], body: str,
+                    document: bool = True, activate: bool = False) -> ScriptTemplate:
+    """定义并注册一个脚本模板"""
+    return templates.register(ScriptTemplate(name, params, body, document=document, activate=activate))
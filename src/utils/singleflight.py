@@ -0,0 +1,82 @@
+"""
+Singleflight coalescing of identical concurrent calls for Keynote-MCP
+
+同一时刻发起的相同调用（工具名 + 规范化参数相同）只执行一次，所有调用方共享结果。
+只合并正在执行中的调用，不缓存已完成的结果。
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """合并执行中的相同异步调用"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Future"] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行调用，相同 key 的调用正在执行时直接等待其结果
+
+        某个调用方被取消不会影响共享同一次执行的其他调用方
+
+        Args:
+            key: 调用标识
+            func: 无参数的协程函数
+
+        Returns:
+            调用结果
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(functools.partial(self._forget, key))
+        else:
+            self.hits += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: "asyncio.Future") -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 避免调用方全部取消后出现 "exception was never retrieved" 警告
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "in_flight": len(self._inflight),
+        }
+
+
+def coalesced(method: Callable) -> Callable:
+    """
+    工具方法装饰器：通过实例的 singleflight 属性合并相同的并发调用
+
+    被装饰方法返回的列表会复制后交给每个调用方
+    """
+    signature = inspect.signature(method)
+    # 不包含 self 的签名，用于规范化参数
+    unbound = signature.replace(parameters=list(signature.parameters.values())[1:])
+
+    @functools.wraps(method)
+    async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        bound = unbound.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (method.__qualname__, json.dumps(bound.arguments, sort_keys=True, default=str))
+        result = await self.singleflight.do(key, lambda: method(self, *args, **kwargs))
+        return list(result) if isinstance(result, list) else result
+
+    return wrapper
\ No newline at end of file
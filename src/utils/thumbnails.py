@@ -0,0 +1,188 @@
+"""
+Slide thumbnails for Keynote-MCP
+
+截图工具可以把导出的图片缩小后直接作为 MCP ImageContent 返回，客户端无需再读取全尺寸的图片文件。
+缩放和重新编码（PNG → WebP / JPEG）在进程池中执行（KEYNOTE_MCP_THUMBNAIL_WORKERS，默认 2 个进程），
+事件循环不做任何图像计算；生成的缩略图写入临时文件，通过内存映射分块进行 Base64 编码，
+不把文件整体读入内存再复制。
+
+缩略图默认最长边 512 像素、WebP 格式、质量 80，可通过环境变量或工具参数修改。
+Pillow 未安装时截图照常完成，只是不返回缩略图。
+"""
+
+import asyncio
+import base64
+import importlib.util
+import mmap
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple, Optional
+
+from .config import env_int, env_str
+from .error_handler import ParameterError
+
+# 缩略图格式 -> (Pillow 格式名称, 扩展名, MIME 类型)
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", ".webp", "image/webp"),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+    "png": ("PNG", ".png", "image/png"),
+}
+
+# Base64 分块编码的输入块大小（3 的倍数，编码结果可以直接拼接）
+_ENCODE_CHUNK = 3 * 256 * 1024
+
+
+class Thumbnail(NamedTuple):
+    """缩略图：Base64 数据、MIME 类型和尺寸"""
+    data: str
+    mime_type: str
+    width: int
+    height: int
+
+
+class ThumbnailOptions(NamedTuple):
+    """缩略图参数"""
+    max_edge: int
+    format: str
+    quality: int
+
+    @classmethod
+    def resolve(cls, max_edge: Optional[int] = None, format: Optional[str] = None,
+                quality: Optional[int] = None) -> "ThumbnailOptions":
+        """
+        合并工具参数和环境变量中的默认值
+
+        Raises:
+            ParameterError: 参数无效
+        """
+        max_edge = max_edge or env_int("KEYNOTE_MCP_THUMBNAIL_MAX_EDGE", 512)
+        format = (format or env_str("KEYNOTE_MCP_THUMBNAIL_FORMAT", "webp")).lower()
+        if format == "jpg":
+            format = "jpeg"
+        quality = quality or env_int("KEYNOTE_MCP_THUMBNAIL_QUALITY", 80)
+        if format not in THUMBNAIL_FORMATS:
+            raise ParameterError(
+                f"Invalid thumbnail format: {format}. Must be one of: {', '.join(THUMBNAIL_FORMATS)}"
+            )
+        if max_edge < 16:
+            raise ParameterError(f"Thumbnail max edge must be at least 16 pixels, got {max_edge}")
+        if not 1 <= quality <= 100:
+            raise ParameterError(f"Thumbnail quality must be between 1 and 100, got {quality}")
+        return cls(max_edge, format, quality)
+
+
+def pillow_available() -> bool:
+    """Pillow 是否已安装"""
+    return importlib.util.find_spec("PIL") is not None
+
+
+def render_thumbnail(source: str, destination: str, max_edge: int, format: str, quality: int) -> tuple:
+    """
+    缩放并重新编码图片（在进程池的工作进程中执行）
+
+    Args:
+        source: 原始图片路径
+        destination: 缩略图路径
+        max_edge: 最长边（像素），原图更小时不放大
+        format: 缩略图格式（THUMBNAIL_FORMATS 的键）
+        quality: 有损格式的质量（1-100）
+
+    Returns:
+        缩略图的 (宽, 高)
+    """
+    from PIL import Image
+
+    pillow_format = THUMBNAIL_FORMATS[format][0]
+    with Image.open(source) as image:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if pillow_format == "JPEG" and image.mode != "RGB":
+            # JPEG 不支持透明度：合成到白色背景上
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        image.save(destination, pillow_format, quality=quality, optimize=pillow_format != "WEBP")
+        return image.size
+
+
+def encode_file_base64(path: str) -> str:
+    """
+    通过内存映射分块对文件进行 Base64 编码
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Base64 字符串
+    """
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return ""
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                chunks = [
+                    base64.b64encode(view[offset:offset + _ENCODE_CHUNK]).decode("ascii")
+                    for offset in range(0, size, _ENCODE_CHUNK)
+                ]
+            finally:
+                # 关闭映射前必须释放所有视图
+                view.release()
+    return "".join(chunks)
+
+
+class ThumbnailPool:
+    """在进程池中生成缩略图"""
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        初始化缩略图进程池（第一次使用时才启动进程）
+
+        Args:
+            workers: 进程数量，默认读取环境变量 KEYNOTE_MCP_THUMBNAIL_WORKERS
+        """
+        self.workers = max(1, workers or env_int("KEYNOTE_MCP_THUMBNAIL_WORKERS", 2))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.rendered = 0
+
+    async def thumbnail(self, source: str, options: ThumbnailOptions) -> Thumbnail:
+        """
+        生成缩略图
+
+        Args:
+            source: 原始图片路径
+            options: 缩略图参数
+
+        Returns:
+            缩略图
+        """
+        _, extension, mime_type = THUMBNAIL_FORMATS[options.format]
+        fd, temp_path = tempfile.mkstemp(prefix="keynote_thumbnail_", suffix=extension)
+        os.close(fd)
+        loop = asyncio.get_running_loop()
+        try:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            try:
+                width, height = await loop.run_in_executor(
+                    self._executor, render_thumbnail, source, temp_path,
+                    options.max_edge, options.format, options.quality
+                )
+            except BrokenProcessPool:
+                # 工作进程异常退出：下次调用时重新创建进程池
+                self._executor = None
+                raise
+            data = await loop.run_in_executor(None, encode_file_base64, temp_path)
+        finally:
+            os.remove(temp_path)
+        self.rendered += 1
+        return Thumbnail(data, mime_type, width, height)
+
+    def close(self) -> None:
+        """停止工作进程（服务器退出时调用）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,125 @@
+"""
+TTL cache for rarely changing Keynote catalogs
+
+主题列表、布局列表、幻灯片尺寸等几乎不变的数据缓存一段时间（每个条目可单独设置存活时间），
+过期或显式失效（如更换主题）后重新加载。每次命中都省去一次 AppleScript 调用。
+
+按文档缓存的条目可能以空字符串（当前文档）或句柄为键，记录按当前文档执行的脚本报告的当前文档，
+使两种键一起失效，当前文档切换后丢弃以空字符串缓存的条目。
+"""
+
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from .config import env_float
+from .document_handles import make_handle
+from .singleflight import SingleFlight
+
+
+class TTLCache:
+    """带过期时间的异步加载缓存"""
+
+    def __init__(self, default_ttl: Optional[float] = None):
+        """
+        初始化缓存
+
+        Args:
+            default_ttl: 默认存活时间（秒），默认读取环境变量 KEYNOTE_MCP_CATALOG_TTL；
+                         小于等于 0 时不缓存
+        """
+        self.default_ttl = env_float("KEYNOTE_MCP_CATALOG_TTL", 600.0) if default_ttl is None else default_ttl
+        # 键 -> (值, 过期时间)
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        # 同一个键的并发加载只执行一次
+        self._loads = SingleFlight()
+        self.hits = 0
+        self.invalidations = 0
+        # 当前文档的句柄（见 front_document_seen），未知时为 None
+        self.front_handle: Optional[str] = None
+
+    def peek(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        读取未过期的条目，不触发加载
+
+        Returns:
+            (是否命中, 值)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return False, None
+        return True, value
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None) -> Any:
+        """
+        获取条目，未缓存或已过期时调用 loader 加载
+
+        Args:
+            key: 缓存键
+            loader: 无参数的协程函数
+            ttl: 本条目的存活时间（秒），默认使用 default_ttl
+
+        Returns:
+            缓存值
+        """
+        found, value = self.peek(key)
+        if found:
+            self.hits += 1
+            return value
+        return await self._loads.do(key, lambda: self._load(key, loader, ttl))
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        value = await loader()
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl > 0:
+            self._entries[key] = (value, time.monotonic() + ttl)
+        return value
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> None:
+        """
+        使条目失效
+
+        Args:
+            predicate: 判断键是否需要失效的函数；None 表示清空全部条目
+        """
+        keys = [key for key in self._entries if predicate is None or predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        self.invalidations += len(keys)
+
+    def invalidate_document(self, doc_ref: str) -> None:
+        """
+        使某个文档的条目失效（键约定为 (类别, 文档引用, ...)）
+
+        同时失效当前文档（空字符串）的条目，因为它可能就是同一个文档；
+        doc_ref 为空字符串时也失效当前文档句柄下的条目
+        """
+        refs = {doc_ref, ""}
+        if not doc_ref and self.front_handle is not None:
+            refs.add(self.front_handle)
+        self.invalidate(lambda key: isinstance(key, tuple) and len(key) > 1 and key[1] in refs)
+
+    def front_document_seen(self, doc_id: str) -> None:
+        """
+        按当前文档执行的脚本报告了当前文档的 id（见 AppleScriptRunner.front_document_listeners）
+
+        当前文档切换后，以空字符串缓存的条目属于之前的文档，全部失效
+        """
+        handle = make_handle(doc_id)
+        if self.front_handle is not None and handle != self.front_handle:
+            self.invalidate(lambda key: isinstance(key, tuple) and len(key) > 1 and key[1] == "")
+        self.front_handle = handle
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计；命中次数即节省的 AppleScript 调用次数"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "loads": self._loads.misses,
+            "saved_calls": self.hits,
+            "invalidations": self.invalidations,
+            "default_ttl_s": self.default_ttl,
+        }
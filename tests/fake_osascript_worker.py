@@ -0,0 +1,63 @@
+"""
+osascript_worker.js 的 Python 替身，用于在 Linux 上测试工作进程池
+
+与真实工作进程使用相同的分帧协议（RUN / CALL / PING / QUIT），RUN 的负载按以下命令解释：
+
+- ``sleep <秒>``: 等待后返回 OK
+- ``error <信息>``: 返回 ERR 帧
+- ``crash``: 不返回任何响应直接退出
+- 其他: 返回 ``OK``，结果为 ``<pid>:<负载>``
+
+CALL 返回 ``<pid>:<脚本路径>|<参数1>|<参数2>...``。
+"""
+
+import os
+import sys
+import time
+
+
+def read_frame(stream):
+    header = stream.readline()
+    if not header:
+        return None, b""
+    kind, length = header.decode("ascii").split(" ", 1)
+    length = int(length)
+    payload = stream.read(length) if length else b""
+    return kind, payload
+
+
+def write_frame(stream, kind, text):
+    data = text.encode("utf-8")
+    stream.write(f"{kind} {len(data)}\n".encode("ascii") + data)
+    stream.flush()
+
+
+def main():
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    pid = os.getpid()
+    while True:
+        kind, payload = read_frame(stdin)
+        if kind is None or kind == "QUIT":
+            return
+        if kind == "PING":
+            write_frame(stdout, "PONG", "")
+        elif kind == "CALL":
+            fields = payload.decode("utf-8").split("\0")
+            write_frame(stdout, "OK", f"{pid}:" + "|".join(fields))
+        elif kind == "RUN":
+            script = payload.decode("utf-8")
+            if script.startswith("sleep "):
+                time.sleep(float(script.split(" ", 1)[1]))
+                write_frame(stdout, "OK", f"{pid}:{script}")
+            elif script.startswith("error "):
+                write_frame(stdout, "ERR", script.split(" ", 1)[1])
+            elif script == "crash":
+                sys.exit(1)
+            else:
+                write_frame(stdout, "OK", f"{pid}:{script}")
+        else:
+            write_frame(stdout, "ERR", f"Unknown frame: {kind}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+自动布局测试
+"""
+
+from src.utils.auto_layout import (
+    ITEM_GAP, RectIndex, estimate_text_size, find_free_position, place_text, safe_margin
+)
+
+
+def overlaps(a, b, gap=0.0):
+    return (a[0] - gap < b[0] + b[2] and b[0] < a[0] + a[2] + gap
+            and a[1] - gap < b[1] + b[3] and b[1] < a[1] + a[3] + gap)
+
+
+def test_empty_slide_uses_top_left_of_safe_area():
+    margin = safe_margin(1920, 1080)
+    assert find_free_position(1920, 1080, [], 400, 100) == (margin, margin)
+
+
+def test_position_avoids_existing_items():
+    rects = [[96, 54, 1728, 200], [96, 300, 800, 400]]
+    x, y = find_free_position(1920, 1080, rects, 600, 150)
+    placed = (x, y, 600, 150)
+    assert not any(overlaps(placed, rect, ITEM_GAP - 1) for rect in rects)
+    margin = safe_margin(1920, 1080)
+    assert margin <= x and x + 600 <= 1920 - margin
+    assert margin <= y and y + 150 <= 1080 - margin
+
+
+def test_no_space_returns_none():
+    assert find_free_position(1920, 1080, [[0, 0, 1920, 1080]], 100, 100) is None
+    assert find_free_position(1920, 1080, [], 5000, 100) is None
+
+
+def test_rect_index_matches_brute_force():
+    rects = [(x * 150.0, y * 90.0, 120.0, 60.0) for x in range(10) for y in range(10) if (x + y) % 3]
+    index = RectIndex(rects)
+    for probe in [(0, 0, 10, 10), (125, 65, 20, 20), (400, 400, 300, 10), (1300, 800, 50, 50)]:
+        assert index.intersects(probe, 5) == any(overlaps(probe, rect, 5) for rect in rects)
+
+
+def test_place_text_estimates_size():
+    width, height = estimate_text_size("hello\nworld", 24, 1000)
+    assert width > 0 and height > 24
+    x, y, box_width, box_height = place_text(1920, 1080, [], "hello\nworld", 24)
+    assert box_width >= width and box_height == height
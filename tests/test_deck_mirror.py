@@ -0,0 +1,124 @@
+"""
+文档模型缓存测试（使用模拟的执行器代替 AppleScript 调用）
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.tools.content import ContentTools
+from src.tools.slide import SlideTools
+from src.utils.applescript_runner import AppleScriptRunner
+from src.utils.deck_mirror import DeckMirror
+from src.utils.error_handler import ParameterError
+from src.utils.script_templates import templates
+
+
+def dump(doc_id, slide_count):
+    return {
+        "id": doc_id, "name": f"Deck {doc_id}", "theme": "White", "width": 1920, "height": 1080,
+        "layouts": ["Title"] * slide_count, "slide": [], "kind": [], "x": [], "y": [], "w": [], "h": [],
+    }
+
+
+class FakeKeynote:
+    """按 document id 保存文档，front 为当前文档；按当前文档执行时像真实脚本一样报告当前文档的 id"""
+
+    def __init__(self, decks, front):
+        self.decks = decks
+        self.front = front
+        self.calls = []
+        self.front_document_listeners = []
+
+    async def run_template_async(self, template, doc_ref, *args, timeout=None):
+        self.calls.append(template.name)
+        doc_id = doc_ref[len("doc:"):] if doc_ref else self.front
+        if not doc_ref:
+            for listener in self.front_document_listeners:
+                listener(doc_id)
+        if template.name == "dump_deck":
+            return dump(doc_id, self.decks[doc_id])
+        if template.name == "add_text_item":
+            return [100.0, 100.0, 400.0, 60.0]
+        if template.name == "select_slide":
+            return "success"
+        raise AssertionError(f"unexpected template {template.name}")
+
+
+def make_mirror(keynote):
+    mirror = DeckMirror(keynote, max_age=30)
+    keynote.front_document_listeners.append(mirror.front_document_seen)
+    return mirror
+
+
+def test_front_document_reads_and_writes_need_no_extra_calls():
+    keynote = FakeKeynote({"A": 3}, front="A")
+    mirror = make_mirror(keynote)
+    slides = SlideTools(keynote, mirror=mirror)
+    content = ContentTools(keynote, mirror=mirror, auto_layout=True)
+
+    async def scenario():
+        await mirror.get("")
+        keynote.calls.clear()
+        count = await slides.get_slide_count()
+        assert keynote.calls == []
+        added = await content.add_text_box(2, "hello")
+        return count[0].text, added[0].text
+
+    count, added = asyncio.run(scenario())
+    assert count.endswith("3")
+    assert added.startswith("✅")
+    # 自动布局从模型读取已有对象，只有添加文本框本身一次脚本调用
+    assert keynote.calls == ["add_text_item"]
+
+
+def test_front_alias_follows_reported_front_document():
+    keynote = FakeKeynote({"A": 3, "B": 8}, front="A")
+    mirror = make_mirror(keynote)
+    slides = SlideTools(keynote, mirror=mirror)
+
+    async def scenario():
+        assert (await mirror.get("")).slide_count == 3
+        keynote.front = "B"
+        # 任何按当前文档执行的脚本都会更正别名
+        await slides.select_slide(1)
+        assert (await mirror.get("")).slide_count == 8
+        assert mirror.cached("doc:A").slide_count == 3
+        keynote.front = "A"
+        await slides.select_slide(1)
+        # 切回已按句柄缓存的文档时直接改为指向它的模型
+        return await mirror.get("")
+
+    assert asyncio.run(scenario()).slide_count == 3
+    assert keynote.calls == ["dump_deck", "select_slide", "dump_deck", "select_slide"]
+    assert mirror.stats()["front_switches"] == 2
+
+
+def test_failed_front_check_drops_alias():
+    keynote = FakeKeynote({"A": 3, "B": 8}, front="A")
+    mirror = make_mirror(keynote)
+    asyncio.run(mirror.get(""))
+    keynote.front = "B"
+
+    # 别名仍指向 A：第一次检查报错，但不会在之后的调用中反复误报
+    with pytest.raises(ParameterError):
+        mirror.check_slide("", 6)
+    mirror.check_slide("", 6)
+    assert mirror.cached("doc:A") is not None
+    with pytest.raises(ParameterError):
+        mirror.check_slide("doc:A", 6)
+
+
+def test_runner_reports_front_document_from_envelope():
+    runner = AppleScriptRunner(pool_size=0)
+    seen = []
+    runner.front_document_listeners.append(seen.append)
+    assert runner._template_result(json.dumps({"ok": True, "value": 3, "front": "X"})) == 3
+    assert runner._template_result(json.dumps({"ok": True, "value": 4})) == 4
+    assert seen == ["X"]
+
+
+def test_document_templates_report_front_document():
+    assert "my jsonDocumentResult(" in templates.get("dump_deck").render_program()
+    assert "my jsonDocumentResult(" not in templates.get("get_available_themes").render_program()
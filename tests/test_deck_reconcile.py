@@ -0,0 +1,103 @@
+"""
+幻灯片重排和文档对账的编辑脚本测试
+"""
+
+import itertools
+import random
+
+from src.utils.deck_reconcile import (
+    EditStep, SlideFingerprint, longest_increasing_subsequence, plan_moves, reconcile_slides
+)
+
+
+def apply_moves(order, moves):
+    slides = list(order)
+    for from_position, to_position in moves:
+        slides.insert(to_position - 1, slides.pop(from_position - 1))
+    return slides
+
+
+def slide(*texts, images=0):
+    return SlideFingerprint(tuple(texts), tuple(None for _ in texts), images)
+
+
+def apply_steps(live, desired, steps):
+    """按编辑脚本修改现有幻灯片列表"""
+    slides = list(live)
+    for step in steps:
+        if step.action == "delete":
+            del slides[step.slide_number - 1]
+        elif step.action == "insert":
+            assert step.slide_number == len(slides) + 1
+            slides.append(desired[step.desired])
+        elif step.action == "move":
+            slides.insert(step.target - 1, slides.pop(step.slide_number - 1))
+        elif step.action == "retext":
+            assert slides[step.slide_number - 1].same_structure(desired[step.desired])
+            slides[step.slide_number - 1] = desired[step.desired]
+    return slides
+
+
+def test_longest_increasing_subsequence():
+    values = [3, 0, 4, 1, 5, 2, 6]
+    indexes = longest_increasing_subsequence(values)
+    picked = [values[index] for index in sorted(indexes)]
+    assert len(picked) == 4
+    assert picked == sorted(picked)
+    assert longest_increasing_subsequence([]) == set()
+
+
+def test_plan_moves_is_minimal_for_all_small_permutations():
+    for size in range(1, 6):
+        for order in itertools.permutations(range(size)):
+            moves = plan_moves(order)
+            assert apply_moves(order, moves) == list(range(size))
+            assert len(moves) == size - len(longest_increasing_subsequence(order))
+
+
+def test_plan_moves_single_move_for_rotation():
+    assert plan_moves([1, 2, 3, 4, 0]) == [(5, 1)]
+    assert plan_moves(list(range(10))) == []
+
+
+def test_reconcile_identical_decks_is_empty():
+    deck = [slide("a"), slide("b"), slide("c", images=1)]
+    assert reconcile_slides(deck, list(deck)) == []
+
+
+def test_reconcile_reorder_uses_moves_only():
+    live = [slide("a"), slide("b"), slide("c"), slide("d")]
+    desired = [live[3], live[0], live[1], live[2]]
+    steps = reconcile_slides(live, desired)
+    assert steps == [EditStep("move", 4, 1)]
+    assert apply_steps(live, desired, steps) == desired
+
+
+def test_reconcile_text_change_is_retext():
+    live = [slide("title", "body"), slide("other")]
+    desired = [slide("title", "new body"), slide("other")]
+    steps = reconcile_slides(live, desired)
+    assert [step.action for step in steps] == ["retext"]
+    assert apply_steps(live, desired, steps) == desired
+
+
+def test_reconcile_structure_change_deletes_and_inserts():
+    live = [slide("a"), slide("b")]
+    desired = [slide("a"), slide("b", images=1)]
+    steps = reconcile_slides(live, desired)
+    assert sorted(step.action for step in steps) == ["delete", "insert"]
+    assert apply_steps(live, desired, steps) == desired
+
+
+def test_reconcile_random_decks_reach_desired_state():
+    rng = random.Random(7)
+    pool = [slide(text, images=rng.randint(0, 1)) for text in "abcdefghij"]
+    for _ in range(200):
+        live = rng.sample(pool, rng.randint(0, 8))
+        desired = rng.sample(pool, rng.randint(0, 8))
+        steps = reconcile_slides(live, desired)
+        assert apply_steps(live, desired, steps) == desired
+        # 保留的幻灯片不会被删除后重新创建
+        kept = set(live) & set(desired)
+        inserted = {desired[step.desired] for step in steps if step.action == "insert"}
+        assert not kept & inserted
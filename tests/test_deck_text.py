@@ -0,0 +1,65 @@
+"""
+幻灯片文本批量读取测试（使用模拟的执行器代替 AppleScript 调用）
+"""
+
+import asyncio
+
+import pytest
+
+from src.tools.slide import SlideTools
+from src.utils.deck_mirror import DeckMirror
+
+
+class FakeDeck:
+    """按请求的范围返回 DUMP_SLIDE_TEXT 结果"""
+
+    def __init__(self, slide_count):
+        self.slide_count = slide_count
+        self.ranges = []
+
+    async def run_template_async(self, template, doc_ref, first, last, timeout=None):
+        assert template.name == "dump_slide_text"
+        last = min(last or self.slide_count, self.slide_count)
+        self.ranges.append((first, last))
+        numbers = range(first, last + 1)
+        return {
+            "slideCount": self.slide_count, "firstSlide": first, "width": 1920, "height": 1080,
+            "titles": [f"Slide {n}" for n in numbers], "texts": [[f"text {n}"] for n in numbers],
+            "sizes": [[24] for _ in numbers], "shapes": [[] for _ in numbers], "notes": ["" for _ in numbers],
+            "images": [0 for _ in numbers], "others": [0 for _ in numbers],
+        }
+
+
+@pytest.fixture
+def deck(monkeypatch):
+    monkeypatch.setenv("KEYNOTE_MCP_TEXT_CHUNK", "4")
+    return FakeDeck(10)
+
+
+def extract(deck, **kwargs):
+    tools = SlideTools(deck, mirror=DeckMirror(deck, max_age=0))
+    return [content.text for content in asyncio.run(tools.extract_deck_text(**kwargs))]
+
+
+def test_max_slides_pages_with_continuation(deck):
+    texts = extract(deck, max_slides=6)
+    assert texts[0].startswith("📄") and "第 1-6 张" in texts[0]
+    assert len(texts) == 8
+    assert "first_slide=7" in texts[-1]
+    # 只多读取一张幻灯片用于判断是否还有剩余
+    assert deck.ranges == [(1, 4), (5, 7)]
+
+    texts = extract(deck, first_slide=7, max_slides=6)
+    assert "第 7-10 张" in texts[0]
+    assert len(texts) == 5 and not texts[-1].startswith("⏭️")
+
+
+def test_max_slides_respects_last_slide(deck):
+    texts = extract(deck, last_slide=3, max_slides=3)
+    assert len(texts) == 4 and not texts[-1].startswith("⏭️")
+    texts = extract(deck, last_slide=5, max_slides=3)
+    assert "first_slide=4" in texts[-1]
+
+
+def test_invalid_max_slides(deck):
+    assert extract(deck, max_slides=-1)[0].startswith("❌")
@@ -0,0 +1,142 @@
+"""
+导出作业队列测试
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.utils.error_handler import ParameterError
+from src.utils.export_jobs import CANCELLED, DONE, FAILED, ExportJobManager
+
+
+def test_jobs_run_by_priority_then_submission_order(tmp_path):
+    order = []
+
+    async def scenario():
+        manager = ExportJobManager(state_path=str(tmp_path / "jobs.json"), workers=1)
+        gate = asyncio.Event()
+
+        def runner(name, wait=False):
+            async def run(job):
+                if wait:
+                    await gate.wait()
+                order.append(name)
+                return [name]
+            return run
+
+        blocker = manager.submit("pdf", "", "blocker", runner("blocker", wait=True))
+        await asyncio.sleep(0)
+        low = manager.submit("pdf", "", "low", runner("low"), priority="low")
+        first = manager.submit("pdf", "", "normal-1", runner("normal-1"))
+        second = manager.submit("pdf", "", "normal-2", runner("normal-2"))
+        high = manager.submit("pdf", "", "high", runner("high"), priority="high")
+        assert manager.queue_position(high.job_id) == 0
+        assert manager.queue_position(low.job_id) == 3
+        gate.set()
+        for job in (blocker, low, first, second, high):
+            assert (await manager.wait(job.job_id)).status == DONE
+        manager.close()
+
+    asyncio.run(scenario())
+    assert order == ["blocker", "high", "normal-1", "normal-2", "low"]
+
+
+def test_invalid_priority(tmp_path):
+    manager = ExportJobManager(state_path=str(tmp_path / "jobs.json"))
+    with pytest.raises(ParameterError):
+        manager.submit("pdf", "", "out", None, priority="urgent")
+
+
+def test_cancel_queued_and_running_jobs(tmp_path):
+    async def scenario():
+        manager = ExportJobManager(state_path=str(tmp_path / "jobs.json"), workers=1)
+        started = asyncio.Event()
+
+        async def slow(job):
+            started.set()
+            await asyncio.sleep(10)
+            return []
+
+        running = manager.submit("pdf", "", "a", slow)
+        queued = manager.submit("pdf", "", "b", slow)
+        await started.wait()
+        assert (await manager.cancel(queued.job_id)).status == CANCELLED
+        assert (await manager.cancel(running.job_id)).status == CANCELLED
+        with pytest.raises(ParameterError, match="already finished"):
+            await manager.cancel(running.job_id)
+        manager.close()
+
+    asyncio.run(scenario())
+
+
+def test_state_persists_and_unfinished_jobs_are_interrupted(tmp_path):
+    state_path = tmp_path / "jobs.json"
+    output = tmp_path / "deck.pdf"
+    output.write_text("pdf")
+
+    async def first_run():
+        manager = ExportJobManager(state_path=str(state_path), workers=1)
+
+        async def done(job):
+            return [str(output)]
+
+        async def hang(job):
+            await asyncio.sleep(10)
+            return []
+
+        finished = manager.submit("pdf", "", str(output), done, key="k1")
+        await manager.wait(finished.job_id)
+        interrupted = manager.submit("pdf", "", "other", hang)
+        await asyncio.sleep(0.05)
+        # 模拟服务器退出：运行中的作业没有机会写入结束状态
+        manager._save()
+        manager._worker_tasks.clear()
+        return finished.job_id, interrupted.job_id
+
+    finished_id, interrupted_id = asyncio.run(first_run())
+    saved = {job["id"]: job["status"] for job in json.loads(state_path.read_text())["jobs"]}
+    assert saved[finished_id] == DONE
+
+    restarted = ExportJobManager(state_path=str(state_path))
+    assert restarted.get(finished_id).outputs == [str(output)]
+    assert restarted.find_reusable("k1").job_id == finished_id
+    assert restarted.find_reusable(None) is None
+    interrupted = restarted.get(interrupted_id)
+    assert interrupted.status == FAILED
+    assert interrupted.error == "Interrupted by server restart"
+
+    # 输出文件被删除后不再复用
+    output.unlink()
+    assert restarted.find_reusable("k1") is None
+
+
+def test_failed_job_records_error(tmp_path):
+    async def scenario():
+        manager = ExportJobManager(state_path=str(tmp_path / "jobs.json"))
+
+        async def broken(job):
+            raise RuntimeError("disk full")
+
+        job = await manager.wait(manager.submit("pdf", "", "out", broken).job_id)
+        manager.close()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == FAILED and job.error == "disk full"
+
+
+def test_history_limit(tmp_path):
+    async def scenario():
+        manager = ExportJobManager(state_path=str(tmp_path / "jobs.json"), history=2)
+
+        async def done(job):
+            return []
+
+        for n in range(4):
+            await manager.wait(manager.submit("pdf", "", f"out{n}", done).job_id)
+        manager.close()
+        return [job.output for job in manager.jobs()]
+
+    assert asyncio.run(scenario()) == ["out3", "out2"]
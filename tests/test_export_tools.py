@@ -0,0 +1,162 @@
+"""
+截图和图片导出测试（使用模拟的 Keynote 文档代替 AppleScript 调用）
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from src.tools.export import ExportTools
+from src.utils.applescript_runner import AppleScriptRunner
+from src.utils.error_handler import AppleScriptError
+from src.utils.render_cache import RenderCache
+
+
+class FakeDeck:
+    """记录模板调用并模拟幻灯片跳过状态的文档"""
+
+    def __init__(self, skipped, export_delay=0.0, export_error=None):
+        self.skipped = list(skipped)
+        self.export_delay = export_delay
+        self.export_error = export_error
+        self.calls = []
+        self.export_started = asyncio.Event()
+
+    async def run_template_async(self, template, *args, timeout=None):
+        self.calls.append(template.name)
+        if template.name == "get_slide_count":
+            return len(self.skipped)
+        if template.name == "dump_render_state":
+            _, first, last = args
+            numbers = range(first, min(last or len(self.skipped), len(self.skipped)) + 1)
+            return {
+                "slideCount": len(self.skipped), "firstSlide": first, "theme": "White", "width": 1920,
+                "height": 1080, "layouts": ["Title"] * len(numbers), "texts": [[f"slide {n}"] for n in numbers],
+                "shapes": [[] for _ in numbers], "imageFiles": [[] for _ in numbers],
+                "slide": [], "kind": [], "x": [], "y": [], "w": [], "h": [],
+            }
+        if template.name == "get_skipped_slides":
+            return {"slideCount": len(self.skipped), "skipped": list(self.skipped)}
+        if template.name == "set_slides_skipped":
+            _, skip, unskip = args
+            for number in skip:
+                self.skipped[number - 1] = True
+            for number in unskip:
+                self.skipped[number - 1] = False
+            return "success"
+        if template.name == "export_slide_images":
+            _, folder, _ = args
+            self.export_started.set()
+            await asyncio.sleep(self.export_delay)
+            self.calls.append("export finished")
+            if self.export_error:
+                raise AppleScriptError(self.export_error)
+            visible = [number for number, flag in enumerate(self.skipped, 1) if not flag]
+            for index, _ in enumerate(visible, 1):
+                with open(os.path.join(folder, f"Deck.{index:03}.png"), "w") as image:
+                    image.write("png")
+            return "success"
+        if template.name == "export_source":
+            return {"file": "", "modified": True}
+        raise AssertionError(f"unexpected template {template.name}")
+
+
+@pytest.fixture
+def tools(tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYNOTE_MCP_CACHE_DIR", str(tmp_path / "cache"))
+    tools = ExportTools(AppleScriptRunner(pool_size=0), render_cache=RenderCache(max_bytes=0))
+    yield tools
+    tools.jobs.close()
+
+
+@pytest.fixture
+def cached_tools(tmp_path, monkeypatch):
+    monkeypatch.setenv("KEYNOTE_MCP_CACHE_DIR", str(tmp_path / "cache"))
+    tools = ExportTools(
+        AppleScriptRunner(pool_size=0),
+        render_cache=RenderCache(str(tmp_path / "renders"), max_bytes=1024 * 1024)
+    )
+    yield tools
+    tools.jobs.close()
+
+
+def use_deck(tools, deck):
+    tools.runner.run_template_async = deck.run_template_async
+    return deck
+
+
+def test_screenshot_slides_restores_skip_flags(tools, tmp_path):
+    async def scenario():
+        deck = use_deck(tools, FakeDeck([False, True, False, True]))
+        result = await tools.screenshot_slides(str(tmp_path / "out"), [2, 3])
+        return deck, result[0].text
+
+    deck, text = asyncio.run(scenario())
+    assert text.startswith("✅")
+    assert sorted(os.listdir(tmp_path / "out")) == ["slide_2.png", "slide_3.png"]
+    assert deck.skipped == [False, True, False, True]
+    assert deck.calls.count("set_slides_skipped") == 2
+
+
+def test_failed_export_restores_skip_flags(tools, tmp_path):
+    async def scenario():
+        deck = use_deck(tools, FakeDeck([False, True, False], export_error="AppleScript execution timed out"))
+        result = await tools.screenshot_slides(str(tmp_path / "out"), [2])
+        return deck, result[0].text
+
+    deck, text = asyncio.run(scenario())
+    assert "timed out" in text
+    assert deck.skipped == [False, True, False]
+    assert deck.calls[-1] == "set_slides_skipped"
+
+
+def test_cancel_running_image_job_restores_skip_flags(tools, tmp_path):
+    async def scenario():
+        deck = use_deck(tools, FakeDeck([True, False, False, True], export_delay=0.3))
+        await tools.export_images(str(tmp_path / "images"))
+        job = tools.jobs.jobs()[0]
+        await deck.export_started.wait()
+        # 导出全部幻灯片时，原本跳过的幻灯片在导出期间被临时显示
+        assert deck.skipped == [False, False, False, False]
+        result = await tools.cancel_export_job(job.job_id)
+        return deck, job, result[0].text
+
+    deck, job, text = asyncio.run(scenario())
+    assert job.status == "cancelled"
+    # 取消不终止导出脚本：等导出结束后再恢复跳过状态
+    assert deck.calls[-2:] == ["export finished", "set_slides_skipped"]
+    assert deck.skipped == [True, False, False, True]
+
+
+def test_cancel_screenshot_request_restores_skip_flags(tools, tmp_path):
+    async def scenario():
+        deck = use_deck(tools, FakeDeck([False, False, True], export_delay=0.3))
+        task = asyncio.ensure_future(tools.screenshot_slides(str(tmp_path / "out"), [3]))
+        await deck.export_started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return deck
+
+    deck = asyncio.run(scenario())
+    assert deck.calls[-2:] == ["export finished", "set_slides_skipped"]
+    assert deck.skipped == [False, False, True]
+
+
+def test_use_cache_controls_render_cache(cached_tools, tmp_path):
+    async def scenario():
+        deck = use_deck(cached_tools, FakeDeck([False, False]))
+        await cached_tools.screenshot_slides(str(tmp_path / "first"), [1, 2])
+        await cached_tools.screenshot_slides(str(tmp_path / "cached"), [1, 2])
+        cached_exports = deck.calls.count("export_slide_images")
+        await cached_tools.screenshot_slides(str(tmp_path / "fresh"), [1, 2], use_cache=False)
+        await cached_tools.screenshot_slide(1, str(tmp_path / "single.png"))
+        return deck, cached_exports
+
+    deck, cached_exports = asyncio.run(scenario())
+    # 第二次截图完全命中缓存，use_cache=False 和单张截图都重新导出
+    assert cached_exports == 1
+    assert deck.calls.count("export_slide_images") == 3
+    assert sorted(os.listdir(tmp_path / "fresh")) == ["slide_1.png", "slide_2.png"]
+    assert os.path.exists(tmp_path / "single.png")
@@ -0,0 +1,64 @@
+"""
+查找替换测试（只测试本地匹配和替换计划）
+"""
+
+import pytest
+
+from src.tools.content import TextEdit, compile_find_pattern, plan_text_replacements
+from src.utils.deck_text import SlideText
+from src.utils.error_handler import ParameterError
+
+
+def slide(number, texts=(), shapes=(), notes=""):
+    return SlideText(number, list(texts), [None] * len(texts), 0, 0, shape_texts=tuple(shapes), notes=notes)
+
+
+def test_literal_replacement_keeps_backslashes():
+    slides = [slide(1, [r"path: C:\old\file.txt"])]
+    pattern = compile_find_pattern(r"C:\old")
+    edits = plan_text_replacements(slides, pattern, r"D:\new\1")
+    assert edits == [TextEdit(1, "text_item", 1, r"path: D:\new\1\file.txt", 1)]
+
+
+def test_regex_group_references():
+    slides = [slide(2, ["2024-05-01", "no date"], shapes=["Due 2025-12-31"])]
+    pattern = compile_find_pattern(r"(?P<year>\d{4})-(\d{2})-(\d{2})", regex=True)
+    edits = plan_text_replacements(slides, pattern, r"\3/\2/\g<year>", regex=True)
+    assert edits == [
+        TextEdit(2, "text_item", 1, "01/05/2024", 1),
+        TextEdit(2, "shape", 1, "Due 31/12/2025", 1),
+    ]
+
+
+def test_case_insensitive_matching():
+    slides = [slide(1, ["Keynote keynote KEYNOTE"])]
+    assert plan_text_replacements(slides, compile_find_pattern("keynote"), "Deck") == [
+        TextEdit(1, "text_item", 1, "Keynote Deck KEYNOTE", 1)
+    ]
+    assert plan_text_replacements(slides, compile_find_pattern("keynote", case_sensitive=False), "Deck") == [
+        TextEdit(1, "text_item", 1, "Deck Deck Deck", 3)
+    ]
+
+
+def test_notes_replaced_only_when_included():
+    slides = [slide(3, ["Intro"], notes="Say Intro slowly")]
+    pattern = compile_find_pattern("Intro")
+    assert [edit.target for edit in plan_text_replacements(slides, pattern, "Start")] == ["text_item"]
+    edits = plan_text_replacements(slides, pattern, "Start", include_notes=True)
+    assert edits[-1] == TextEdit(3, "notes", 0, "Say Start slowly", 1)
+
+
+def test_unchanged_items_produce_no_edits():
+    slides = [slide(1, ["same", "other", ""], shapes=["", "same"])]
+    # 没有匹配，或替换后文本不变
+    assert plan_text_replacements(slides, compile_find_pattern("missing"), "x") == []
+    assert plan_text_replacements(slides, compile_find_pattern("same"), "same") == []
+
+
+def test_invalid_patterns_are_parameter_errors():
+    with pytest.raises(ParameterError):
+        compile_find_pattern("")
+    with pytest.raises(ParameterError):
+        compile_find_pattern("(", regex=True)
+    with pytest.raises(ParameterError):
+        plan_text_replacements([slide(1, ["abc"])], compile_find_pattern("b", regex=True), r"\2", regex=True)
@@ -0,0 +1,67 @@
+"""
+Markdown 大纲解析测试
+"""
+
+import pytest
+
+from src.utils.error_handler import ParameterError
+from src.utils.markdown_deck import (
+    BULLETS, CODE, IMAGE, NUMBERED, QUOTE, SUBTITLE, TEXT, Block, parse_markdown, slides_from_spec, strip_inline
+)
+
+
+def test_headings_and_rules_start_slides():
+    slides = parse_markdown("# One\ntext\n## Two\n### Sub\n---\nafter rule\n")
+    assert [(slide.title, slide.line) for slide in slides] == [("One", 1), ("Two", 3), ("", 6)]
+    assert slides[1].blocks == (Block(SUBTITLE, "Sub"),)
+    assert slides[2].blocks == (Block(TEXT, "after rule"),)
+
+
+def test_paragraph_lines_are_joined_and_inline_marks_stripped():
+    slides = parse_markdown("# T\nSome *text* with `code`\nand a [link](http://x) **here**\n")
+    assert slides[0].blocks == (Block(TEXT, "Some text with code and a link here"),)
+
+
+def test_nested_bullets_and_numbered_lists():
+    slides = parse_markdown("# T\n- a\n  - b\n    - c\n- d\n\n1. x\n2) y\n")
+    assert slides[0].blocks == (
+        Block(BULLETS, items=((0, "a"), (1, "b"), (2, "c"), (0, "d"))),
+        Block(NUMBERED, items=((0, "x"), (0, "y"))),
+    )
+
+
+def test_code_quote_and_image_blocks():
+    markdown = "# T\n> first line\n> same paragraph\n```python\n  indented  *not stripped*\n```\n![alt](pics/a.png)\n"
+    blocks = parse_markdown(markdown)[0].blocks
+    assert blocks == (
+        Block(QUOTE, "first line same paragraph"),
+        Block(CODE, "  indented  *not stripped*"),
+        Block(IMAGE, "pics/a.png"),
+    )
+
+
+def test_empty_slides_are_omitted():
+    assert parse_markdown("") == []
+    assert [slide.title for slide in parse_markdown("---\n\n---\n# Only\n")] == ["Only"]
+
+
+def test_unclosed_code_fence_reports_line():
+    with pytest.raises(ParameterError, match="Line 2"):
+        parse_markdown("# T\n```\nnever closed\n")
+
+
+def test_strip_inline_keeps_word_internal_asterisks():
+    assert strip_inline("a*b*c and *em*") == "a*b*c and em"
+
+
+def test_slides_from_spec():
+    slides = slides_from_spec([
+        {"title": "A", "blocks": [{"type": "bullets", "items": ["x", {"text": "y", "level": 1}]}]},
+        {"blocks": [{"type": "image", "path": "p.png"}]},
+    ])
+    assert slides[0].blocks == (Block(BULLETS, items=((0, "x"), (1, "y"))),)
+    assert slides[1] == (("", (Block(IMAGE, "p.png"),), 2))
+    with pytest.raises(ParameterError, match="unknown block type"):
+        slides_from_spec([{"blocks": [{"type": "table"}]}])
+    with pytest.raises(ParameterError, match="requires a path"):
+        slides_from_spec([{"blocks": [{"type": "image"}]}])
@@ -0,0 +1,146 @@
+"""
+常驻 osascript 工作进程池测试（使用 fake_osascript_worker.py 替身，在 Linux 上运行）
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from src.utils.applescript_runner import AppleScriptRunner
+from src.utils.error_handler import AppleScriptError
+from src.utils.osascript_pool import OsascriptWorkerPool, WorkerUnavailableError
+
+FAKE_WORKER = [sys.executable, str(Path(__file__).parent / "fake_osascript_worker.py")]
+
+
+def worker_pid(result: str) -> str:
+    return result.split(":", 1)[0]
+
+
+@pytest.fixture
+def pool():
+    pool = OsascriptWorkerPool(size=1, max_executions=3, command=FAKE_WORKER)
+    yield pool
+    pool.close()
+
+
+def test_run_and_call_frames(pool):
+    assert pool.execute("hello").endswith(":hello")
+    result = pool.call("/tmp/script.scpt", ["s:a", "i:1"])
+    assert result.split(":", 1)[1] == "/tmp/script.scpt|s:a|i:1"
+
+
+def test_worker_reused_until_max_executions(pool):
+    pids = [worker_pid(pool.execute(f"run {n}")) for n in range(4)]
+    # 前 3 次在同一个工作进程中执行，达到上限后回收重建
+    assert pids[0] == pids[1] == pids[2]
+    assert pids[3] != pids[0]
+    stats = pool.stats()
+    assert stats["spawned"] == 2
+    assert stats["recycled"] == 1
+    assert stats["executions"] == 4
+
+
+def test_err_frame_raises_and_keeps_worker(pool):
+    first = worker_pid(pool.execute("before"))
+    with pytest.raises(AppleScriptError, match="boom"):
+        pool.execute("error boom")
+    # ERR 帧是正常的协议响应，工作进程继续复用
+    assert worker_pid(pool.execute("after")) == first
+    assert pool.stats()["discarded"] == 0
+
+
+def test_idle_health_check_replaces_dead_worker():
+    pool = OsascriptWorkerPool(size=1, max_executions=0, command=FAKE_WORKER, health_check_interval=0)
+    try:
+        first = worker_pid(pool.execute("one"))
+        # 空闲的工作进程在复用前先做 PING 检查
+        assert worker_pid(pool.execute("two")) == first
+
+        worker = pool._idle[0]
+        worker.process.kill()
+        worker.process.wait()
+        assert worker_pid(pool.execute("three")) != first
+        assert pool.stats()["discarded"] == 1
+    finally:
+        pool.close()
+
+
+def test_crashed_worker_is_discarded(pool):
+    with pytest.raises(AppleScriptError, match="exited unexpectedly"):
+        pool.execute("crash")
+    assert pool.stats()["discarded"] == 1
+    assert pool.execute("again").endswith(":again")
+
+
+def test_timeout_kills_worker(pool):
+    started = time.monotonic()
+    with pytest.raises(AppleScriptError, match="timed out"):
+        pool.execute("sleep 5", timeout=0.3)
+    assert time.monotonic() - started < 3
+    assert pool.stats()["discarded"] == 1
+    assert pool.execute("next").endswith(":next")
+
+
+def test_spawn_failure_blocks_spawning():
+    pool = OsascriptWorkerPool(size=1, command=["/nonexistent/osascript-worker"], spawn_retry_interval=60)
+    try:
+        with pytest.raises(WorkerUnavailableError):
+            pool.execute("x")
+        with pytest.raises(WorkerUnavailableError, match="temporarily disabled"):
+            pool.execute("x")
+        assert pool.stats()["spawn_failures"] == 1
+    finally:
+        pool.close()
+
+
+def test_failed_handshake_is_unavailable():
+    pool = OsascriptWorkerPool(size=1, command=[sys.executable, "-c", "pass"])
+    try:
+        with pytest.raises(WorkerUnavailableError, match="handshake"):
+            pool.execute("x")
+    finally:
+        pool.close()
+
+
+def test_runner_falls_back_to_oneshot_when_spawn_fails():
+    runner = AppleScriptRunner(pool_size=1, worker_command=["/nonexistent/osascript-worker"])
+    commands = []
+
+    async def oneshot(command, timeout):
+        commands.append(command)
+        return "oneshot"
+
+    runner._execute_oneshot_async = oneshot
+    try:
+        assert asyncio.run(runner.run_inline_script_async("return 1")) == "oneshot"
+        assert commands == [["osascript", "-e", "return 1"]]
+        assert runner.pool.stats()["spawn_failures"] == 1
+    finally:
+        runner.close()
+
+
+def test_runner_cancel_aborts_worker():
+    runner = AppleScriptRunner(pool_size=1, worker_command=FAKE_WORKER)
+
+    async def scenario():
+        task = asyncio.ensure_future(runner.run_inline_script_async("sleep 10"))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # 被终止的工作进程由执行线程回收后，新的调用启动新的工作进程
+        return await runner.run_inline_script_async("after cancel", timeout=5)
+
+    started = time.monotonic()
+    try:
+        assert asyncio.run(scenario()).endswith(":after cancel")
+        assert time.monotonic() - started < 5
+        stats = runner.pool.stats()
+        assert stats["discarded"] == 1
+        assert stats["spawned"] == 2
+    finally:
+        runner.close()
@@ -0,0 +1,130 @@
+"""
+演示文稿工具测试（使用模拟的执行器代替 AppleScript 调用）
+"""
+
+import asyncio
+
+from src.tools.presentation import PresentationTools
+from src.tools.slide import ADD_SLIDE, SlideTools
+from src.utils.deck_mirror import DeckMirror
+from src.utils.ttl_cache import TTLCache
+
+
+class FakeKeynote:
+    """当前文档为 A；按当前文档执行时像真实脚本一样报告当前文档的 id"""
+
+    def __init__(self):
+        self.calls = []
+        self.theme = "White"
+        self.front_document_listeners = []
+
+    async def run_template_async(self, template, *args, timeout=None):
+        self.calls.append(template.name)
+        if template.document and not args[0]:
+            for listener in self.front_document_listeners:
+                listener("A")
+        if template.name == "set_presentation_theme":
+            self.theme = args[1]
+            return "success"
+        if template.name == "get_available_layouts":
+            return [f"{self.theme} Title", f"{self.theme} Blank"]
+        if template.name == "get_slide_dimensions":
+            return {"width": 1024, "height": 768}
+        if template.name == "dump_deck":
+            return {
+                "id": "A", "name": "Deck", "theme": "White", "width": 1920, "height": 1080,
+                "layouts": ["Title"], "slide": [], "kind": [], "x": [], "y": [], "w": [], "h": [],
+            }
+        raise AssertionError(f"unexpected template {template.name}")
+
+
+def test_slide_dimensions_on_cold_mirror_reads_only_size():
+    keynote = FakeKeynote()
+    tools = PresentationTools(keynote, mirror=DeckMirror(keynote, max_age=30))
+
+    async def scenario():
+        first = await tools.slide_dimensions()
+        cached = await tools.slide_dimensions()
+        return first, cached
+
+    assert asyncio.run(scenario()) == ((1024, 768), (1024, 768))
+    # 不为幻灯片尺寸导出整个文档，第二次调用命中缓存
+    assert keynote.calls == ["get_slide_dimensions"]
+
+
+def test_slide_dimensions_uses_warm_mirror():
+    keynote = FakeKeynote()
+    mirror = DeckMirror(keynote, max_age=30)
+    tools = PresentationTools(keynote, mirror=mirror)
+
+    async def scenario():
+        await mirror.get("doc:A")
+        return await tools.slide_dimensions("doc:A")
+
+    assert asyncio.run(scenario()) == (1920, 1080)
+    assert keynote.calls == ["dump_deck"]
+
+
+def test_front_document_theme_change_invalidates_handle_keyed_catalogs():
+    keynote = FakeKeynote()
+    catalogs = TTLCache(default_ttl=600)
+    keynote.front_document_listeners.append(catalogs.front_document_seen)
+    mirror = DeckMirror(keynote, max_age=30)
+    presentation = PresentationTools(keynote, mirror=mirror, catalogs=catalogs)
+    slides = SlideTools(keynote, mirror=mirror, catalogs=catalogs)
+
+    async def scenario():
+        before = await slides.available_layouts("doc:A")
+        result = await presentation.set_presentation_theme("Dark")
+        after = await slides.available_layouts("doc:A")
+        return before, result[0].text, after
+
+    before, text, after = asyncio.run(scenario())
+    assert before == ["White Title", "White Blank"]
+    assert text.startswith("✅")
+    # 按当前文档更换主题后，同一文档按句柄缓存的布局列表也已失效
+    assert after == ["Dark Title", "Dark Blank"]
+
+
+def test_front_document_switch_drops_front_keyed_catalogs():
+    catalogs = TTLCache(default_ttl=600)
+
+    async def load():
+        return ["Title"]
+
+    async def scenario():
+        catalogs.front_document_seen("A")
+        await catalogs.get(("layouts", ""), load)
+        await catalogs.get(("layouts", "doc:A"), load)
+        catalogs.front_document_seen("B")
+
+    asyncio.run(scenario())
+    assert catalogs.peek(("layouts", ""))[0] is False
+    assert catalogs.peek(("layouts", "doc:A"))[0] is True
+
+
+def test_add_slide_falls_back_to_blank_without_probing():
+    keynote = FakeKeynote()
+    added = []
+
+    async def run_template_async(template, *args, timeout=None):
+        keynote.calls.append(template.name)
+        if template.name == "get_available_layouts":
+            return ["Title", "Blank"]
+        added.append(args)
+        return {"slideNumber": 1, "layout": args[2], "textItemCount": 0, "itemCount": 0, "rects": []}
+
+    keynote.run_template_async = run_template_async
+    slides = SlideTools(keynote, mirror=DeckMirror(keynote, max_age=30), catalogs=TTLCache(default_ttl=600))
+
+    async def scenario():
+        missing = await slides.add_slide("doc:A", layout="Missing")
+        known = await slides.add_slide("doc:A", layout="Title")
+        return missing[0].text, known[0].text
+
+    missing, known = asyncio.run(scenario())
+    assert "Blank" in missing and "Title" in known
+    # 布局在 Python 中确认后再传给模板；布局列表只读取一次
+    assert added == [("doc:A", 0, "Blank"), ("doc:A", 0, "Title")]
+    assert keynote.calls == ["get_available_layouts", "add_slide", "add_slide"]
+    assert ADD_SLIDE.body.count("master slide") == 1
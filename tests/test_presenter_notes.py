@@ -0,0 +1,56 @@
+"""
+演讲者备注拆分和批处理规划测试
+"""
+
+import random
+
+from src.utils.presenter_notes import (
+    APPEND_PRESENTER_NOTES, SET_PRESENTER_NOTES, _operation_bytes, missing_slides, plan_notes_batches, split_text
+)
+
+
+def test_split_text_respects_utf8_byte_limit():
+    text = "汉字abc😀" * 500
+    pieces = split_text(text, 100)
+    assert "".join(pieces) == text
+    assert all(len(piece.encode("utf-8")) <= 100 for piece in pieces)
+    assert all(pieces)
+
+
+def test_split_text_edge_cases():
+    assert split_text("", 10) == [""]
+    assert split_text("short", 10) == ["short"]
+    # 单个字符超过上限时仍然前进，不会死循环
+    assert split_text("😀😀", 1) == ["😀", "😀"]
+
+
+def test_plan_notes_batches_single_batch_for_small_notes():
+    batches = plan_notes_batches({2: "b", 1: "a"}, max_bytes=4096)
+    assert len(batches) == 1
+    assert [(op.template, op.args) for op in batches[0]] == [
+        (SET_PRESENTER_NOTES, [1, "a"]), (SET_PRESENTER_NOTES, [2, "b"])
+    ]
+
+
+def test_plan_notes_batches_splits_long_notes_within_limit():
+    rng = random.Random(3)
+    notes = {n: "".join(rng.choice("ab汉字😀\n") for _ in range(rng.randint(0, 3000))) for n in range(1, 30)}
+    max_bytes = 4096
+    batches = plan_notes_batches(notes, max_bytes=max_bytes)
+    assert len(batches) > 1
+
+    written = {}
+    for batch in batches:
+        assert sum(_operation_bytes(op) for op in batch) <= max_bytes
+        for op in batch:
+            slide_number, text = op.args
+            if op.template is SET_PRESENTER_NOTES:
+                written[slide_number] = text
+            else:
+                assert op.template is APPEND_PRESENTER_NOTES
+                written[slide_number] += text
+    assert written == notes
+
+
+def test_missing_slides():
+    assert missing_slides([1, 5, 3], {"slides": [1, 3]}) == [5]
@@ -0,0 +1,81 @@
+"""
+渲染缓存测试
+"""
+
+import os
+
+from src.utils.render_cache import RenderCache, slide_fingerprints
+
+
+def make_image(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_put_and_get(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=1000)
+    assert cache.get("a" * 64) is None
+    cache.put("a" * 64, make_image(tmp_path, "s.png", 10))
+    cached = cache.get("a" * 64)
+    assert cached.endswith(".png") and open(cached, "rb").read() == b"x" * 10
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_by_size(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=250)
+    for key in "abc":
+        cache.put(key, make_image(tmp_path, f"{key}.png", 100))
+    # 写入 c 时超出上限，淘汰最久未使用的 a
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    cache.put("d", make_image(tmp_path, "d.png", 100))
+    # b 刚被访问过，淘汰的是 c
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["bytes"] == 200
+    assert sorted(os.listdir(tmp_path / "cache")) == ["b.png", "d.png"]
+
+
+def test_oversized_entry_is_kept_alone(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=50)
+    cache.put("a", make_image(tmp_path, "a.png", 10))
+    cache.put("big", make_image(tmp_path, "big.png", 100))
+    assert cache.get("a") is None
+    assert cache.get("big") is not None
+
+
+def test_index_rebuilt_from_directory(tmp_path):
+    directory = str(tmp_path / "cache")
+    RenderCache(directory, max_bytes=1000).put("a", make_image(tmp_path, "a.png", 10))
+    reopened = RenderCache(directory, max_bytes=1000)
+    assert reopened.get("a") is not None
+    assert reopened.stats()["entries"] == 1
+
+
+def test_disabled_cache(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=0)
+    cache.put("a", make_image(tmp_path, "a.png", 10))
+    assert not cache.enabled
+    assert cache.get("a") is None
+    assert not (tmp_path / "cache").exists()
+
+
+def dump(texts, first_slide=1):
+    count = len(texts)
+    return {
+        "firstSlide": first_slide, "theme": "White", "width": 1920, "height": 1080,
+        "layouts": ["Title"] * count, "texts": [[text] for text in texts], "shapes": [[]] * count,
+        "imageFiles": [[]] * count, "slide": [first_slide], "kind": [0], "x": [1.0], "y": [2.0], "w": [3.0], "h": [4.0],
+    }
+
+
+def test_fingerprints_change_with_content_and_format():
+    base = slide_fingerprints(dump(["a", "b"]), "PNG")
+    assert set(base) == {1, 2}
+    assert slide_fingerprints(dump(["a", "b"]), "PNG") == base
+    changed = slide_fingerprints(dump(["a", "c"]), "PNG")
+    assert changed[1] == base[1] and changed[2] != base[2]
+    assert slide_fingerprints(dump(["a", "b"]), "JPEG")[1] != base[1]
+    assert set(slide_fingerprints(dump(["a"], first_slide=5), "PNG")) == {5}
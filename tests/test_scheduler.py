@@ -0,0 +1,93 @@
+"""
+文档读写调度测试
+"""
+
+import asyncio
+
+from src.utils.scheduler import READ, WRITE, DocumentScheduler
+
+
+def run_operations(operations):
+    """
+    并发执行一组操作，返回 (事件列表, 最大并发数)
+
+    Args:
+        operations: (名称, 文档标识, 访问类型) 列表，按到达顺序排列
+    """
+    scheduler = DocumentScheduler()
+    events = []
+    running = set()
+    peak = [0]
+
+    async def operation(name, document, mode):
+        async with scheduler.schedule(document, mode):
+            running.add(name)
+            peak[0] = max(peak[0], len(running))
+            events.append(f"start {name}")
+            await asyncio.sleep(0.02)
+            events.append(f"end {name}")
+            running.discard(name)
+
+    async def scenario():
+        await asyncio.gather(*(operation(*spec) for spec in operations))
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["queue_depth"] == 0
+    return events, peak[0]
+
+
+def test_writes_on_same_document_are_serialized():
+    events, peak = run_operations([("a", "doc:1", WRITE), ("b", "doc:1", WRITE)])
+    assert events == ["start a", "end a", "start b", "end b"]
+    assert peak == 1
+
+
+def test_reads_and_other_documents_run_concurrently():
+    _, peak = run_operations([("a", "doc:1", READ), ("b", "doc:1", READ), ("c", "doc:2", WRITE)])
+    assert peak == 3
+
+
+def test_front_document_write_excludes_handle_writes():
+    # "" 和 doc:<id> 可能是同一个文档，不能交错执行
+    events, peak = run_operations([("front", "", WRITE), ("handle", "doc:1", WRITE)])
+    assert events == ["start front", "end front", "start handle", "end handle"]
+    assert peak == 1
+
+    events, _ = run_operations([("handle", "doc:1", WRITE), ("front", "", WRITE)])
+    assert events == ["start handle", "end handle", "start front", "end front"]
+
+
+def test_front_document_read_waits_for_handle_write():
+    events, _ = run_operations([("write", "doc:1", WRITE), ("read", "", READ)])
+    assert events == ["start write", "end write", "start read", "end read"]
+
+    _, peak = run_operations([("front", "", READ), ("handle", "doc:1", READ)])
+    assert peak == 2
+
+
+def test_front_document_write_keeps_arrival_order():
+    events, _ = run_operations([
+        ("first", "doc:1", READ), ("front", "", WRITE), ("later", "doc:2", READ),
+    ])
+    # 前台文档的写操作排队期间到达的其他文档操作排在它后面
+    assert events.index("end front") < events.index("start later")
+    assert events.index("end first") < events.index("start front")
+
+
+def test_cancelled_waiter_releases_front_intent():
+    scheduler = DocumentScheduler()
+
+    async def scenario():
+        await scheduler.acquire("doc:1", WRITE)
+        waiter = asyncio.ensure_future(scheduler.acquire("doc:1", WRITE))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        scheduler.release("doc:1", WRITE)
+        # 被取消的等待者登记的意向已经释放，前台文档的写操作不会被阻塞
+        await asyncio.wait_for(scheduler.acquire("", WRITE), 1)
+        scheduler.release("", WRITE)
+
+    asyncio.run(scenario())
+    assert scheduler.stats()["documents"] == {}
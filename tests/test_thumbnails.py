@@ -0,0 +1,86 @@
+"""
+缩略图测试
+"""
+
+import asyncio
+import base64
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from src.utils import thumbnails
+from src.utils.error_handler import ParameterError
+from src.utils.thumbnails import ThumbnailOptions, ThumbnailPool, encode_file_base64
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 7, 16, 17, 18, 19, 40])
+def test_encode_file_base64_matches_b64encode(tmp_path, monkeypatch, size):
+    # 缩小分块，让各种长度都跨越分块边界
+    monkeypatch.setattr(thumbnails, "_ENCODE_CHUNK", 6)
+    data = os.urandom(size)
+    path = tmp_path / "image.bin"
+    path.write_bytes(data)
+    assert encode_file_base64(str(path)) == base64.b64encode(data).decode("ascii")
+
+
+def test_resolve_defaults_and_jpg_alias(monkeypatch):
+    for name in ("KEYNOTE_MCP_THUMBNAIL_MAX_EDGE", "KEYNOTE_MCP_THUMBNAIL_FORMAT", "KEYNOTE_MCP_THUMBNAIL_QUALITY"):
+        monkeypatch.delenv(name, raising=False)
+    assert ThumbnailOptions.resolve() == ThumbnailOptions(512, "webp", 80)
+    assert ThumbnailOptions.resolve(format="JPG").format == "jpeg"
+
+
+@pytest.mark.parametrize("arguments", [
+    {"format": "gif"},
+    {"quality": 101},
+    {"quality": -5},
+    {"max_edge": 8},
+])
+def test_resolve_rejects_invalid_options(arguments):
+    with pytest.raises(ParameterError):
+        ThumbnailOptions.resolve(**arguments)
+
+
+class BrokenExecutor:
+    """工作进程已异常退出的进程池"""
+
+    def __init__(self):
+        self.shutdown_called = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+    def shutdown(self, wait=True):
+        self.shutdown_called = True
+
+
+def test_broken_process_pool_resets_executor(tmp_path):
+    pool = ThumbnailPool(workers=1)
+    pool._executor = BrokenExecutor()
+    options = ThumbnailOptions(64, "png", 80)
+
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(pool.thumbnail(str(tmp_path / "missing.png"), options))
+    # 下次调用时重新创建进程池
+    assert pool._executor is None
+    assert pool.rendered == 0
+
+
+def test_thumbnail_downscales_and_encodes(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "slide.png"
+    Image.new("RGBA", (1920, 1080), (10, 20, 30, 128)).save(source)
+    pool = ThumbnailPool(workers=1)
+    try:
+        thumbnail = asyncio.run(pool.thumbnail(str(source), ThumbnailOptions(256, "jpeg", 70)))
+    finally:
+        pool.close()
+
+    assert (thumbnail.width, thumbnail.height) == (256, 144)
+    assert thumbnail.mime_type == "image/jpeg"
+    assert base64.b64decode(thumbnail.data).startswith(b"\xff\xd8")
+    assert pool.rendered == 1